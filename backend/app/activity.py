@@ -0,0 +1,101 @@
+# Append-only activity log.
+# - Writes call record() inside their run_write closure (after db.flush() and
+#   before the commit), so an entry commits or rolls back with its change and
+#   the write queue's group commit batches entries, never one commit per event
+# - Feeds are keyset-paginated by id on (project_id, id) / (actor_id, id), and
+#   only show the caller's organization (through the tenant-scoped session)
+# - Entries older than ACTIVITY_RETENTION_DAYS are purged in id-range chunks,
+#   one write-queue write per chunk so request writes interleave with a long purge
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from app import models
+from app.database import SessionLocal
+from app.write_queue import run_write
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_RETENTION_DAYS = int(os.getenv("ACTIVITY_RETENTION_DAYS", "365"))
+ACTIVITY_PURGE_CHUNK = 10_000
+
+
+def record(
+    db: Session,
+    actor: Optional[models.User],
+    action: str,
+    entity_type: str,
+    entity_id: Optional[int],
+    summary: str,
+    project_id: Optional[int] = None,
+    organization_id: Optional[int] = None,
+):
+    """Add an entry to the change's own transaction."""
+    # Feeds are per organization: the actor's unless given (system jobs have no actor)
+    if organization_id is None and actor is not None:
+        organization_id = actor.organization_id
+    db.add(models.ActivityLog(
+        organization_id=organization_id,
+        actor_id=actor.id if actor is not None else None,
+        actor_name=(actor.full_name or actor.email) if actor is not None else None,
+        project_id=project_id,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        action=action,
+        summary=summary,
+        created_at=datetime.utcnow(),
+    ))
+
+
+def feed(
+    db: Session,
+    project_ids: Optional[list[int]] = None,
+    actor_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    limit: int = 20,
+) -> list[models.ActivityLog]:
+    """Newest-first entries; pass the last id of a page as before_id for the next one."""
+    query = db.query(models.ActivityLog)
+    if project_ids is not None:
+        if not project_ids:
+            return []
+        query = query.filter(models.ActivityLog.project_id.in_(project_ids))
+    if actor_id is not None:
+        query = query.filter(models.ActivityLog.actor_id == actor_id)
+    if before_id is not None:
+        query = query.filter(models.ActivityLog.id < before_id)
+    return query.order_by(models.ActivityLog.id.desc()).limit(limit).all()
+
+
+def purge_expired(retention_days: int = ACTIVITY_RETENTION_DAYS) -> int:
+    """Delete entries older than the retention window, a chunk of ids at a time."""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    table = models.ActivityLog.__table__
+
+    def delete_chunk(db: Session, first_id: int, last_id: int) -> int:
+        return db.execute(delete(table).where(table.c.id >= first_id, table.c.id <= last_id)).rowcount
+
+    deleted = 0
+    db = SessionLocal()
+    try:
+        # ids grow with time, so everything up to this id is past the cutoff
+        last_id = db.execute(
+            select(table.c.id)
+            .where(table.c.created_at < cutoff)
+            .order_by(table.c.created_at.desc())
+            .limit(1)
+        ).scalar()
+        if last_id is None:
+            return 0
+        first_id = db.execute(select(func.min(table.c.id))).scalar()
+        while first_id <= last_id:
+            chunk_end = min(first_id + ACTIVITY_PURGE_CHUNK - 1, last_id)
+            deleted += run_write(db, lambda db: delete_chunk(db, first_id, chunk_end))
+            first_id = chunk_end + 1
+    finally:
+        db.close()
+    if deleted:
+        logger.info("Purged %d activity entries older than %s", deleted, cutoff)
+    return deleted
@@ -0,0 +1,274 @@
+# Archive tier for completed projects.
+# - A daily job moves projects that have been Completed for ARCHIVE_AFTER_DAYS
+#   (by their last status transition, else end_date, else created_at) out of
+#   the hot tables, one organization at a time on a session bound to it (an
+#   Admin's manual run only covers their own organization): the project, its tasks, dependencies, assignments and
+#   payments become one zlib-compressed JSON document in archived_projects
+# - Hot tables (and their indexes) only hold active work; archived projects are
+#   read on demand, one primary-key lookup plus a decompress
+# - Restore puts the rows back under their original ids (new ids only if one
+#   was reused meanwhile) with versions bumped, so ETags from before don't match
+# - Status history, activity and revenue rollups stay where they are: they
+#   describe the past and carry no foreign keys
+import json
+import logging
+import os
+import zlib
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import Date, DateTime, Enum as SqlEnum, delete, func, insert, select
+from sqlalchemy.orm import Session
+from app import activity, inbox, models
+from app.cache_versions import bump_version
+from app.critical_path import dependency_graphs
+from app.database import SessionLocal
+from app.due_dates import due_tracker
+from app.membership import VERSION_KEY as MEMBERSHIP_VERSION_KEY, memberships
+from app.tenancy import ALL_ORGANIZATIONS, bind
+from app.workload import workload_cache
+from app.write_queue import run_write
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_COMPRESSION_LEVEL = int(os.getenv("ARCHIVE_COMPRESSION_LEVEL", "6"))
+
+PAYLOAD_FORMAT = 1
+
+
+def dump_row(row) -> dict:
+    values = {}
+    for column in row.__table__.columns:
+        value = getattr(row, column.key)
+        if isinstance(value, Enum):
+            value = value.name
+        elif isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        values[column.key] = value
+    return values
+
+
+def load_row(model, values: dict) -> dict:
+    row = {}
+    for column in model.__table__.columns:
+        if column.key not in values:
+            continue
+        value = values[column.key]
+        if value is not None:
+            if isinstance(column.type, SqlEnum) and column.type.enum_class is not None:
+                value = column.type.enum_class[value]
+            elif isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column.type, Date):
+                value = date.fromisoformat(value)
+        row[column.key] = value
+    return row
+
+
+def encode(document: dict) -> bytes:
+    return zlib.compress(json.dumps(document, separators=(",", ":")).encode(), ARCHIVE_COMPRESSION_LEVEL)
+
+
+def decode(payload: bytes) -> dict:
+    return json.loads(zlib.decompress(payload))
+
+
+def _completed_at_column():
+    """Latest transition to Completed per project, falling back to end_date, then created_at."""
+    completed = (
+        select(models.StatusTransition.entity_id, func.max(models.StatusTransition.changed_at).label("completed_at"))
+        .where(
+            models.StatusTransition.entity_type == "project",
+            models.StatusTransition.to_status == models.ProjectStatus.Completed.name,
+        )
+        .group_by(models.StatusTransition.entity_id)
+        .subquery()
+    )
+    return completed, func.coalesce(completed.c.completed_at, models.Project.end_date, models.Project.created_at)
+
+
+def due_for_archive(db: Session, organization_id: int, older_than_days: int = ARCHIVE_AFTER_DAYS) -> list[int]:
+    completed, completed_at = _completed_at_column()
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    rows = (
+        db.query(models.Project.id)
+        .outerjoin(completed, completed.c.entity_id == models.Project.id)
+        .filter(
+            models.Project.organization_id == organization_id,
+            models.Project.status == models.ProjectStatus.Completed,
+            completed_at < cutoff,
+        )
+        .order_by(models.Project.id)
+    )
+    return [project_id for (project_id,) in rows]
+
+
+def archive_project(db: Session, project_id: int, actor: Optional[models.User] = None) -> models.ArchivedProject:
+    """Move one completed project out of the hot tables; 404 if missing, 409 if not Completed."""
+    def write(db: Session):
+        project = db.get(models.Project, project_id)
+        if project is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        if project.status != models.ProjectStatus.Completed:
+            raise HTTPException(status_code=409, detail="Only completed projects can be archived")
+        completed, completed_at = _completed_at_column()
+        finished = (
+            db.query(completed_at)
+            .select_from(models.Project)
+            .outerjoin(completed, completed.c.entity_id == models.Project.id)
+            .filter(models.Project.id == project_id)
+            .scalar()
+        )
+        tasks = db.query(models.Task).filter(models.Task.project_id == project_id).all()
+        dependencies = db.query(models.TaskDependency).filter(models.TaskDependency.project_id == project_id).all()
+        assignments = db.query(models.ProjectAssignment).filter(models.ProjectAssignment.project_id == project_id).all()
+        payments = db.query(models.Payment).filter(models.Payment.project_id == project_id).all()
+        archived = models.ArchivedProject(
+            id=project.id,
+            organization_id=project.organization_id,
+            client_id=project.client_id,
+            name=project.name,
+            completed_at=finished,
+            task_count=len(tasks),
+            payment_total=sum(payment.amount for payment in payments),
+            payload=encode({
+                "format": PAYLOAD_FORMAT,
+                "project": dump_row(project),
+                "tasks": [dump_row(task) for task in tasks],
+                "dependencies": [dump_row(dependency) for dependency in dependencies],
+                "assignments": [dump_row(assignment) for assignment in assignments],
+                "payments": [dump_row(payment) for payment in payments],
+            }),
+        )
+        db.add(archived)
+        inbox.remove_project(db, project_id)
+        for model in (models.TaskDependency, models.Task, models.ProjectAssignment, models.Payment):
+            db.execute(delete(model).where(model.project_id == project_id))
+        db.execute(delete(models.Project).where(models.Project.id == project_id))
+        activity.record(
+            db, actor, "archived", "project", project_id, f"Archived project {archived.name}",
+            project_id=project_id, organization_id=archived.organization_id,
+        )
+        version = bump_version(db, MEMBERSHIP_VERSION_KEY) if assignments else None
+        members = {(assignment.user_id, assignment.project_id) for assignment in assignments}
+        return archived, [task.id for task in tasks], members, version
+
+    archived, task_ids, members, version = run_write(db, write)
+    for task_id in task_ids:
+        due_tracker.untrack(task_id)
+    for user_id, member_project_id in members:
+        memberships.remove(user_id, member_project_id, version)
+    dependency_graphs.invalidate(project_id)
+    workload_cache.invalidate()
+    return archived
+
+
+def unused_project_id(db: Session) -> Optional[int]:
+    """
+    Id for a new project when the database would hand out an archived one's.
+    SQLite gives a new row max(id) + 1, which is the id of the newest project
+    again once that project is archived; archiving the new one would then clash.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return None
+    highest_archived = db.query(func.max(models.ArchivedProject.id)).execution_options(**ALL_ORGANIZATIONS).scalar()
+    if highest_archived is None:
+        return None
+    highest = db.query(func.max(models.Project.id)).execution_options(**ALL_ORGANIZATIONS).scalar() or 0
+    return highest_archived + 1 if highest_archived > highest else None
+
+
+def _insert(db: Session, model, values: dict) -> int:
+    # Core insert: keeps the stored version (the ORM would reset it to 1).
+    # Ids are shared by every organization, so check them across all of them
+    taken = db.query(model.id).filter(model.id == values.get("id")).execution_options(**ALL_ORGANIZATIONS)
+    if values.get("id") is not None and taken.first() is not None:
+        values = {key: value for key, value in values.items() if key != "id"}
+    return db.execute(insert(model.__table__).values(**values)).inserted_primary_key[0]
+
+
+def restore_project(db: Session, project_id: int, actor: Optional[models.User] = None) -> models.Project:
+    """Move an archived project and its rows back into the hot tables; 404 if not archived."""
+    def write(db: Session):
+        archived = db.get(models.ArchivedProject, project_id)
+        if archived is None:
+            raise HTTPException(status_code=404, detail="Archived project not found")
+        document = decode(archived.payload)
+
+        def values(model, row: dict, **overrides) -> dict:
+            loaded = load_row(model, row)
+            if "version" in loaded:
+                loaded["version"] = (loaded["version"] or 0) + 1
+            loaded.update(overrides)
+            return loaded
+
+        new_project_id = _insert(db, models.Project, values(models.Project, document["project"]))
+        task_ids = {}
+        for row in document["tasks"]:
+            task_ids[row["id"]] = _insert(db, models.Task, values(models.Task, row, project_id=new_project_id))
+        for row in document["dependencies"]:
+            _insert(db, models.TaskDependency, values(
+                models.TaskDependency, row, project_id=new_project_id,
+                blocker_id=task_ids[row["blocker_id"]], blocked_id=task_ids[row["blocked_id"]],
+            ))
+        members = set()
+        for row in document["assignments"]:
+            _insert(db, models.ProjectAssignment, values(models.ProjectAssignment, row, project_id=new_project_id))
+            members.add((row["user_id"], new_project_id))
+        for row in document["payments"]:
+            _insert(db, models.Payment, values(models.Payment, row, project_id=new_project_id))
+        db.delete(archived)
+        version = bump_version(db, MEMBERSHIP_VERSION_KEY) if members else None
+        project = db.get(models.Project, new_project_id)
+        tasks = db.query(models.Task).filter(models.Task.project_id == new_project_id).all()
+        inbox.add_project(db, project, tasks)
+        activity.record(
+            db, actor, "restored", "project", project.id, f"Restored project {project.name} from the archive",
+            project_id=project.id, organization_id=project.organization_id,
+        )
+        return project, tasks, members, version
+
+    project, tasks, members, version = run_write(db, write)
+    for task in tasks:
+        due_tracker.track(task)
+    for user_id, member_project_id in members:
+        memberships.add(user_id, member_project_id, version)
+    dependency_graphs.invalidate(project.id)
+    workload_cache.invalidate()
+    return project
+
+
+def archive_completed_projects(
+    older_than_days: int = ARCHIVE_AFTER_DAYS, organization_id: Optional[int] = None
+) -> list[int]:
+    """Archive every project Completed for longer than older_than_days, in one organization or (None) each one."""
+    if organization_id is None:
+        db = SessionLocal()
+        try:
+            organization_ids = [
+                org_id for (org_id,) in db.query(models.Organization.id).order_by(models.Organization.id)
+            ]
+        finally:
+            db.close()
+    else:
+        organization_ids = [organization_id]
+    archived = []
+    for org_id in organization_ids:
+        db = SessionLocal()
+        # Bound like a request's session: archive_project only finds this organization's projects
+        bind(db, org_id)
+        try:
+            for project_id in due_for_archive(db, org_id, older_than_days):
+                try:
+                    archive_project(db, project_id)
+                except HTTPException:
+                    # Reopened or deleted since it was picked
+                    continue
+                archived.append(project_id)
+        finally:
+            db.close()
+    if archived:
+        logger.info("Archived %d completed projects", len(archived))
+    return archived
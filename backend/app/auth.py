@@ -3,24 +3,38 @@
 # - Create access token with python-jose
 # - get_current_user dependency
 # - Role-based dependency checker
+# - Rotating refresh tokens (HMAC-hashed, revocable) and access-token revocation
+# - Short-lived single-purpose tickets, so access tokens stay out of URLs
+# - The current user's organization scopes the request's session (app/tenancy.py)
 from datetime import datetime, timedelta
+import hashlib
+import hmac
 import os
+import secrets
+import uuid
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
-from app import models
+from app import models, tenancy
 from app.database import get_db
-import os
+from app.revocation import revocations
+from app.tracing import span
+from app.write_queue import run_write
 # Secret key and algorithm for JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret_key")
 ALGORITHM = "HS256" 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+REFRESH_TOKEN_HMAC_KEY = os.getenv("REFRESH_TOKEN_HMAC_KEY", SECRET_KEY).encode()
+TICKET_EXPIRE_SECONDS = int(os.getenv("TICKET_EXPIRE_SECONDS", "60"))
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+# ASGI scope key set only by the in-process batch dispatcher, never from client input
+BATCH_USER_SCOPE_KEY = "app.batch_user"
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 def get_password_hash(password):
@@ -29,8 +43,26 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})   
+    # jti lets a single token be revoked before it expires
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+def decode_token_claims(scope) -> Optional[dict]:
+    """Read the bearer token from a raw ASGI scope without touching the database.
+
+    Used by middleware that only needs to know who is calling (rate limiting),
+    not to authorize the request; routes still go through get_current_user.
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            except JWTError:
+                return None
+    return None
 def get_user(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 def authenticate_user(db: Session, email: str, password: str):
@@ -38,28 +70,113 @@ def authenticate_user(db: Session, email: str, password: str):
     if not user or not verify_password(password, user.hashed_password):
         return False
     return user
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    # Sub-requests of POST /batch reuse the user the batch request already authenticated
+    user = request.scope.get(BATCH_USER_SCOPE_KEY)
+    if user is None:
+        user = get_user_from_token(db, token)
+    tenancy.bind(db, user.organization_id)
+    return user
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+def decode_token(db: Session, token: str, purpose: Optional[str] = None) -> dict:
+    """Claims of a valid, unrevoked token; purpose None means an access token, else a ticket issued for purpose."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        with span("auth.jwt_decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
-        raise credentials_exception
-    user = get_user(db, email=email)
-    if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    # A ticket is only good for its one purpose, never as an access token
+    if payload.get("sub") is None or payload.get("purpose") != purpose:
+        raise _credentials_exception()
+    # Tickets also die with the access token ("sid") they were issued for
+    for jti in (payload.get("jti"), payload.get("sid")):
+        if jti is not None and revocations.is_revoked(db, jti):
+            raise _credentials_exception()
+    return payload
+def get_user_from_token(db: Session, token: str, purpose: Optional[str] = None):
+    return get_user_from_claims(db, decode_token(db, token, purpose))
+def get_user_from_claims(db: Session, payload: dict):
+    user = get_user(db, email=payload["sub"])
+    # Tokens name their organization; one from before a user moved organizations is void
+    org = payload.get("org")
+    if user is None or (org is not None and org != user.organization_id):
+        raise _credentials_exception()
     return user
+def create_ticket(access_claims: dict, purpose: str) -> str:
+    """A TICKET_EXPIRE_SECONDS token for one purpose, e.g. a URL where a header can't go; it names the access token it came from."""
+    return create_access_token(
+        {
+            "sub": access_claims["sub"],
+            "org": access_claims.get("org"),
+            "purpose": purpose,
+            "sid": access_claims.get("jti"),
+            "sid_exp": access_claims["exp"],
+        },
+        expires_delta=timedelta(seconds=TICKET_EXPIRE_SECONDS),
+    )
 def require_role(*allowed_roles: str):
     def role_checker(current_user: models.User = Depends(get_current_user)):
         if current_user.role not in allowed_roles:
             raise HTTPException(status_code=403, detail="Operation not permitted")
         return current_user
     return role_checker
+def _refresh_hash(secret: str) -> str:
+    # Refresh tokens are random, so a keyed SHA-256 is enough; no bcrypt on refresh
+    return hmac.new(REFRESH_TOKEN_HMAC_KEY, secret.encode(), hashlib.sha256).hexdigest()
+def issue_refresh_token(db: Session, user: models.User, family_id: Optional[str] = None) -> str:
+    """Add a refresh token row (the caller commits) and return the "<id>.<secret>" string for the client."""
+    token_id, secret = secrets.token_urlsafe(12), secrets.token_urlsafe(32)
+    db.add(models.RefreshToken(
+        id=token_id,
+        user_id=user.id,
+        family_id=family_id or token_id,
+        token_hash=_refresh_hash(secret),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return f"{token_id}.{secret}"
+def _find_refresh_token(db: Session, raw_token: str) -> Optional[models.RefreshToken]:
+    token_id, _, secret = raw_token.partition(".")
+    row = db.get(models.RefreshToken, token_id) if token_id and secret else None
+    if row is None or not hmac.compare_digest(row.token_hash, _refresh_hash(secret)):
+        return None
+    return row
+def revoke_refresh_family(db: Session, family_id: str):
+    now = datetime.utcnow()
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.family_id == family_id,
+        models.RefreshToken.revoked_at.is_(None)
+    ).update({models.RefreshToken.revoked_at: now}, synchronize_session=False)
+def rotate_refresh_token(db: Session, raw_token: str):
+    """Exchange a refresh token for (user, new refresh token). Reusing a rotated token revokes its whole family."""
+    invalid = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
+    def write(db: Session):
+        row = _find_refresh_token(db, raw_token)
+        if row is None or row.expires_at <= datetime.utcnow():
+            return None
+        user = db.get(models.User, row.user_id)
+        if user is None:
+            return None
+        # Conditional update, so two concurrent refreshes with the same token can't both win
+        rotated = db.query(models.RefreshToken).filter(
+            models.RefreshToken.id == row.id,
+            models.RefreshToken.revoked_at.is_(None)
+        ).update({models.RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+        if not rotated:
+            # A rotated token came back: it was copied, so end every session from that login.
+            # Returning (not raising) keeps the revocation; the caller raises afterwards.
+            revoke_refresh_family(db, row.family_id)
+            return None
+        new_token = issue_refresh_token(db, user, family_id=row.family_id)
+        row.replaced_by = new_token.partition(".")[0]
+        return user, new_token
 
+    result = run_write(db, write)
+    if result is None:
+        raise invalid
+    return result
@@ -0,0 +1,262 @@
+# Online backups of the SQLite database.
+# - The API keeps serving while a backup runs: pages are copied with SQLite's
+#   online backup API, BACKUP_PAGES_PER_STEP at a time, sleeping
+#   BACKUP_STEP_SLEEP_MS between steps so the copy never holds the database
+#   for long. A write from another connection makes SQLite start the copy
+#   over; after BACKUP_MAX_RESTARTS the rest is copied in a single step
+# - Databases in WAL mode use VACUUM INTO instead: one read transaction on a
+#   snapshot, which never blocks writers and is never restarted
+# - The copy is checked (PRAGMA quick_check), gzip-compressed and written as
+#   BACKUP_DIR/database-<UTC timestamp>.db.gz with a sha256sum-style
+#   .sha256 file next to it; only the newest BACKUP_KEEP are kept
+# - Runs on its own thread; one backup at a time per worker
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_METHOD = os.getenv("BACKUP_METHOD", "auto").lower()  # auto, online or vacuum
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+BACKUP_STEP_SLEEP_MS = float(os.getenv("BACKUP_STEP_SLEEP_MS", "5"))
+BACKUP_MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", "5"))
+BACKUP_COMPRESSION_LEVEL = int(os.getenv("BACKUP_COMPRESSION_LEVEL", "6"))
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_INTERVAL_HOURS = float(os.getenv("BACKUP_INTERVAL_HOURS", "0"))
+
+SUFFIX = ".db.gz"
+CHUNK_SIZE = 1024 * 1024
+
+
+class BackupError(Exception):
+    pass
+
+
+@dataclass
+class Backup:
+    name: str
+    status: str = "running"  # running, done or failed
+    method: Optional[str] = None
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    database_size: Optional[int] = None
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+    restarts: int = 0
+    error: Optional[str] = None
+
+
+def database_path() -> Optional[str]:
+    """Path of the SQLite database file, or None for other databases and in-memory SQLite."""
+    if engine.dialect.name != "sqlite":
+        return None
+    path = engine.url.database
+    if not path or path == ":memory:" or path.startswith("file:"):
+        return None
+    return os.path.abspath(path)
+
+
+def _copy_online(source: sqlite3.Connection, target_path: str, backup: Backup):
+    target = sqlite3.connect(target_path)
+    state = {"remaining": None}
+
+    def progress(status, remaining, total):
+        # remaining grows again when a write elsewhere made SQLite restart the copy
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            backup.restarts += 1
+            if backup.restarts > BACKUP_MAX_RESTARTS:
+                raise BackupError("restarted too often")
+        state["remaining"] = remaining
+        # The database is free for requests between steps
+        time.sleep(BACKUP_STEP_SLEEP_MS / 1000)
+
+    try:
+        try:
+            source.backup(target, pages=BACKUP_PAGES_PER_STEP, progress=progress)
+        except BackupError:
+            logger.warning("Backup %s restarted %d times; copying the rest in one step", backup.name, backup.restarts)
+            source.backup(target, pages=-1)
+    finally:
+        target.close()
+
+
+def _copy_vacuum(source: sqlite3.Connection, target_path: str):
+    source.execute("VACUUM INTO ?", (target_path,))
+
+
+class _HashingWriter:
+    """File wrapper hashing what is written, so the checksum needs no second read."""
+
+    def __init__(self, out, digest):
+        self._out = out
+        self._digest = digest
+
+    def write(self, data):
+        self._digest.update(data)
+        return self._out.write(data)
+
+    def flush(self):
+        self._out.flush()
+
+
+def _compress(path: str, target_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as raw, open(target_path, "wb") as out:
+        with gzip.GzipFile(filename=os.path.basename(path), mode="wb", fileobj=_HashingWriter(out, digest),
+                           compresslevel=BACKUP_COMPRESSION_LEVEL, mtime=0) as gz:
+            shutil.copyfileobj(raw, gz, CHUNK_SIZE)
+    return digest.hexdigest()
+
+
+def run_backup(backup: Backup, backup_dir: str = BACKUP_DIR) -> Backup:
+    path = database_path()
+    if path is None:
+        raise BackupError("Built-in backups need a SQLite database file")
+    os.makedirs(backup_dir, exist_ok=True)
+    copy_path = os.path.join(backup_dir, backup.name + ".db.partial")
+    gz_path = os.path.join(backup_dir, backup.name + SUFFIX)
+    try:
+        source = sqlite3.connect(path, check_same_thread=False)
+        try:
+            journal_mode = source.execute("PRAGMA journal_mode").fetchone()[0].lower()
+            method = BACKUP_METHOD if BACKUP_METHOD != "auto" else ("vacuum" if journal_mode == "wal" else "online")
+            backup.method = method
+            if os.path.exists(copy_path):
+                os.remove(copy_path)
+            if method == "vacuum":
+                _copy_vacuum(source, copy_path)
+            else:
+                _copy_online(source, copy_path, backup)
+        finally:
+            source.close()
+        check = sqlite3.connect(copy_path)
+        try:
+            result = check.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            check.close()
+        if result != "ok":
+            raise BackupError(f"quick_check failed: {result}")
+        backup.database_size = os.path.getsize(copy_path)
+        backup.sha256 = _compress(copy_path, gz_path + ".partial")
+        os.replace(gz_path + ".partial", gz_path)
+        with open(gz_path + ".sha256", "w") as f:
+            f.write(f"{backup.sha256}  {os.path.basename(gz_path)}\n")
+        backup.size = os.path.getsize(gz_path)
+        backup.status = "done"
+    except Exception as exc:
+        backup.status = "failed"
+        backup.error = str(exc)
+        for leftover in (gz_path + ".partial", gz_path, gz_path + ".sha256"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    finally:
+        if os.path.exists(copy_path):
+            os.remove(copy_path)
+        backup.finished_at = datetime.utcnow()
+    prune(backup_dir)
+    logger.info(
+        "Backup %s done (%s, %d restarts): %d bytes -> %d bytes",
+        backup.name, backup.method, backup.restarts, backup.database_size, backup.size,
+    )
+    return backup
+
+
+def new_backup() -> Backup:
+    return Backup(name="database-" + datetime.utcnow().strftime("%Y%m%d-%H%M%S-%f"))
+
+
+def list_backups(backup_dir: str = BACKUP_DIR) -> list[Backup]:
+    """Finished backups, newest first."""
+    if not os.path.isdir(backup_dir):
+        return []
+    found = []
+    for filename in sorted(os.listdir(backup_dir), reverse=True):
+        if not filename.endswith(SUFFIX):
+            continue
+        path = os.path.join(backup_dir, filename)
+        sha256 = None
+        if os.path.exists(path + ".sha256"):
+            with open(path + ".sha256") as f:
+                sha256 = f.read().split(" ", 1)[0] or None
+        stat = os.stat(path)
+        finished_at = datetime.utcfromtimestamp(stat.st_mtime)
+        found.append(Backup(
+            name=filename[:-len(SUFFIX)], status="done", started_at=finished_at, finished_at=finished_at,
+            size=stat.st_size, sha256=sha256,
+        ))
+    return found
+
+
+def backup_file(name: str, backup_dir: str = BACKUP_DIR) -> Optional[str]:
+    # Names come from the URL: only plain names of existing backups
+    if os.path.basename(name) != name or not name.startswith("database-"):
+        return None
+    path = os.path.join(backup_dir, name + SUFFIX)
+    return path if os.path.exists(path) else None
+
+
+def verify(path: str) -> bool:
+    """True if the file still matches the checksum written with it."""
+    with open(path + ".sha256") as f:
+        expected = f.read().split(" ", 1)[0]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest() == expected
+
+
+def prune(backup_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP):
+    for old in list_backups(backup_dir)[keep:]:
+        path = os.path.join(backup_dir, old.name + SUFFIX)
+        for stale in (path, path + ".sha256"):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+
+class BackupRunner:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current: Optional[Backup] = None
+        self.last: Optional[Backup] = None
+
+    def start(self) -> Optional[Backup]:
+        """Start a backup on its own thread, or return None if one is already running in this worker."""
+        with self._lock:
+            if self.current is not None:
+                return None
+            if database_path() is None:
+                raise BackupError("Built-in backups need a SQLite database file")
+            backup = self.current = new_backup()
+        threading.Thread(target=self._run, args=(backup,), name="backup", daemon=True).start()
+        return backup
+
+    def _run(self, backup: Backup):
+        try:
+            run_backup(backup)
+        except Exception:
+            logger.exception("Backup %s failed", backup.name)
+        finally:
+            with self._lock:
+                self.current = None
+                self.last = backup
+
+
+backups = BackupRunner()
+
+
+def scheduled_backup():
+    """Scheduled job (BACKUP_INTERVAL_HOURS > 0)."""
+    if backups.start() is None:
+        logger.info("Skipping scheduled backup: one is already running")
@@ -0,0 +1,24 @@
+# Version counters for in-memory caches shared by several workers.
+# Writers bump a named row in the same transaction as the change; readers
+# compare it with the version their copy was built from and reload on mismatch.
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app import models
+
+
+def bump_version(db: Session, name: str) -> int:
+    """Increment a cache version in the caller's transaction and return the new value."""
+    result = db.execute(
+        update(models.CacheVersion)
+        .where(models.CacheVersion.name == name)
+        .values(version=models.CacheVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        db.add(models.CacheVersion(name=name, version=1))
+        db.flush()
+        return 1
+    return db.query(models.CacheVersion.version).filter(models.CacheVersion.name == name).scalar()
+
+
+def read_version(db: Session, name: str) -> int:
+    return db.query(models.CacheVersion.version).filter(models.CacheVersion.name == name).scalar() or 0
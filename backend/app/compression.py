@@ -0,0 +1,176 @@
+# Negotiated response compression.
+# - zstd / brotli / gzip, picked from Accept-Encoding (zstd and brotli only if installed)
+# - Small bodies (below COMPRESSION_MIN_SIZE) are sent as-is
+# - Streaming responses are compressed chunk by chunk and flushed per chunk,
+#   so clients still receive data progressively
+# - A strong ETag on a compressed response gets the coding appended ("3" ->
+#   "3-gzip"): it names different bytes than the identity response, so caches
+#   must not treat the two as interchangeable. Weak ETags are left as they are
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self):
+        self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.process(data) + self._obj.finish()
+
+
+class _ZstdEncoder:
+    name = "zstd"
+
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+def encoded_etag(tag: str, coding: str) -> str:
+    """The strong ETag of the coding's representation; weak tags already allow any encoding."""
+    if tag.startswith("W/") or len(tag) < 2 or not tag.endswith('"'):
+        return tag
+    return f'{tag[:-1]}-{coding}"'
+
+
+# Every coding an encoded_etag() may name, whether or not its library is installed here
+CONTENT_CODINGS = (_ZstdEncoder.name, _BrotliEncoder.name, _GzipEncoder.name)
+
+# Server preference order when the client accepts several encodings equally
+ENCODERS = {"gzip": _GzipEncoder}
+if brotli is not None:
+    ENCODERS = {"br": _BrotliEncoder, **ENCODERS}
+if zstandard is not None:
+    ENCODERS = {"zstd": _ZstdEncoder, **ENCODERS}
+
+
+def negotiate_encoding(accept_encoding: str):
+    """Pick the best available encoder class for an Accept-Encoding header, or None."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            weights[coding] = q
+    best, best_q = None, 0.0
+    for name, encoder in ENCODERS.items():
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoder, q
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoder_cls = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoder_cls is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Hold the headers until the first body chunk tells us whether to compress
+                    start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                encoder = encoder_cls()
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["Content-Encoding"] = encoder.name
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoder.name)
+                if not more_body:
+                    compressed = encoder.finish(body)
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send(start_message)
+            if more_body:
+                await send({"type": "http.response.body", "body": encoder.compress(body), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": encoder.finish(body)})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,286 @@
+# Task dependencies and per-project critical paths.
+# - A task's projected finish is the latest of its own due date and the
+#   projected finishes of the open tasks blocking it; Done tasks block nothing
+# - The critical path is the chain of blockers behind the latest projected finish
+# - Each project's graph is loaded once (two indexed queries + a topological
+#   sort) and then kept up to date per write: a changed task or edge only
+#   recomputes its descendants, in topological order, stopping where nothing changed
+# - Graphs are process-local and reloaded after CRITICAL_PATH_TTL_SECONDS so
+#   writes made by other workers are picked up
+# - New edges are checked for cycles against the database (would_cycle), never
+#   a cached graph, so no worker can commit a cycle
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import models
+from app.tenancy import ALL_ORGANIZATIONS, project_organization
+
+CRITICAL_PATH_TTL_SECONDS = int(os.getenv("CRITICAL_PATH_TTL_SECONDS", "300"))
+
+
+class DependencyCycleError(ValueError):
+    pass
+
+
+@dataclass
+class TaskNode:
+    due_date: Optional[datetime]
+    is_open: bool
+
+
+class ProjectGraph:
+    def __init__(self, project_id: int):
+        self.project_id = project_id
+        self.nodes: dict[int, TaskNode] = {}
+        self.preds: dict[int, set[int]] = {}
+        self.succs: dict[int, set[int]] = {}
+        self.finish: dict[int, Optional[datetime]] = {}
+        # The blocker that determined each task's projected finish (None: its own due date)
+        self.driver: dict[int, Optional[int]] = {}
+        self.loaded = False
+        self.loaded_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def load(self, db: Session):
+        tasks = (
+            db.query(models.Task.id, models.Task.due_date, models.Task.status)
+            .filter(
+                models.Task.organization_id == project_organization(self.project_id),
+                models.Task.project_id == self.project_id,
+            )
+            .execution_options(**ALL_ORGANIZATIONS)
+        )
+        for task_id, due_date, status in tasks:
+            self._add_node(task_id, due_date, status)
+        edges = (
+            db.query(models.TaskDependency.blocker_id, models.TaskDependency.blocked_id)
+            .filter(models.TaskDependency.project_id == self.project_id)
+        )
+        for blocker_id, blocked_id in edges:
+            if blocker_id in self.nodes and blocked_id in self.nodes:
+                self.succs[blocker_id].add(blocked_id)
+                self.preds[blocked_id].add(blocker_id)
+        self._recompute(self.nodes.keys(), everything=True)
+        self.loaded = True
+
+    def _add_node(self, task_id: int, due_date, status):
+        self.nodes[task_id] = TaskNode(due_date, status != models.TaskStatus.Done)
+        self.preds.setdefault(task_id, set())
+        self.succs.setdefault(task_id, set())
+
+    def would_cycle(self, blocker_id: int, blocked_id: int) -> bool:
+        """True if blocked_id already (transitively) blocks blocker_id."""
+        if blocker_id == blocked_id:
+            return True
+        seen = {blocked_id}
+        stack = [blocked_id]
+        while stack:
+            for succ in self.succs[stack.pop()]:
+                if succ == blocker_id:
+                    return True
+                if succ not in seen:
+                    seen.add(succ)
+                    stack.append(succ)
+        return False
+
+    def set_task(self, task_id: int, due_date, status):
+        node = self.nodes.get(task_id)
+        if node is not None and node.due_date == due_date and node.is_open == (status != models.TaskStatus.Done):
+            return
+        self._add_node(task_id, due_date, status)
+        self._recompute([task_id])
+
+    def remove_task(self, task_id: int):
+        if task_id not in self.nodes:
+            return
+        for pred in self.preds.pop(task_id):
+            self.succs[pred].discard(task_id)
+        successors = self.succs.pop(task_id)
+        for succ in successors:
+            self.preds[succ].discard(task_id)
+        del self.nodes[task_id]
+        self.finish.pop(task_id, None)
+        self.driver.pop(task_id, None)
+        self._recompute(successors)
+
+    def add_edge(self, blocker_id: int, blocked_id: int):
+        if self.would_cycle(blocker_id, blocked_id):
+            raise DependencyCycleError(f"Task {blocker_id} is already blocked by task {blocked_id}")
+        self.succs[blocker_id].add(blocked_id)
+        self.preds[blocked_id].add(blocker_id)
+        self._recompute([blocked_id])
+
+    def remove_edge(self, blocker_id: int, blocked_id: int):
+        self.succs.get(blocker_id, set()).discard(blocked_id)
+        self.preds.get(blocked_id, set()).discard(blocker_id)
+        if blocked_id in self.nodes:
+            self._recompute([blocked_id])
+
+    def _compute(self, task_id: int):
+        node = self.nodes[task_id]
+        if not node.is_open:
+            return None, None
+        finish, driver = node.due_date, None
+        for pred in self.preds[task_id]:
+            pred_finish = self.finish.get(pred)
+            if pred_finish is not None and (finish is None or pred_finish > finish):
+                finish, driver = pred_finish, pred
+        return finish, driver
+
+    def _recompute(self, start_ids, everything: bool = False):
+        """Recompute start_ids and their descendants in topological order (Kahn over the affected subgraph)."""
+        if everything:
+            affected = set(self.nodes)
+        else:
+            affected = set()
+            stack = [task_id for task_id in start_ids if task_id in self.nodes]
+            while stack:
+                task_id = stack.pop()
+                if task_id not in affected:
+                    affected.add(task_id)
+                    stack.extend(self.succs[task_id])
+        dirty = set(start_ids) if not everything else affected
+        indegree = {task_id: sum(1 for p in self.preds[task_id] if p in affected) for task_id in affected}
+        ready = deque(task_id for task_id, degree in indegree.items() if degree == 0)
+        while ready:
+            task_id = ready.popleft()
+            if task_id in dirty:
+                finish, self.driver[task_id] = self._compute(task_id)
+                if task_id not in self.finish or self.finish[task_id] != finish:
+                    self.finish[task_id] = finish
+                    dirty.update(self.succs[task_id])
+            for succ in self.succs[task_id]:
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    ready.append(succ)
+
+    def critical_path(self) -> tuple[Optional[datetime], list[int]]:
+        end_finish = max((finish for finish in self.finish.values() if finish is not None), default=None)
+        if end_finish is None:
+            return None, []
+        # On ties, end at the task that isn't itself the blocker of another tied task
+        ends = [task_id for task_id, finish in self.finish.items() if finish == end_finish]
+        drivers = {self.driver.get(task_id) for task_id in ends}
+        end = min((task_id for task_id in ends if task_id not in drivers), default=min(ends))
+        path = []
+        while end is not None:
+            path.append(end)
+            end = self.driver.get(end)
+        path.reverse()
+        return end_finish, path
+
+    def late_tasks(self) -> list[int]:
+        """Open tasks whose blockers push their projected finish past their own due date."""
+        return sorted(
+            task_id for task_id, node in self.nodes.items()
+            if node.due_date is not None and self.finish.get(task_id) is not None
+            and self.finish[task_id] > node.due_date
+        )
+
+
+def would_cycle(db: Session, project_id: int, blocker_id: int, blocked_id: int) -> bool:
+    """
+    True if blocked_id already (transitively) blocks blocker_id. Walks the
+    edges in the database with a recursive CTE rather than a cached graph, so
+    inside a write it sees every committed edge, whichever worker added it.
+    """
+    if blocker_id == blocked_id:
+        return True
+    edge = models.TaskDependency
+    reachable = (
+        select(edge.blocked_id.label("task_id"))
+        .where(edge.project_id == project_id, edge.blocker_id == blocked_id)
+        .cte("reachable", recursive=True)
+    )
+    # UNION (not UNION ALL) stops at tasks already reached
+    reachable = reachable.union(
+        select(edge.blocked_id)
+        .join(reachable, edge.blocker_id == reachable.c.task_id)
+        .where(edge.project_id == project_id)
+    )
+    return db.execute(select(reachable.c.task_id).where(reachable.c.task_id == blocker_id).limit(1)).first() is not None
+
+
+class DependencyGraphs:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._graphs: dict[int, ProjectGraph] = {}
+
+    @contextmanager
+    def _graph(self, project_id: int, db: Optional[Session] = None):
+        """
+        Yield the project's graph with its lock held. With a session, an
+        unloaded or expired graph is (re)loaded first; without one (write
+        hooks), None is yielded unless the graph is already loaded.
+        """
+        with self._lock:
+            graph = self._graphs.get(project_id)
+            if db is not None and (graph is None or time.monotonic() - graph.loaded_at > CRITICAL_PATH_TTL_SECONDS):
+                graph = ProjectGraph(project_id)
+                self._graphs[project_id] = graph
+        if graph is None:
+            yield None
+            return
+        with graph.lock:
+            if not graph.loaded:
+                if db is None:
+                    yield None
+                    return
+                try:
+                    graph.load(db)
+                except Exception:
+                    self.invalidate(project_id)
+                    raise
+            yield graph
+
+    def critical_path(self, db: Session, project_id: int) -> dict:
+        """Projected finish, critical path task ids (first blocker first) and late tasks."""
+        with self._graph(project_id, db) as graph:
+            finish, path = graph.critical_path()
+            return {
+                "earliest_finish": finish,
+                "path": [(task_id, graph.finish[task_id]) for task_id in path],
+                "late": [(task_id, graph.finish[task_id]) for task_id in graph.late_tasks()],
+            }
+
+    def track(self, task: models.Task, old_project_id: Optional[int] = None):
+        """Update a loaded graph after a task write (create, due date/status change or move)."""
+        if old_project_id is not None and old_project_id != task.project_id:
+            self.untrack(task.id, old_project_id)
+        with self._graph(task.project_id) as graph:
+            if graph is not None:
+                graph.set_task(task.id, task.due_date, task.status)
+
+    def untrack(self, task_id: int, project_id: int):
+        with self._graph(project_id) as graph:
+            if graph is not None:
+                graph.remove_task(task_id)
+
+    def add_edge(self, project_id: int, blocker_id: int, blocked_id: int):
+        with self._graph(project_id) as graph:
+            if graph is None:
+                return
+            try:
+                graph.add_edge(blocker_id, blocked_id)
+            except DependencyCycleError:
+                # Lost a race with another writer; rebuild from the database on next read
+                self.invalidate(project_id)
+
+    def remove_edge(self, project_id: int, blocker_id: int, blocked_id: int):
+        with self._graph(project_id) as graph:
+            if graph is not None:
+                graph.remove_edge(blocker_id, blocked_id)
+
+    def invalidate(self, project_id: int):
+        with self._lock:
+            self._graphs.pop(project_id, None)
+
+
+dependency_graphs = DependencyGraphs()
@@ -17,6 +17,10 @@ DATABASE_URL = os.getenv(
 if DATABASE_URL.startswith("postgresql"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg2://")
 
+# Journal mode set on startup when given (e.g. WAL: readers and online backups never block the writer).
+# It is stored in the database file, so it stays set until changed
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "")
+
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
@@ -0,0 +1,208 @@
+# Overdue / due-soon task tracking.
+# - A scheduled refresh loads open tasks due before now + DUE_SOON_DAYS with
+#   index range scans on (organization_id, status, due_date), never the whole tasks table
+# - Results are kept in memory, indexed by assignee and by project
+# - Task writes update single entries between refreshes
+# - Listeners are called when a task becomes due soon or overdue
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import models
+from app.database import SessionLocal
+from app.tenancy import ALL_ORGANIZATIONS
+
+logger = logging.getLogger(__name__)
+
+DUE_SOON_DAYS = int(os.getenv("DUE_SOON_DAYS", "3"))
+DUE_REFRESH_SECONDS = int(os.getenv("DUE_REFRESH_SECONDS", "60"))
+
+OPEN_STATUSES = (models.TaskStatus.ToDo, models.TaskStatus.InProgress)
+
+OVERDUE = "overdue"
+DUE_SOON = "due_soon"
+
+
+@dataclass(frozen=True)
+class DueTask:
+    """Snapshot of the task columns needed to answer due-date queries."""
+    id: int
+    title: str
+    description: Optional[str]
+    project_id: int
+    assigned_to: Optional[int]
+    status: models.TaskStatus
+    due_date: datetime
+    created_at: datetime
+    version: int
+    organization_id: int
+
+    @staticmethod
+    def from_task(task: models.Task) -> "DueTask":
+        return DueTask(
+            id=task.id,
+            title=task.title,
+            description=task.description,
+            project_id=task.project_id,
+            assigned_to=task.assigned_to,
+            status=task.status,
+            due_date=task.due_date,
+            created_at=task.created_at,
+            version=task.version,
+            organization_id=task.organization_id,
+        )
+
+
+def classify(due_date: Optional[datetime], status, now: datetime) -> Optional[str]:
+    if due_date is None or status not in OPEN_STATUSES:
+        return None
+    if due_date < now:
+        return OVERDUE
+    if due_date < now + timedelta(days=DUE_SOON_DAYS):
+        return DUE_SOON
+    return None
+
+
+class DueDateTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[int, tuple[str, DueTask]] = {}
+        self._by_user: dict[str, dict[int, set[int]]] = {OVERDUE: {}, DUE_SOON: {}}
+        self._by_project: dict[str, dict[int, set[int]]] = {OVERDUE: {}, DUE_SOON: {}}
+        self._listeners: list[Callable[[str, DueTask], None]] = []
+        self.refreshed_at = 0.0
+
+    def add_listener(self, callback: Callable[[str, DueTask], None]):
+        """callback(kind, task) runs when a task newly becomes OVERDUE or DUE_SOON."""
+        self._listeners.append(callback)
+
+    def refresh(self, db: Session):
+        now = datetime.utcnow()
+        tasks = (
+            db.query(models.Task)
+            .filter(
+                # Every organization, each an index range on (organization_id, status, due_date)
+                models.Task.organization_id.in_(select(models.Organization.id)),
+                models.Task.status.in_(OPEN_STATUSES),
+                models.Task.due_date < now + timedelta(days=DUE_SOON_DAYS),
+            )
+            .execution_options(**ALL_ORGANIZATIONS)
+            .all()
+        )
+        fresh = {}
+        for task in tasks:
+            kind = classify(task.due_date, task.status, now)
+            if kind is not None:
+                fresh[task.id] = (kind, DueTask.from_task(task))
+        with self._lock:
+            # The first load only warms the tracker; it is not a threshold crossing
+            crossed = [] if self.refreshed_at == 0.0 else [
+                entry for task_id, entry in fresh.items()
+                if self._entries.get(task_id, (None,))[0] != entry[0]
+            ]
+            self._entries = fresh
+            self._rebuild_indexes()
+            self.refreshed_at = time.monotonic()
+        self._emit(crossed)
+
+    def ensure_fresh(self, db: Session):
+        """Refresh inline when the scheduler hasn't run recently (e.g. it is disabled in this worker)."""
+        if time.monotonic() - self.refreshed_at > DUE_REFRESH_SECONDS * 2:
+            self.refresh(db)
+
+    def track(self, task: models.Task):
+        """Update one task's entry after a write."""
+        kind = classify(task.due_date, task.status, datetime.utcnow())
+        with self._lock:
+            previous = self._entries.get(task.id)
+            if previous is not None:
+                self._unindex(previous[0], previous[1])
+                del self._entries[task.id]
+            if kind is None:
+                return
+            entry = (kind, DueTask.from_task(task))
+            self._entries[task.id] = entry
+            self._index(kind, entry[1])
+        if previous is None or previous[0] != kind:
+            self._emit([entry])
+
+    def untrack(self, task_id: int):
+        with self._lock:
+            previous = self._entries.pop(task_id, None)
+            if previous is not None:
+                self._unindex(previous[0], previous[1])
+
+    def for_user(self, kind: str, user_id: int, days: Optional[int] = None) -> list[DueTask]:
+        with self._lock:
+            return self._collect(kind, self._by_user[kind].get(user_id, ()), days)
+
+    def for_projects(self, kind: str, project_ids, days: Optional[int] = None) -> list[DueTask]:
+        with self._lock:
+            task_ids = set()
+            for project_id in project_ids:
+                task_ids.update(self._by_project[kind].get(project_id, ()))
+            return self._collect(kind, task_ids, days)
+
+    def for_organization(self, kind: str, organization_id: int, days: Optional[int] = None) -> list[DueTask]:
+        with self._lock:
+            task_ids = [
+                task_id for task_id, (_, task) in self._entries.items() if task.organization_id == organization_id
+            ]
+            return self._collect(kind, task_ids, days)
+
+    def _collect(self, kind, task_ids, days):
+        horizon = datetime.utcnow() + timedelta(days=days) if days is not None else None
+        tasks = []
+        for task_id in task_ids:
+            entry_kind, task = self._entries[task_id]
+            if entry_kind == kind and (horizon is None or task.due_date < horizon):
+                tasks.append(task)
+        tasks.sort(key=lambda t: (t.due_date, t.id))
+        return tasks
+
+    def _rebuild_indexes(self):
+        self._by_user = {OVERDUE: {}, DUE_SOON: {}}
+        self._by_project = {OVERDUE: {}, DUE_SOON: {}}
+        for kind, task in self._entries.values():
+            self._index(kind, task)
+
+    def _index(self, kind: str, task: DueTask):
+        if task.assigned_to is not None:
+            self._by_user[kind].setdefault(task.assigned_to, set()).add(task.id)
+        self._by_project[kind].setdefault(task.project_id, set()).add(task.id)
+
+    def _unindex(self, kind: str, task: DueTask):
+        if task.assigned_to is not None:
+            self._by_user[kind].get(task.assigned_to, set()).discard(task.id)
+        self._by_project[kind].get(task.project_id, set()).discard(task.id)
+
+    def _emit(self, entries):
+        for kind, task in entries:
+            for callback in self._listeners:
+                try:
+                    callback(kind, task)
+                except Exception:
+                    logger.exception("Due-date listener failed for task %s", task.id)
+
+
+due_tracker = DueDateTracker()
+
+
+def refresh_due_tasks():
+    db = SessionLocal()
+    try:
+        due_tracker.refresh(db)
+    finally:
+        db.close()
+
+
+def log_due_event(kind: str, task: DueTask):
+    logger.info("Task %s is %s (due %s)", task.id, kind.replace("_", " "), task.due_date)
+
+
+due_tracker.add_listener(log_due_event)
@@ -0,0 +1,84 @@
+# Sparse fieldsets (?fields=) and embedded relations (?include=) for read endpoints.
+# - fields=id,name loads only those columns (load_only), so the SELECT lists them alone
+# - include=client eager-loads a many-to-one relation with a JOIN in the same
+#   query, limited to the related columns that get embedded
+# - Routes return the projected dicts directly; without either parameter they
+#   keep using their full response models
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import joinedload, load_only
+
+
+@dataclass(frozen=True)
+class Relation:
+    attribute: Any
+    columns: tuple
+
+
+@dataclass(frozen=True)
+class Selection:
+    fields: tuple[str, ...]
+    include: tuple[str, ...]
+
+
+@dataclass
+class FieldSet:
+    model: Any
+    fields: tuple[str, ...]
+    # Fields whose API value differs from the column value (e.g. enums)
+    serializers: dict[str, Callable] = field(default_factory=dict)
+    relations: dict[str, Relation] = field(default_factory=dict)
+
+    def parse(self, fields: Optional[str], include: Optional[str]) -> Optional[Selection]:
+        """None when neither parameter is given (the route's full response applies)."""
+        if fields is None and include is None:
+            return None
+        requested = self._split(fields, self.fields, "field") if fields is not None else list(self.fields)
+        included = self._split(include, self.relations, "include") if include is not None else []
+        if "id" not in requested:
+            requested.insert(0, "id")
+        return Selection(tuple(requested), tuple(included))
+
+    @staticmethod
+    def _split(value: str, allowed, kind: str) -> list[str]:
+        names = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown {kind}(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+            )
+        return names
+
+    def apply(self, query, selection: Selection, *required):
+        """Restrict the query to the selected columns (plus any the route itself needs) and join includes."""
+        columns = [getattr(self.model, name) for name in selection.fields] + list(required)
+        options = [load_only(*columns)]
+        for name in selection.include:
+            relation = self.relations[name]
+            options.append(joinedload(relation.attribute).load_only(*relation.columns))
+        return query.options(*options)
+
+    def dump(self, obj, selection: Selection) -> dict:
+        data = {}
+        for name in selection.fields:
+            value = getattr(obj, name)
+            serializer = self.serializers.get(name)
+            data[name] = serializer(value) if serializer is not None and value is not None else value
+        for name in selection.include:
+            relation = self.relations[name]
+            related = getattr(obj, relation.attribute.key)
+            data[name] = None if related is None else {
+                column.key: getattr(related, column.key) for column in relation.columns
+            }
+        return data
+
+    def respond(self, objects, selection: Selection) -> JSONResponse:
+        if isinstance(objects, list):
+            content = [self.dump(obj, selection) for obj in objects]
+        else:
+            content = self.dump(objects, selection)
+        return JSONResponse(jsonable_encoder(content))
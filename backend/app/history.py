@@ -0,0 +1,179 @@
+# Status history and burndown snapshots.
+# - Every task/project status change appends a status_transitions row
+# - Each task status change also adjusts today's per-project snapshot of task
+#   counts by status, so burndown charts read pre-aggregated rows
+# - A project's first snapshot is seeded with one grouped count over its tasks;
+#   after that rows are carried forward from the previous day
+# Call these after db.flush() and before the route's commit; the daily
+# carry-forward job writes through the write queue like the routes do.
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import models
+from app.database import SessionLocal
+from app.tenancy import project_organization
+from app.write_queue import run_write
+
+SNAPSHOT_COLUMNS = {
+    models.TaskStatus.ToDo: "todo",
+    models.TaskStatus.InProgress: "in_progress",
+    models.TaskStatus.Done: "done",
+}
+
+
+def _today() -> date:
+    # Same clock as the utcnow() timestamps used everywhere else
+    return datetime.utcnow().date()
+
+
+def _latest_snapshot(db: Session, project_id: int, before: Optional[date] = None):
+    query = db.query(models.ProjectStatusSnapshot).filter(models.ProjectStatusSnapshot.project_id == project_id)
+    if before is not None:
+        query = query.filter(models.ProjectStatusSnapshot.day < before)
+    return query.order_by(models.ProjectStatusSnapshot.day.desc()).first()
+
+
+def _ensure_today(db: Session, project_id: int) -> bool:
+    """Make sure today's snapshot row exists. Returns True if it was seeded from live counts."""
+    today = _today()
+    snapshot = models.ProjectStatusSnapshot
+    if db.query(snapshot.id).filter(snapshot.project_id == project_id, snapshot.day == today).first():
+        return False
+    previous = _latest_snapshot(db, project_id, before=today)
+    seeded = previous is None
+    if seeded:
+        counts = dict(
+            db.query(models.Task.status, func.count(models.Task.id))
+            # The daily job's session is unscoped; naming the organization keeps this on its index
+            .filter(
+                models.Task.organization_id == project_organization(project_id),
+                models.Task.project_id == project_id,
+            )
+            .group_by(models.Task.status)
+            .all()
+        )
+        values = {column: counts.get(status, 0) for status, column in SNAPSHOT_COLUMNS.items()}
+    else:
+        values = {column: getattr(previous, column) for column in SNAPSHOT_COLUMNS.values()}
+    try:
+        with db.begin_nested():
+            db.add(snapshot(project_id=project_id, day=today, **values))
+    except IntegrityError:
+        # Another request created today's row first; adjust that one instead
+        return False
+    return seeded
+
+
+def _adjust(db: Session, project_id: int, status: models.TaskStatus, delta: int):
+    column = SNAPSHOT_COLUMNS[status]
+    snapshot = models.ProjectStatusSnapshot
+    db.execute(
+        update(snapshot)
+        .where(snapshot.project_id == project_id, snapshot.day == _today())
+        .values({column: getattr(snapshot, column) + delta})
+    )
+
+
+def _move_counts(db: Session, old_project_id, old_status, new_project_id, new_status):
+    # A freshly seeded row already reflects the flushed change, so it needs no adjustment
+    seeded = set()
+    if old_project_id is not None and old_status is not None:
+        if _ensure_today(db, old_project_id):
+            seeded.add(old_project_id)
+        else:
+            _adjust(db, old_project_id, old_status, -1)
+    if new_project_id is not None and new_status is not None and new_project_id not in seeded:
+        if not _ensure_today(db, new_project_id):
+            _adjust(db, new_project_id, new_status, 1)
+
+
+def record_task_change(
+    db: Session,
+    task: models.Task,
+    old_status: Optional[models.TaskStatus],
+    old_project_id: Optional[int],
+    user: Optional[models.User],
+):
+    """Record a task create/update. Pass None for the old values on create."""
+    new_status, new_project_id = task.status, task.project_id
+    if old_status != new_status:
+        db.add(models.StatusTransition(
+            entity_type="task",
+            entity_id=task.id,
+            project_id=new_project_id,
+            from_status=old_status.name if old_status else None,
+            to_status=new_status.name,
+            changed_by=user.id if user else None,
+        ))
+    if old_status != new_status or old_project_id != new_project_id:
+        _move_counts(db, old_project_id, old_status, new_project_id, new_status)
+
+
+def record_task_deleted(db: Session, project_id: int, status: models.TaskStatus):
+    _move_counts(db, project_id, status, None, None)
+
+
+def record_project_status(
+    db: Session,
+    project: models.Project,
+    old_status: Optional[models.ProjectStatus],
+    user: Optional[models.User],
+):
+    if old_status == project.status:
+        return
+    db.add(models.StatusTransition(
+        entity_type="project",
+        entity_id=project.id,
+        project_id=project.id,
+        from_status=old_status.name if old_status else None,
+        to_status=project.status.name,
+        changed_by=user.id if user else None,
+    ))
+
+
+def burndown(db: Session, project_id: int, days: int) -> list[dict]:
+    """Daily counts for the last `days` days, carrying the last known row over days without changes."""
+    today = _today()
+    start = today - timedelta(days=days - 1)
+    rows = {
+        row.day: row for row in db.query(models.ProjectStatusSnapshot).filter(
+            models.ProjectStatusSnapshot.project_id == project_id,
+            models.ProjectStatusSnapshot.day >= start
+        )
+    }
+    current = _latest_snapshot(db, project_id, before=start)
+    series = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        current = rows.get(day, current)
+        counts = {column: getattr(current, column) if current else 0 for column in SNAPSHOT_COLUMNS.values()}
+        total = sum(counts.values())
+        series.append({"day": day, **counts, "total": total, "remaining": total - counts["done"]})
+    return series
+
+
+_last_snapshot_day = None
+
+
+def snapshot_open_projects():
+    """Daily job: carry every open project's latest counts into today's row so series stay dense."""
+    global _last_snapshot_day
+    if _last_snapshot_day == _today():
+        return
+
+    def write(db: Session):
+        project_ids = [
+            project_id for (project_id,) in db.query(models.Project.id)
+            .filter(models.Project.status != models.ProjectStatus.Completed)
+        ]
+        for project_id in project_ids:
+            _ensure_today(db, project_id)
+
+    db = SessionLocal()
+    try:
+        run_write(db, write)
+        _last_snapshot_day = _today()
+    finally:
+        db.close()
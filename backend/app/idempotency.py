@@ -0,0 +1,253 @@
+# Idempotency-Key support for create endpoints.
+# - A POST to one of IDEMPOTENT_PATHS with an Idempotency-Key header is run once
+#   per (caller, key); repeats within IDEMPOTENCY_TTL_SECONDS get the stored
+#   response back (with Idempotency-Replayed: true) without reaching the route
+# - The first request claims the key with an in-flight row; a duplicate arriving
+#   meanwhile waits for it in the same worker, or gets 409 + Retry-After from
+#   another worker. The claim is renewed while its request runs, however long
+#   that takes; one left behind by a crash expires after IDEMPOTENCY_LOCK_SECONDS
+# - Reusing a key with a different body returns 422
+# - 5xx, 401 and redirect responses are not stored, so the client's retry runs again
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from app import models
+from app.auth import decode_token_claims
+from app.database import SessionLocal
+from app.write_queue import run_write
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+IDEMPOTENT_PATHS = {"/tasks", "/projects", "/clients", "/assignments", "/payments"}
+MAX_KEY_LENGTH = 255
+
+CLAIMED, REPLAY, MISMATCH, IN_FLIGHT = "claimed", "replay", "mismatch", "in_flight"
+
+
+def _stored(record: models.IdempotencyRecord) -> tuple[int, Optional[str], bytes]:
+    return record.status_code, record.content_type, record.body or b""
+
+
+def _lookup(subject: str, key: str, request_hash: str):
+    """Read-only check for the common repeat: one primary-key lookup, no write."""
+    db = SessionLocal()
+    try:
+        record = db.get(models.IdempotencyRecord, (subject, key))
+        if record is None or record.expires_at <= datetime.utcnow():
+            return None, None
+        if record.request_hash != request_hash:
+            return MISMATCH, None
+        if record.status_code is None:
+            return IN_FLIGHT, None
+        return REPLAY, _stored(record)
+    finally:
+        db.close()
+
+
+def _claim(subject: str, key: str, request_hash: str):
+    def write(db):
+        record = db.get(models.IdempotencyRecord, (subject, key))
+        now = datetime.utcnow()
+        if record is not None and record.expires_at <= now:
+            db.delete(record)
+            db.flush()
+            record = None
+        if record is None:
+            db.add(models.IdempotencyRecord(
+                subject=subject, key=key, request_hash=request_hash,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+            ))
+            return CLAIMED, None
+        if record.request_hash != request_hash:
+            return MISMATCH, None
+        if record.status_code is None:
+            return IN_FLIGHT, None
+        return REPLAY, _stored(record)
+
+    db = SessionLocal()
+    try:
+        return run_write(db, write)
+    except IntegrityError:
+        # Another worker inserted the same key first
+        return IN_FLIGHT, None
+    finally:
+        db.close()
+
+
+def _renew(subject: str, key: str):
+    """Push back the expiry of a claim whose request is still running."""
+    def write(db):
+        db.query(models.IdempotencyRecord).filter(
+            models.IdempotencyRecord.subject == subject,
+            models.IdempotencyRecord.key == key,
+            models.IdempotencyRecord.status_code.is_(None),
+        ).update(
+            {models.IdempotencyRecord.expires_at: datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)},
+            synchronize_session=False,
+        )
+
+    db = SessionLocal()
+    try:
+        run_write(db, write)
+    finally:
+        db.close()
+
+
+def _finish(subject: str, key: str, status_code: Optional[int], content_type: Optional[str], body: bytes):
+    """Store the response, or release the claim (status_code None) so a retry runs again."""
+    def write(db):
+        record = db.get(models.IdempotencyRecord, (subject, key))
+        if record is None:
+            return
+        if status_code is None:
+            db.delete(record)
+            return
+        record.status_code = status_code
+        record.content_type = content_type
+        record.body = body
+        record.expires_at = datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+
+    db = SessionLocal()
+    try:
+        run_write(db, write)
+    finally:
+        db.close()
+
+
+def _replay(stored: tuple[int, Optional[str], bytes]) -> Response:
+    status_code, content_type, body = stored
+    return Response(body, status_code=status_code, headers={"Idempotency-Replayed": "true"}, media_type=content_type)
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware; sits inside compression so stored bodies are uncompressed."""
+
+    def __init__(self, app):
+        self.app = app
+        # (subject, key) -> set when this worker's in-flight request for it finishes
+        self._in_flight: dict[tuple[str, str], asyncio.Event] = {}
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"].rstrip("/") not in IDEMPOTENT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+        key = Headers(scope=scope).get("idempotency-key")
+        claims = decode_token_claims(scope)
+        if not key or not claims or not claims.get("sub"):
+            # No key, or no valid caller (the route answers 401)
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await JSONResponse({"detail": "Idempotency-Key is too long"}, status_code=400)(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        subject = claims["sub"]
+        request_hash = hashlib.sha256(
+            scope["method"].encode() + b" " + scope["path"].rstrip("/").encode() + b"\n" + body
+        ).hexdigest()
+
+        slot = (subject, key)
+        while slot in self._in_flight:
+            await self._in_flight[slot].wait()
+        # No await between the check above and taking the slot
+        event = self._in_flight[slot] = asyncio.Event()
+        try:
+            outcome, stored = await run_in_threadpool(_lookup, subject, key, request_hash)
+            if outcome is None:
+                outcome, stored = await run_in_threadpool(_claim, subject, key, request_hash)
+                if outcome == CLAIMED:
+                    await self._run_and_store(scope, receive, send, body, subject, key)
+                    return
+        finally:
+            del self._in_flight[slot]
+            event.set()
+
+        if outcome == REPLAY:
+            response = _replay(stored)
+        elif outcome == MISMATCH:
+            response = JSONResponse(
+                {"detail": "Idempotency-Key was already used with a different request"}, status_code=422
+            )
+        else:
+            response = JSONResponse(
+                {"detail": "A request with this Idempotency-Key is still in progress"},
+                status_code=409,
+                headers={"Retry-After": "1"},
+            )
+        await response(scope, receive, send)
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    async def _run_and_store(self, scope, receive, send, body: bytes, subject: str, key: str):
+        body_sent = False
+        status_code = None
+        content_type = None
+        chunks = []
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = Headers(raw=message.get("headers", [])).get("content-type")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        async def keep_claimed():
+            while True:
+                await asyncio.sleep(IDEMPOTENCY_LOCK_SECONDS / 3)
+                await run_in_threadpool(_renew, subject, key)
+
+        renewal = asyncio.create_task(keep_claimed())
+        try:
+            await self.app(scope, replay_receive, capture)
+        except BaseException:
+            await run_in_threadpool(_finish, subject, key, None, None, b"")
+            raise
+        finally:
+            renewal.cancel()
+        # Redirects (e.g. /tasks -> /tasks/), 401 (retried after a token refresh) and 5xx
+        # release the key instead of being stored
+        stored = status_code is not None and (status_code < 300 or 400 <= status_code < 500) and status_code != 401
+        stored_status = status_code if stored else None
+        await run_in_threadpool(_finish, subject, key, stored_status, content_type, b"".join(chunks))
+
+
+def purge_expired():
+    def write(db):
+        db.execute(delete(models.IdempotencyRecord).where(models.IdempotencyRecord.expires_at <= datetime.utcnow()))
+
+    db = SessionLocal()
+    try:
+        run_write(db, write)
+    finally:
+        db.close()
@@ -0,0 +1,218 @@
+# Per-user "my work" inbox.
+# - inbox_items holds one row per (user, open task) the user works on: tasks
+#   assigned to them and, for ProjectManagers, every task of the projects they
+#   are assigned to (the same tasks GET /tasks shows them). Done tasks drop out
+# - Rows carry what the inbox shows (title, status, due date, project name), so
+#   GET /me/inbox is one range read on (organization_id, user_id, due_key,
+#   task_id) with no joins and no sorting
+# - Urgency order: earliest due date first, so overdue tasks lead, then
+#   undated tasks; ties by task id. Pages are keyset-paginated on that order
+# - Task, assignment, project and archive writes keep the rows up to date in
+#   their own transaction: call these after db.flush() and before the route's
+#   commit. Only the changed task's (or project's) rows are touched
+# - Databases from before the inbox are backfilled once at startup (rebuild)
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import and_, delete, exists, insert, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+from app import models
+from app.tenancy import ALL_ORGANIZATIONS
+
+OPEN_STATUSES = (models.TaskStatus.ToDo, models.TaskStatus.InProgress)
+# due_key of undated tasks: after every real due date
+NO_DUE_DATE = datetime(9999, 12, 31)
+REBUILD_CHUNK = 1000
+
+
+def _values(task, project_name: str, user_id: int) -> dict:
+    return {
+        "user_id": user_id,
+        "task_id": task.id,
+        "organization_id": task.organization_id,
+        "project_id": task.project_id,
+        "project_name": project_name,
+        "title": task.title,
+        "status": task.status,
+        "due_date": task.due_date,
+        "due_key": task.due_date or NO_DUE_DATE,
+    }
+
+
+def _recipients(task, managers: Iterable[int]) -> set[int]:
+    users = set(managers)
+    if task.assigned_to is not None:
+        users.add(task.assigned_to)
+    return users
+
+
+def _managers(db: Session, project_id: int) -> set[int]:
+    """ProjectManagers assigned to the project."""
+    rows = (
+        db.query(models.ProjectAssignment.user_id)
+        .join(models.User, models.User.id == models.ProjectAssignment.user_id)
+        .filter(
+            models.ProjectAssignment.project_id == project_id,
+            models.User.role == models.UserRole.ProjectManager,
+        )
+    )
+    return {user_id for (user_id,) in rows}
+
+
+def _insert(db: Session, rows: list[dict]):
+    if rows:
+        db.execute(insert(models.InboxItem), rows)
+
+
+def _project_and_managers(db: Session, project_id: int) -> tuple[Optional[str], set[int]]:
+    """The project's name and its ProjectManagers, in one query."""
+    assignment = models.ProjectAssignment
+    is_manager = exists().where(
+        models.User.id == assignment.user_id, models.User.role == models.UserRole.ProjectManager
+    )
+    rows = (
+        db.query(models.Project.name, assignment.user_id)
+        .outerjoin(assignment, and_(assignment.project_id == models.Project.id, is_manager))
+        .filter(models.Project.id == project_id)
+        .all()
+    )
+    if not rows:
+        return None, set()
+    return rows[0][0], {user_id for _, user_id in rows if user_id is not None}
+
+
+def add_task(db: Session, task: models.Task):
+    """Put a new task in the inboxes it belongs in."""
+    if task.status not in OPEN_STATUSES or task.project_id is None:
+        return
+    project_name, managers = _project_and_managers(db, task.project_id)
+    if project_name is not None:
+        _insert(db, [_values(task, project_name, user_id) for user_id in _recipients(task, managers)])
+
+
+def sync_task(db: Session, task: models.Task):
+    """Move a changed task to the inboxes it belongs in now."""
+    remove_task(db, task.id)
+    add_task(db, task)
+
+
+def change_status(db: Session, task: models.Task, old_status: models.TaskStatus):
+    """A status-only change: one UPDATE while the task stays open, else sync_task."""
+    if old_status in OPEN_STATUSES and task.status in OPEN_STATUSES:
+        db.execute(update(models.InboxItem).where(models.InboxItem.task_id == task.id).values(status=task.status))
+    else:
+        sync_task(db, task)
+
+
+def remove_task(db: Session, task_id: int):
+    db.execute(delete(models.InboxItem).where(models.InboxItem.task_id == task_id))
+
+
+def add_project(db: Session, project: models.Project, tasks: Iterable[models.Task]):
+    """Inbox rows for a project put back with its tasks and assignments, e.g. restored from the archive."""
+    managers = _managers(db, project.id)
+    _insert(db, [
+        _values(task, project.name, user_id)
+        for task in tasks
+        if task.status in OPEN_STATUSES
+        for user_id in _recipients(task, managers)
+    ])
+
+
+def remove_project(db: Session, project_id: int):
+    db.execute(delete(models.InboxItem).where(models.InboxItem.project_id == project_id))
+
+
+def rename_project(db: Session, project_id: int, name: str):
+    db.execute(
+        update(models.InboxItem).where(models.InboxItem.project_id == project_id).values(project_name=name)
+    )
+
+
+def add_member(db: Session, user: models.User, project: models.Project):
+    """A ProjectManager joining a project gets its open tasks (the ones assigned to them are there already)."""
+    if user.role != models.UserRole.ProjectManager:
+        return
+    tasks = db.query(models.Task).filter(
+        models.Task.project_id == project.id,
+        models.Task.status.in_(OPEN_STATUSES),
+        or_(models.Task.assigned_to.is_(None), models.Task.assigned_to != user.id),
+    )
+    _insert(db, [_values(task, project.name, user.id) for task in tasks])
+
+
+def remove_member(db: Session, user_id: int, project_id: int):
+    """A user leaving a project keeps only the project's tasks that are assigned to them."""
+    others = select(models.Task.id).where(
+        models.Task.project_id == project_id,
+        or_(models.Task.assigned_to.is_(None), models.Task.assigned_to != user_id),
+    )
+    db.execute(
+        delete(models.InboxItem).where(
+            models.InboxItem.user_id == user_id,
+            models.InboxItem.project_id == project_id,
+            models.InboxItem.task_id.in_(others),
+        )
+    )
+
+
+def page(db: Session, user_id: int, after: Optional[tuple[datetime, int]], limit: int) -> list[models.InboxItem]:
+    """Up to limit items after the (due_key, task_id) cursor, most urgent first."""
+    item = models.InboxItem
+    query = db.query(item).filter(item.user_id == user_id)
+    if after is not None:
+        # A row-value comparison, so the index seeks straight to the cursor
+        query = query.filter(tuple_(item.due_key, item.task_id) > tuple_(*after))
+    return query.order_by(item.due_key, item.task_id).limit(limit).all()
+
+
+def encode_cursor(item: models.InboxItem) -> str:
+    return f"{item.due_key.isoformat()}_{item.task_id}"
+
+
+def decode_cursor(cursor: str) -> Optional[tuple[datetime, int]]:
+    due_key, _, task_id = cursor.rpartition("_")
+    try:
+        return datetime.fromisoformat(due_key), int(task_id)
+    except ValueError:
+        return None
+
+
+def needs_backfill(db: Session) -> bool:
+    if db.query(models.InboxItem.task_id).execution_options(**ALL_ORGANIZATIONS).first() is not None:
+        return False
+    open_task = db.query(models.Task.id).filter(models.Task.status.in_(OPEN_STATUSES))
+    return open_task.execution_options(**ALL_ORGANIZATIONS).first() is not None
+
+
+def rebuild(db: Session) -> int:
+    """Recompute every inbox from tasks and assignments; the caller commits. Returns the number of rows."""
+    db.execute(delete(models.InboxItem).execution_options(**ALL_ORGANIZATIONS))
+    managers = defaultdict(set)
+    assignments = (
+        db.query(models.ProjectAssignment.user_id, models.ProjectAssignment.project_id)
+        .join(models.User, models.User.id == models.ProjectAssignment.user_id)
+        .filter(models.User.role == models.UserRole.ProjectManager)
+        .execution_options(**ALL_ORGANIZATIONS)
+    )
+    for user_id, project_id in assignments:
+        managers[project_id].add(user_id)
+    tasks = (
+        db.query(
+            models.Task.id, models.Task.organization_id, models.Task.project_id, models.Task.title,
+            models.Task.status, models.Task.due_date, models.Task.assigned_to,
+            models.Project.name.label("project_name"),
+        )
+        .join(models.Project, models.Project.id == models.Task.project_id)
+        .filter(models.Task.status.in_(OPEN_STATUSES))
+        .execution_options(**ALL_ORGANIZATIONS)
+    )
+    rows, total = [], 0
+    for task in tasks:
+        rows.extend(_values(task, task.project_name, user_id) for user_id in _recipients(task, managers[task.project_id]))
+        if len(rows) >= REBUILD_CHUNK:
+            _insert(db, rows)
+            total += len(rows)
+            rows = []
+    _insert(db, rows)
+    return total + len(rows)
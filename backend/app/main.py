@@ -8,12 +8,29 @@ import os
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from sqlalchemy import text
-from app import models
+from app import inbox, models
 from app.auth import get_password_hash
-from app.database import engine, Base, SessionLocal
-from app.routes import auth_routes, client_routes, project_routes, assignment_routes, task_routes, user_routes
+from app.database import SQLITE_JOURNAL_MODE, engine, Base, SessionLocal
+from app.routes import auth_routes, client_routes, project_routes, assignment_routes, task_routes, user_routes, notification_routes, activity_routes, payment_routes, timeline_routes, workload_routes, batch_routes, debug_routes, archive_routes, backup_routes, me_routes
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes.dashboard import router as dashboard_router 
+from app.rate_limit import RATE_LIMIT_ENABLED, RateLimitMiddleware
+from app.compression import CompressionMiddleware
+from app.due_dates import DUE_REFRESH_SECONDS, due_tracker, refresh_due_tasks
+from app.activity import purge_expired
+from app.scheduler import SCHEDULER_ENABLED, scheduler
+from app.timeline import setup_rtree
+from app.history import snapshot_open_projects
+from app.membership import memberships
+from app.revocation import revocations
+from app.write_queue import write_queue
+from app.preconditions import stale_data_handler
+from app.idempotency import IdempotencyMiddleware, purge_expired as purge_idempotency_keys
+from app import tracing
+from app.profiler import ProfileMiddleware
+from app.archive import archive_completed_projects
+from app.backup import BACKUP_INTERVAL_HOURS, scheduled_backup
+from sqlalchemy.orm.exc import StaleDataError
 
 # Load environment variables from .env file
 load_dotenv()
@@ -35,13 +52,22 @@ if FRONTEND_URL not in ALLOWED_ORIGINS:
     ALLOWED_ORIGINS.append(FRONTEND_URL)
 
 app = FastAPI(title="Project Management API")
+app.add_middleware(IdempotencyMiddleware)
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfileMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Idempotency-Replayed", "X-Profile-Id"],
 )
+# Outermost, so the request span covers everything below; no-op unless TRACING_EXPORTER is set
+tracing.install(app)
+app.add_exception_handler(StaleDataError, stale_data_handler)
 
 app.include_router(auth_routes.router)
 app.include_router(client_routes.router)
@@ -50,11 +76,38 @@ app.include_router(assignment_routes.router)
 app.include_router(task_routes.router)
 app.include_router(user_routes.router)
 app.include_router(dashboard_router)
+app.include_router(notification_routes.router)
+app.include_router(activity_routes.router)
+app.include_router(payment_routes.router)
+app.include_router(timeline_routes.router)
+app.include_router(workload_routes.router)
+app.include_router(batch_routes.router)
+app.include_router(debug_routes.router)
+app.include_router(archive_routes.router)
+app.include_router(backup_routes.router)
+app.include_router(me_routes.router)
+
+scheduler.register("due-dates", DUE_REFRESH_SECONDS, refresh_due_tasks)
+scheduler.register("activity-retention", 3600, purge_expired)
+scheduler.register("status-snapshots", 3600, snapshot_open_projects)
+scheduler.register("token-purge", 3600, revocations.purge_expired)
+scheduler.register("idempotency-purge", 3600, purge_idempotency_keys)
+scheduler.register("project-archive", 86400, archive_completed_projects)
+if BACKUP_INTERVAL_HOURS > 0:
+    scheduler.register("database-backup", BACKUP_INTERVAL_HOURS * 3600, scheduled_backup)
+
+OBSOLETE_INDEXES = (
+    "ix_tasks_project_status", "ix_tasks_assigned_due", "ix_tasks_status_due", "ix_project_assignments_user_project",
+)
+
 
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
     with engine.connect() as conn:
+        if SQLITE_JOURNAL_MODE and engine.dialect.name == "sqlite":
+            mode = conn.execute(text(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")).scalar()
+            logger.info("SQLite journal mode: %s", mode)
         user_columns = conn.execute(text("PRAGMA table_info(users)")).fetchall()
         if user_columns and not any(col[1] == "full_name" for col in user_columns):
             conn.execute(text("ALTER TABLE users ADD COLUMN full_name TEXT"))
@@ -69,6 +122,9 @@ def on_startup():
         if task_columns and not any(col[1] == "created_at" for col in task_columns):
             conn.execute(text("ALTER TABLE tasks ADD COLUMN created_at DATETIME"))
             conn.commit()
+        if task_columns and not any(col[1] == "version" for col in task_columns):
+            conn.execute(text("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+            conn.commit()
         client_columns = conn.execute(text("PRAGMA table_info(clients)")).fetchall()
         if client_columns and not any(col[1] == "created_at" for col in client_columns):
             conn.execute(text("ALTER TABLE clients ADD COLUMN created_at DATETIME"))
@@ -83,12 +139,42 @@ def on_startup():
         if project_columns and not any(col[1] == "created_at" for col in project_columns):
             conn.execute(text("ALTER TABLE projects ADD COLUMN created_at DATETIME"))
             conn.commit()
+        if project_columns and not any(col[1] == "version" for col in project_columns):
+            conn.execute(text("ALTER TABLE projects ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+            conn.commit()
         assignment_columns = conn.execute(text("PRAGMA table_info(project_assignments)")).fetchall()
         if assignment_columns and not any(col[1] == "created_at" for col in assignment_columns):
             conn.execute(text("ALTER TABLE project_assignments ADD COLUMN created_at DATETIME"))
             conn.commit()
+        # Organizations: rows from before multi-tenancy belong to the default organization
+        for table_name in ("users", "clients", "projects", "tasks", "project_assignments", "payments", "archived_projects"):
+            columns = conn.execute(text(f"PRAGMA table_info({table_name})")).fetchall()
+            if columns and not any(col[1] == "organization_id" for col in columns):
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN organization_id INTEGER NOT NULL DEFAULT 1"))
+                conn.commit()
+        activity_columns = conn.execute(text("PRAGMA table_info(activity_log)")).fetchall()
+        if activity_columns and not any(col[1] == "organization_id" for col in activity_columns):
+            conn.execute(text("ALTER TABLE activity_log ADD COLUMN organization_id INTEGER"))
+            conn.execute(text("UPDATE activity_log SET organization_id = 1"))
+            conn.commit()
+        conn.execute(text("UPDATE revenue_rollups SET scope = 'organization', scope_id = 1 WHERE scope = 'all'"))
+        conn.commit()
+    # Organization-less twins of the organization-leading indexes, dropped from the models
+    with engine.connect() as conn:
+        for index_name in OBSOLETE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+        conn.commit()
+    # create_all skips indexes on tables that already exist, so add any new ones here
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.connect() as conn:
+        setup_rtree(conn)
     db = SessionLocal()
     try:
+        if db.get(models.Organization, models.DEFAULT_ORGANIZATION_ID) is None:
+            db.add(models.Organization(id=models.DEFAULT_ORGANIZATION_ID, name="Default"))
+            db.commit()
         admin_email = "admin@example.com"
         existing_admin = db.query(models.User).filter(models.User.email == admin_email).first()
         if not existing_admin:
@@ -107,8 +193,25 @@ def on_startup():
                 existing_admin.full_name = "System Administrator"
                 db.commit()
             logger.info("Default admin user already exists: %s", admin_email)
+        # Databases from before the inbox: fill it once from tasks and assignments
+        if inbox.needs_backfill(db):
+            rows = inbox.rebuild(db)
+            db.commit()
+            logger.info("Backfilled %d inbox items", rows)
+        due_tracker.refresh(db)
+        memberships.load(db)
+        revocations.load(db)
     finally:
         db.close()
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    scheduler.stop()
+    write_queue.stop()
+    tracing.exporter.stop()
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,90 @@
+# In-memory project membership index.
+# - user_id -> project_ids and project_id -> user_ids, loaded from
+#   project_assignments at startup (one query) and updated by assignment writes
+# - Access checks and scoped list queries read it instead of querying
+#   project_assignments on every request
+# - Assignment writes bump the "memberships" row in cache_versions in the same
+#   transaction; each worker compares that version at most every
+#   MEMBERSHIP_VERSION_CHECK_SECONDS and reloads when another worker changed it
+import os
+import threading
+import time
+from sqlalchemy.orm import Session
+from app import models
+from app.cache_versions import read_version
+from app.tenancy import ALL_ORGANIZATIONS
+
+MEMBERSHIP_VERSION_CHECK_SECONDS = float(os.getenv("MEMBERSHIP_VERSION_CHECK_SECONDS", "1"))
+VERSION_KEY = "memberships"
+
+EMPTY = frozenset()
+
+
+class MembershipIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # frozensets are swapped on write, so readers can use them without the lock
+        self._by_user: dict[int, frozenset[int]] = {}
+        self._by_project: dict[int, frozenset[int]] = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def load(self, db: Session):
+        version = read_version(db, VERSION_KEY)
+        by_user: dict[int, set[int]] = {}
+        by_project: dict[int, set[int]] = {}
+        # Shared by every organization, so never loaded through a tenant-scoped session's filter
+        pairs = db.query(models.ProjectAssignment.user_id, models.ProjectAssignment.project_id).execution_options(
+            **ALL_ORGANIZATIONS
+        )
+        for user_id, project_id in pairs:
+            by_user.setdefault(user_id, set()).add(project_id)
+            by_project.setdefault(project_id, set()).add(user_id)
+        with self._lock:
+            self._by_user = {user_id: frozenset(ids) for user_id, ids in by_user.items()}
+            self._by_project = {project_id: frozenset(ids) for project_id, ids in by_project.items()}
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def ensure_current(self, db: Session):
+        """Reload if never loaded, or if another worker bumped the version since the last check."""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < MEMBERSHIP_VERSION_CHECK_SECONDS:
+            return
+        if self._version is None or read_version(db, VERSION_KEY) != self._version:
+            self.load(db)
+        else:
+            self._checked_at = now
+
+    def project_ids(self, db: Session, user_id: int) -> frozenset[int]:
+        self.ensure_current(db)
+        return self._by_user.get(user_id, EMPTY)
+
+    def user_ids(self, db: Session, project_id: int) -> frozenset[int]:
+        self.ensure_current(db)
+        return self._by_project.get(project_id, EMPTY)
+
+    def is_member(self, db: Session, user_id: int, project_id: int) -> bool:
+        return project_id in self.project_ids(db, user_id)
+
+    def add(self, user_id: int, project_id: int, version: int):
+        """Apply a committed assignment; version is what bump_version returned for it."""
+        with self._lock:
+            self._by_user[user_id] = self._by_user.get(user_id, EMPTY) | {project_id}
+            self._by_project[project_id] = self._by_project.get(project_id, EMPTY) | {user_id}
+            self._advance(version)
+
+    def remove(self, user_id: int, project_id: int, version: int):
+        with self._lock:
+            self._by_user[user_id] = self._by_user.get(user_id, EMPTY) - {project_id}
+            self._by_project[project_id] = self._by_project.get(project_id, EMPTY) - {user_id}
+            self._advance(version)
+
+    def _advance(self, version: int):
+        # Only our own write happened since the last load: stay current. Otherwise
+        # leave the old version so the next check reloads other workers' changes.
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+
+
+memberships = MembershipIndex()
@@ -1,18 +1,26 @@
 # Create professional SQLAlchemy models for a Project Management System.
 # Include:
+# - Organization model (tenant); TenantScoped rows carry organization_id
 # - User model with roles (Admin, ProjectManager, TeamMember)
 # - Client model
 # - Project model with ProjectStatus enum
 # - Task model with TaskStatus enum
 # - ProjectAssignment model (Many-to-Many between User and Project)
 # - Payment model
+# - Notification model with a per-user unread counter
+# - ActivityLog model (append-only audit trail)
+# - RevenueRollup model (payment totals per organization/project/client/month)
+# - StatusTransition and ProjectStatusSnapshot models (status history / burndown)
+# - IdempotencyRecord model (stored responses for Idempotency-Key retries)
+# - ArchivedProject model (completed projects moved out of the hot tables)
+# - InboxItem model (per-user "my work" inbox, kept up to date by writes)
 # Include proper relationships and foreign keys.
 # Use DateTime fields with default=datetime.utcnow.
 # Use SQLAlchemy 2.0 style.
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum as SqlEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Boolean, Column, Date, Integer, LargeBinary, String, ForeignKey, DateTime, Index, UniqueConstraint, Enum as SqlEnum
+from sqlalchemy.orm import declared_attr, relationship
 from app.database import Base
 class UserRole(str, Enum):
     Admin = "Admin"
@@ -26,22 +34,44 @@ class TaskStatus(str, Enum):
     ToDo = "To Do"
     InProgress = "In Progress"
     Done = "Done"
-class User(Base):
+DEFAULT_ORGANIZATION_ID = 1
+class Organization(Base):
+    __tablename__ = "organizations"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+class TenantScoped:
+    # Rows belong to one organization. ORM statements on a session bound to an
+    # organization only see (and insert into) that organization, see app/tenancy.py
+    @declared_attr
+    def organization_id(cls):
+        return Column(
+            Integer, ForeignKey("organizations.id"), nullable=False,
+            default=DEFAULT_ORGANIZATION_ID, server_default=str(DEFAULT_ORGANIZATION_ID)
+        )
+class User(TenantScoped, Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
     full_name = Column(String, nullable=True)
+    # Unique across organizations: login finds the user (and so the organization) by email
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(SqlEnum(UserRole), nullable=False)
     project_assignments = relationship("ProjectAssignment", back_populates="user")
-class Client(Base):
+    __table_args__ = (
+        Index("ix_users_org_role", "organization_id", "role"),
+    )
+class Client(TenantScoped, Base):
     __tablename__ = "clients"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     contact_info = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     projects = relationship("Project", back_populates="client")
-class Project(Base):
+    __table_args__ = (
+        Index("ix_clients_org_id", "organization_id", "id"),
+    )
+class Project(TenantScoped, Base):
     __tablename__ = "projects"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -51,11 +81,19 @@ class Project(Base):
     start_date = Column(DateTime, nullable=True)
     end_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Optimistic concurrency: every ORM UPDATE is "WHERE id = ? AND version = ?" and bumps it
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     client = relationship("Client", back_populates="projects")
     tasks = relationship("Task", back_populates="project")
     project_assignments = relationship("ProjectAssignment", back_populates="project")
     payments = relationship("Payment", back_populates="project")
-class Task(Base):
+    __table_args__ = (
+        Index("ix_projects_start_end", "start_date", "end_date"),
+        Index("ix_projects_org_status", "organization_id", "status"),
+        Index("ix_projects_org_client", "organization_id", "client_id"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+class Task(TenantScoped, Base):
     __tablename__ = "tasks"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -65,9 +103,30 @@ class Task(Base):
     assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
     due_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     project = relationship("Project", back_populates="tasks")
     assigned_user = relationship("User", foreign_keys=[assigned_to])
-class ProjectAssignment(Base):
+    __table_args__ = (
+        Index("ix_tasks_due_date", "due_date"),
+        Index("ix_tasks_org_project_status", "organization_id", "project_id", "status"),
+        Index("ix_tasks_org_status_due", "organization_id", "status", "due_date"),
+        Index("ix_tasks_org_assigned_due", "organization_id", "assigned_to", "due_date"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+class TaskDependency(Base):
+    # blocker_id must be finished before blocked_id; both tasks belong to project_id
+    __tablename__ = "task_dependencies"
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    blocker_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    blocked_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        UniqueConstraint("blocker_id", "blocked_id", name="uq_task_dependencies_edge"),
+        Index("ix_task_dependencies_project", "project_id"),
+        Index("ix_task_dependencies_blocked", "blocked_id"),
+    )
+class ProjectAssignment(TenantScoped, Base):
     __tablename__ = "project_assignments"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -75,10 +134,177 @@ class ProjectAssignment(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     user = relationship("User", back_populates="project_assignments")
     project = relationship("Project", back_populates="project_assignments")
-class Payment(Base):
+    __table_args__ = (
+        Index("ix_project_assignments_project_user", "project_id", "user_id"),
+        Index("ix_project_assignments_org_user_project", "organization_id", "user_id", "project_id"),
+    )
+class Payment(TenantScoped, Base):
     __tablename__ = "payments"
     id = Column(Integer, primary_key=True, index=True)
     amount = Column(Integer, nullable=False)
     date = Column(DateTime, default=datetime.utcnow)
     project_id = Column(Integer, ForeignKey("projects.id"))
-    project = relationship("Project", back_populates="payments")
\ No newline at end of file
+    project = relationship("Project", back_populates="payments")
+    __table_args__ = (
+        Index("ix_payments_project_date", "project_id", "date"),
+        Index("ix_payments_org_date", "organization_id", "date"),
+    )
+class Notification(Base):
+    __tablename__ = "notifications"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    body = Column(String, nullable=True)
+    link = Column(String, nullable=True)
+    is_read = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+        Index("ix_notifications_user_unread", "user_id", "is_read", "id"),
+    )
+class NotificationCounter(Base):
+    # Maintained alongside every notification write so unread counts never need COUNT(*)
+    __tablename__ = "notification_counters"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread = Column(Integer, default=0, nullable=False)
+    version = Column(Integer, default=0, nullable=False)
+class ActivityLog(TenantScoped, Base):
+    # Append-only: no foreign keys, so entries outlive the rows they describe
+    __tablename__ = "activity_log"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # NULL for entries with no organization (system jobs); those are not shown in any feed
+    organization_id = Column(Integer, nullable=True)
+    actor_id = Column(Integer, nullable=True)
+    actor_name = Column(String, nullable=True)
+    project_id = Column(Integer, nullable=True)
+    entity_type = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=True)
+    action = Column(String, nullable=False)
+    summary = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    __table_args__ = (
+        Index("ix_activity_log_project_id_id", "project_id", "id"),
+        Index("ix_activity_log_actor_id_id", "actor_id", "id"),
+        Index("ix_activity_log_created_at", "created_at"),
+        Index("ix_activity_log_org_id", "organization_id", "id"),
+    )
+class RevenueRollup(Base):
+    # Updated in the payment write path; scope is "organization", "client" or "project",
+    # period is "YYYY-MM" or "total"
+    __tablename__ = "revenue_rollups"
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)
+    scope_id = Column(Integer, nullable=False)
+    period = Column(String, nullable=False)
+    amount = Column(BigInteger, default=0, nullable=False)
+    payment_count = Column(Integer, default=0, nullable=False)
+    __table_args__ = (
+        UniqueConstraint("scope", "scope_id", "period", name="uq_revenue_rollups_scope_period"),
+    )
+class CacheVersion(Base):
+    # Bumped in the same transaction as writes that in-memory caches mirror, so
+    # other workers can tell their copy is stale
+    __tablename__ = "cache_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+class RefreshToken(Base):
+    # Looked up by id; only an HMAC of the token's secret part is stored.
+    # Rotation revokes the old row and links it to its replacement; all tokens
+    # minted from one login share a family_id
+    __tablename__ = "refresh_tokens"
+    id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    family_id = Column(String, nullable=False)
+    token_hash = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    revoked_at = Column(DateTime, nullable=True)
+    replaced_by = Column(String, nullable=True)
+    __table_args__ = (
+        Index("ix_refresh_tokens_user_id", "user_id"),
+        Index("ix_refresh_tokens_family_id", "family_id"),
+    )
+class RevokedToken(Base):
+    # Access tokens revoked before they expire (by jti); rows are purged after expires_at
+    __tablename__ = "revoked_tokens"
+    jti = Column(String, primary_key=True)
+    expires_at = Column(DateTime, nullable=False)
+    __table_args__ = (
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+    )
+class StatusTransition(Base):
+    __tablename__ = "status_transitions"
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    project_id = Column(Integer, nullable=True)
+    from_status = Column(String, nullable=True)
+    to_status = Column(String, nullable=False)
+    changed_by = Column(Integer, nullable=True)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    __table_args__ = (
+        Index("ix_status_transitions_entity", "entity_type", "entity_id", "id"),
+        Index("ix_status_transitions_project_changed", "project_id", "changed_at"),
+    )
+class ProjectStatusSnapshot(Base):
+    # Task counts by status per project per day; today's row is updated on every change
+    __tablename__ = "project_status_snapshots"
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    todo = Column(Integer, default=0, nullable=False)
+    in_progress = Column(Integer, default=0, nullable=False)
+    done = Column(Integer, default=0, nullable=False)
+    __table_args__ = (
+        UniqueConstraint("project_id", "day", name="uq_project_status_snapshots_project_day"),
+    )
+class IdempotencyRecord(Base):
+    # One row per (caller, Idempotency-Key); status_code is NULL while the first request is in flight
+    __tablename__ = "idempotency_keys"
+    subject = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+class ArchivedProject(TenantScoped, Base):
+    # A completed project with its tasks, dependencies, assignments and payments,
+    # moved out of the hot tables as one zlib-compressed JSON document (app/archive.py).
+    # id is the project's original id
+    __tablename__ = "archived_projects"
+    id = Column(Integer, primary_key=True)
+    client_id = Column(Integer, nullable=True)
+    name = Column(String, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    task_count = Column(Integer, default=0, nullable=False)
+    payment_total = Column(BigInteger, default=0, nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+    __table_args__ = (
+        Index("ix_archived_projects_client_id", "client_id"),
+        Index("ix_archived_projects_org_archived", "organization_id", "archived_at"),
+    )
+class InboxItem(TenantScoped, Base):
+    # A user's "my work" inbox (app/inbox.py): one row per open task they should
+    # work on, with what the inbox shows copied in so reading it needs no joins.
+    # due_key is the due date, or inbox.NO_DUE_DATE so undated tasks sort last
+    __tablename__ = "inbox_items"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), primary_key=True)
+    project_id = Column(Integer, nullable=False)
+    project_name = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    status = Column(SqlEnum(TaskStatus), nullable=False)
+    due_date = Column(DateTime, nullable=True)
+    due_key = Column(DateTime, nullable=False)
+    __table_args__ = (
+        Index("ix_inbox_items_org_user_due", "organization_id", "user_id", "due_key", "task_id"),
+        Index("ix_inbox_items_task_id", "task_id"),
+        Index("ix_inbox_items_project_user", "project_id", "user_id"),
+    )
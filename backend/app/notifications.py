@@ -0,0 +1,82 @@
+# Server-side notifications.
+# - notify() adds notifications in the caller's transaction and bumps each
+#   recipient's unread counter in the same transaction
+# - Unread counts are read from notification_counters by primary key; the
+#   counter's version changes on every update so streams can detect changes cheaply
+# - Due-date crossings from the task tracker notify the assignee, through the
+#   write queue like any other write (they happen in the request that moved the
+#   task, or in the scheduled refresh)
+import logging
+from typing import Iterable, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app import models
+from app.database import SessionLocal
+from app.due_dates import OVERDUE, DueTask, due_tracker
+from app.write_queue import run_write
+
+logger = logging.getLogger(__name__)
+
+
+def adjust_unread(db: Session, user_id: int, delta: int, reset: bool = False):
+    """Change a user's unread counter by delta (or set it to 0 when reset) and bump its version."""
+    new_unread = 0 if reset else models.NotificationCounter.unread + delta
+    result = db.execute(
+        update(models.NotificationCounter)
+        .where(models.NotificationCounter.user_id == user_id)
+        .values(unread=new_unread, version=models.NotificationCounter.version + 1)
+    )
+    if result.rowcount == 0:
+        db.add(models.NotificationCounter(user_id=user_id, unread=0 if reset else max(delta, 0), version=1))
+        db.flush()
+
+
+def notify(
+    db: Session,
+    user_ids: Iterable[int],
+    kind: str,
+    title: str,
+    body: Optional[str] = None,
+    link: Optional[str] = None,
+):
+    """Queue one notification per recipient; the caller commits."""
+    for user_id in set(user_ids):
+        db.add(models.Notification(user_id=user_id, kind=kind, title=title, body=body, link=link))
+        adjust_unread(db, user_id, 1)
+
+
+def get_counter(db: Session, user_id: int) -> tuple[int, int]:
+    """(unread, version) for a user from a single primary-key lookup."""
+    counter = db.get(models.NotificationCounter, user_id)
+    if counter is None:
+        return 0, 0
+    return counter.unread, counter.version
+
+
+def admin_user_ids(db: Session) -> list[int]:
+    return [user_id for (user_id,) in db.query(models.User.id).filter(models.User.role == models.UserRole.Admin)]
+
+
+def notify_due_task(kind: str, task: DueTask):
+    if task.assigned_to is None:
+        return
+    if kind == OVERDUE:
+        title = f"Task overdue: {task.title}"
+    else:
+        title = f"Task due soon: {task.title}"
+
+    def write(db: Session):
+        notify(
+            db, [task.assigned_to], f"task_{kind}", title,
+            body=f"Due {task.due_date:%Y-%m-%d %H:%M}",
+            link="/tasks",
+        )
+
+    db = SessionLocal()
+    try:
+        run_write(db, write)
+    finally:
+        db.close()
+
+
+due_tracker.add_listener(notify_due_task)
@@ -0,0 +1,53 @@
+# Optimistic concurrency for versioned rows (Task, Project).
+# - Responses carry the row's version in the body and as ETag: "<version>"
+#   ("<version>-gzip" etc. when compressed, see app/compression.py); If-Match
+#   accepts either, compared strongly (RFC 9110): weak W/ tags never match
+# - Writes may send If-Match: "<version>" (412 when stale) or a version field
+#   in the body (409 when stale)
+# - The UPDATE itself is conditional on the version that was read
+#   (version_id_col), so a write that raced past the check fails with
+#   StaleDataError, answered as 409 by stale_data_handler
+from typing import Optional
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
+from app.compression import CONTENT_CODINGS, encoded_etag
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def set_etag(response: Response, version: int):
+    response.headers["ETag"] = etag(version)
+
+
+def _matches(if_match: str, version: int) -> bool:
+    if if_match.strip() == "*":
+        return True
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag == etag(version) or tag in (encoded_etag(etag(version), coding) for coding in CONTENT_CODINGS):
+            return True
+    return False
+
+
+def check_version(version: int, if_match: Optional[str] = None, expected: Optional[int] = None):
+    """Raise 412 if If-Match doesn't name the current version, 409 if the body's version is stale."""
+    if if_match is not None and not _matches(if_match, version):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"Resource has changed (current version {version}); reload and retry"
+        )
+    if expected is not None and expected != version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Version conflict: you sent version {expected}, current version is {version}"
+        )
+
+
+async def stale_data_handler(request: Request, exc: StaleDataError) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": "Resource was modified concurrently; reload and retry"}
+    )
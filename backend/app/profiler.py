@@ -0,0 +1,209 @@
+# Sampling CPU profiler for a live worker.
+# - A daemon thread reads every thread's Python stack (sys._current_frames)
+#   every PROFILE_INTERVAL_MS; nothing is installed in between, so a worker
+#   that isn't being profiled pays nothing
+# - One profile at a time per worker, for at most PROFILE_MAX_SECONDS
+# - Threads parked in threading/queue/selectors waits count as idle and are
+#   left out unless asked for, so the profile shows where CPU goes
+# - Results come out as collapsed stacks (flamegraph.pl, speedscope, inferno)
+#   or as a speedscope JSON file with one profile per thread
+# - Admins can profile a single request with X-Profile: 1; the last
+#   PROFILE_KEEP such profiles are kept in memory for /debug/profiles/{id}
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Optional
+from starlette.datastructures import MutableHeaders
+from app.auth import decode_token_claims
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+IDLE_MODULES = ("threading.py", "queue.py", "selectors.py")
+SITE_PACKAGES = os.sep + "site-packages" + os.sep
+
+# (function, file, first line of the function)
+Frame = tuple[str, str, int]
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    if SITE_PACKAGES in filename:
+        return filename.split(SITE_PACKAGES, 1)[1]
+    cwd = os.getcwd() + os.sep
+    if filename.startswith(cwd):
+        return filename[len(cwd):]
+    return os.path.basename(filename)
+
+
+class Profile:
+    def __init__(self, include_idle: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.include_idle = include_idle
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.samples = 0
+        # (thread name, frames root first) -> times seen
+        self.stacks: Counter[tuple[str, tuple[Frame, ...]]] = Counter()
+        self.finished = threading.Event()
+
+    def collapsed(self) -> str:
+        lines = []
+        for (thread, frames), count in self.stacks.most_common():
+            names = [thread] + [f"{func} ({path}:{line})" for func, path, line in frames]
+            lines.append(f"{';'.join(names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> dict:
+        frame_index: dict[Frame, int] = {}
+        frames = []
+        by_thread: dict[str, tuple[list, list]] = {}
+        interval = PROFILE_INTERVAL_MS / 1000
+        for (thread, stack), count in self.stacks.items():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    func, path, line = frame
+                    frames.append({"name": func, "file": path, "line": line})
+                indices.append(frame_index[frame])
+            samples, weights = by_thread.setdefault(thread, ([], []))
+            samples.append(indices)
+            weights.append(count * interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"profile {self.id}",
+            "exporter": "project-management-api",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+                for thread, (samples, weights) in sorted(by_thread.items())
+            ],
+        }
+
+
+class _Run:
+    """A profile being sampled on its own thread until stop() or its deadline."""
+
+    def __init__(self, profiler: "SamplingProfiler", profile: Profile, max_seconds: float):
+        self._profiler = profiler
+        self.profile = profile
+        self._deadline = time.monotonic() + max_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        own = threading.get_ident()
+        interval = PROFILE_INTERVAL_MS / 1000
+        started = time.monotonic()
+        profile = self.profile
+        try:
+            while not self._stop.is_set() and time.monotonic() < self._deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    if not profile.include_idle and os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append((code.co_name, _short_path(code.co_filename), code.co_firstlineno))
+                        frame = frame.f_back
+                    stack.reverse()
+                    profile.stacks[(names.get(ident, f"thread-{ident}"), tuple(stack))] += 1
+                profile.samples += 1
+                self._stop.wait(interval)
+        finally:
+            profile.duration = time.monotonic() - started
+            profile.finished.set()
+            self._profiler._release()
+
+    def stop(self):
+        # Doesn't wait for the sampler (callers may be on the event loop); see profile.finished
+        self._stop.set()
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+
+    def start(self, max_seconds: float, include_idle: bool = False, keep: bool = False) -> Optional[_Run]:
+        """Start sampling, or return None if a profile is already running in this worker."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = Profile(include_idle)
+        if keep:
+            with self._lock:
+                self._profiles[profile.id] = profile
+                while len(self._profiles) > PROFILE_KEEP:
+                    self._profiles.popitem(last=False)
+        return _Run(self, profile, min(max_seconds, PROFILE_MAX_SECONDS))
+
+    def run(self, seconds: float, include_idle: bool = False) -> Optional[Profile]:
+        run = self.start(seconds, include_idle)
+        if run is None:
+            return None
+        run.profile.finished.wait()
+        return run.profile
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def _release(self):
+        self._busy.release()
+
+
+profiler = SamplingProfiler()
+
+
+def _wants_profile(scope) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == b"x-profile":
+            return value.strip().lower() in (b"1", b"true", b"yes")
+    return False
+
+
+class ProfileMiddleware:
+    """Profile requests sent with X-Profile: 1 by an Admin; the response carries X-Profile-Id."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        claims = decode_token_claims(scope)
+        run = profiler.start(PROFILE_MAX_SECONDS, keep=True) if claims and claims.get("role") == "Admin" else None
+        if run is None:
+            # Not an Admin, or another profile is running: serve the request unprofiled
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Id", run.profile.id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            run.stop()
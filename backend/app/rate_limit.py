@@ -0,0 +1,207 @@
+# Token-bucket rate limiting for the API.
+# - Limits are configured per route (method + path prefix) and per role
+# - Callers are identified by the JWT subject, falling back to the client IP
+# - In-memory backend by default, Redis backend when RATE_LIMIT_REDIS_URL is set
+# - Over-limit requests get 429 with a Retry-After header
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+from starlette.responses import JSONResponse
+from app.auth import decode_token_claims
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+
+
+@dataclass(frozen=True)
+class BucketLimit:
+    capacity: int
+    refill_per_second: float
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    method: str
+    path_prefix: str
+    default: Optional[BucketLimit]
+    # Role name -> limit; None means the role is not limited on this route
+    per_role: dict = field(default_factory=dict)
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method == "*" or self.method == method) and path.startswith(self.path_prefix)
+
+    def limit_for(self, role: Optional[str]) -> Optional[BucketLimit]:
+        if role is not None and role in self.per_role:
+            return self.per_role[role]
+        return self.default
+
+
+# First matching rule wins, so keep more specific prefixes first.
+RATE_LIMIT_RULES = [
+    # bcrypt-bound: a handful of attempts per minute per caller
+    RateLimitRule("POST", "/auth/login", BucketLimit(capacity=5, refill_per_second=5 / 60)),
+    RateLimitRule("POST", "/auth/register", BucketLimit(capacity=10, refill_per_second=10 / 60)),
+    # public endpoint that fans out to every Admin
+    RateLimitRule("POST", "/notifications/admin-access-requests", BucketLimit(capacity=3, refill_per_second=3 / 3600)),
+    RateLimitRule(
+        "GET", "/tasks",
+        BucketLimit(capacity=30, refill_per_second=1),
+        per_role={"Admin": None, "TeamMember": BucketLimit(capacity=10, refill_per_second=0.5)},
+    ),
+    RateLimitRule(
+        "GET", "/projects",
+        BucketLimit(capacity=30, refill_per_second=1),
+        per_role={"Admin": None, "TeamMember": BucketLimit(capacity=10, refill_per_second=0.5)},
+    ),
+    RateLimitRule(
+        "*", "/",
+        BucketLimit(capacity=120, refill_per_second=20),
+        per_role={"Admin": None},
+    ),
+]
+
+
+class InMemoryBucketBackend:
+    """Process-local buckets; enough for a single worker."""
+
+    MAX_BUCKETS = 100_000
+
+    def __init__(self):
+        # key -> (tokens, updated, full_at), least recently used first. full_at
+        # is when the bucket will have refilled under its own rule's limit
+        self._buckets: OrderedDict[str, tuple[float, float, float]] = OrderedDict()
+        # (full_at, key) min-heap; entries whose bucket was taken from since are stale
+        self._horizons: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: BucketLimit) -> float:
+        """Consume one token. Returns 0 when allowed, else seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (float(limit.capacity), now, now))
+            tokens = min(float(limit.capacity), tokens + (now - updated) * limit.refill_per_second)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / limit.refill_per_second
+            full_at = now + (limit.capacity - tokens) / limit.refill_per_second
+            self._buckets[key] = (tokens, now, full_at)
+            self._buckets.move_to_end(key)
+            heapq.heappush(self._horizons, (full_at, key))
+            self._evict(now)
+            return wait
+
+    def _evict(self, now: float):
+        # A bucket past its own refill horizon carries no state worth keeping
+        while self._horizons and self._horizons[0][0] <= now:
+            full_at, key = heapq.heappop(self._horizons)
+            state = self._buckets.get(key)
+            if state is not None and state[2] == full_at:
+                del self._buckets[key]
+        # Still over the cap with every bucket refilling: drop the least recently used
+        while len(self._buckets) > self.MAX_BUCKETS:
+            self._buckets.popitem(last=False)
+        if len(self._horizons) > 2 * len(self._buckets) + 1024:
+            self._horizons = [(full_at, key) for key, (_, _, full_at) in self._buckets.items()]
+            heapq.heapify(self._horizons)
+
+
+class RedisBucketBackend:
+    """Buckets shared between workers, updated atomically with a Lua script."""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        import redis  # optional dependency, only needed for the shared backend
+
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, key: str, limit: BucketLimit) -> float:
+        wait = self._script(
+            keys=[f"ratelimit:{key}"],
+            args=[limit.capacity, limit.refill_per_second, time.time()],
+        )
+        return float(wait)
+
+
+def create_backend():
+    if RATE_LIMIT_REDIS_URL:
+        try:
+            return RedisBucketBackend(RATE_LIMIT_REDIS_URL)
+        except ImportError:
+            logger.warning("RATE_LIMIT_REDIS_URL is set but redis is not installed; using in-memory rate limits")
+    return InMemoryBucketBackend()
+
+
+_shared_backend = None
+
+
+def shared_backend():
+    """The process-wide bucket store, so every RateLimitMiddleware instance counts against the same buckets."""
+    global _shared_backend
+    if _shared_backend is None:
+        _shared_backend = create_backend()
+    return _shared_backend
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying RATE_LIMIT_RULES before the request reaches a router."""
+
+    def __init__(self, app, rules=None, backend=None):
+        self.app = app
+        self.rules = RATE_LIMIT_RULES if rules is None else rules
+        self.backend = backend or shared_backend()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        method, path = scope["method"], scope["path"]
+        rule = next((r for r in self.rules if r.matches(method, path)), None)
+        if rule is not None:
+            claims = decode_token_claims(scope)
+            role = claims.get("role") if claims else None
+            limit = rule.limit_for(role)
+            if limit is not None:
+                if claims and claims.get("sub"):
+                    caller = f"user:{claims['sub']}"
+                else:
+                    client = scope.get("client")
+                    caller = f"ip:{client[0] if client else 'unknown'}"
+                wait = self.backend.take(f"{caller}:{rule.method}:{rule.path_prefix}", limit)
+                if wait > 0:
+                    response = JSONResponse(
+                        {"detail": "Too many requests"},
+                        status_code=429,
+                        headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
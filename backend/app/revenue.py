@@ -0,0 +1,74 @@
+# Revenue rollups maintained in the payment write path.
+# Every payment change adjusts the organization, client and project rows for both
+# its month and the running total, so reports read a handful of rows instead
+# of summing the payments table.
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app import models
+
+TOTAL = "total"
+
+
+def period_of(date: datetime) -> str:
+    return date.strftime("%Y-%m")
+
+
+def _adjust(db: Session, scope: str, scope_id: int, period: str, amount: int, count: int):
+    rollup = models.RevenueRollup
+    result = db.execute(
+        update(rollup)
+        .where(rollup.scope == scope, rollup.scope_id == scope_id, rollup.period == period)
+        .values(amount=rollup.amount + amount, payment_count=rollup.payment_count + count)
+    )
+    if result.rowcount == 0:
+        db.add(rollup(scope=scope, scope_id=scope_id, period=period, amount=amount, payment_count=count))
+        db.flush()
+
+
+def apply_payment(
+    db: Session, organization_id: int, client_id: Optional[int], project_id: int, date: datetime, amount: int,
+    sign: int = 1
+):
+    """Add (sign=1) or remove (sign=-1) one payment from every rollup it belongs to."""
+    scopes = [("organization", organization_id), ("project", project_id)]
+    if client_id is not None:
+        scopes.append(("client", client_id))
+    for scope, scope_id in scopes:
+        for period in (TOTAL, period_of(date)):
+            _adjust(db, scope, scope_id, period, sign * amount, sign)
+
+
+def move_project(db: Session, project_id: int, old_client_id: Optional[int], new_client_id: Optional[int]):
+    """Re-attribute a project's revenue when it moves to another client (one row per month, not per payment)."""
+    rows = db.query(models.RevenueRollup).filter(
+        models.RevenueRollup.scope == "project",
+        models.RevenueRollup.scope_id == project_id
+    ).all()
+    for row in rows:
+        if old_client_id is not None:
+            _adjust(db, "client", old_client_id, row.period, -row.amount, -row.payment_count)
+        if new_client_id is not None:
+            _adjust(db, "client", new_client_id, row.period, row.amount, row.payment_count)
+
+
+def report(db: Session, scope: str, scope_id: int, period_from: Optional[str] = None, period_to: Optional[str] = None):
+    """Total plus per-month rows for one scope, read straight from the rollups."""
+    rows = db.query(models.RevenueRollup).filter(
+        models.RevenueRollup.scope == scope,
+        models.RevenueRollup.scope_id == scope_id
+    ).all()
+    total = next((r for r in rows if r.period == TOTAL), None)
+    months = sorted(
+        (r for r in rows if r.period != TOTAL
+         and (period_from is None or r.period >= period_from)
+         and (period_to is None or r.period <= period_to)
+         and r.payment_count),
+        key=lambda r: r.period,
+    )
+    return {
+        "total": total.amount if total else 0,
+        "payment_count": total.payment_count if total else 0,
+        "months": [{"period": r.period, "amount": r.amount, "payment_count": r.payment_count} for r in months],
+    }
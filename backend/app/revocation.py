@@ -0,0 +1,82 @@
+# Server-side revocation list for access tokens.
+# - Revoked jtis are kept in memory (dict lookup per request) and in the
+#   revoked_tokens table, each until the token would have expired anyway
+# - Revocations bump the "revoked_tokens" cache version in the same transaction;
+#   workers compare it at most every REVOCATION_CHECK_SECONDS and reload on change
+# - An hourly job drops expired revocations and refresh tokens through the write queue
+import os
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from app import models
+from app.cache_versions import bump_version, read_version
+from app.database import SessionLocal
+from app.write_queue import run_write
+
+REVOCATION_CHECK_SECONDS = float(os.getenv("REVOCATION_CHECK_SECONDS", "1"))
+VERSION_KEY = "revoked_tokens"
+
+
+class RevocationList:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked: dict[str, datetime] = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def load(self, db: Session):
+        version = read_version(db, VERSION_KEY)
+        now = datetime.utcnow()
+        rows = db.query(models.RevokedToken.jti, models.RevokedToken.expires_at).filter(
+            models.RevokedToken.expires_at > now
+        )
+        revoked = {jti: expires_at for jti, expires_at in rows}
+        with self._lock:
+            self._revoked = revoked
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def ensure_current(self, db: Session):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < REVOCATION_CHECK_SECONDS:
+            return
+        if self._version is None or read_version(db, VERSION_KEY) != self._version:
+            self.load(db)
+        else:
+            self._checked_at = now
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        self.ensure_current(db)
+        return jti in self._revoked
+
+    def revoke(self, db: Session, jti: str, expires_at: datetime):
+        """Revoke an access token; the caller commits, then calls applied() with the returned version."""
+        if db.get(models.RevokedToken, jti) is None:
+            db.add(models.RevokedToken(jti=jti, expires_at=expires_at))
+        return bump_version(db, VERSION_KEY)
+
+    def applied(self, jti: str, expires_at: datetime, version: int):
+        with self._lock:
+            self._revoked[jti] = expires_at
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def purge_expired(self):
+        now = datetime.utcnow()
+        with self._lock:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+
+        def write(db: Session):
+            db.execute(delete(models.RevokedToken).where(models.RevokedToken.expires_at <= now))
+            db.execute(delete(models.RefreshToken).where(models.RefreshToken.expires_at <= now))
+
+        db = SessionLocal()
+        try:
+            run_write(db, write)
+        finally:
+            db.close()
+
+
+revocations = RevocationList()
@@ -0,0 +1,56 @@
+# Create Activity feed routes:
+# - Get activity for a project (Admin or users assigned to it)
+# - Get activity by a user (Admin or the user themselves)
+# Feeds are newest first and keyset-paginated with before_id.
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy.orm import Session
+from app import activity, models
+from app.auth import get_current_user
+from app.database import get_db
+from app.membership import memberships
+
+router = APIRouter(prefix="/activity", tags=["activity"])
+
+
+class ActivityResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    actor_id: Optional[int] = None
+    actor_name: Optional[str] = None
+    project_id: Optional[int] = None
+    entity_type: str
+    entity_id: Optional[int] = None
+    action: str
+    summary: str
+    created_at: datetime
+
+
+@router.get("/project/{project_id}", response_model=list[ActivityResponse])
+def get_project_activity(
+    project_id: int,
+    before_id: Optional[int] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user.role != models.UserRole.Admin:
+        if not memberships.is_member(db, current_user.id, project_id):
+            raise HTTPException(status_code=403, detail="Access forbidden: You are not assigned to this project")
+    return activity.feed(db, project_ids=[project_id], before_id=before_id, limit=limit)
+
+
+@router.get("/user/{user_id}", response_model=list[ActivityResponse])
+def get_user_activity(
+    user_id: int,
+    before_id: Optional[int] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user.role != models.UserRole.Admin and current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Access forbidden")
+    return activity.feed(db, actor_id=user_id, before_id=before_id, limit=limit)
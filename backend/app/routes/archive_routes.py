@@ -0,0 +1,119 @@
+# Create Archive routes (Admin only):
+# - List archived projects (optionally for one client) and read one in full
+# - Archive a completed project now, or run the age-based archival job for the Admin's organization
+# - Restore an archived project into the hot tables
+# Archived projects live in archived_projects as compressed documents, see app/archive.py.
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy.orm import Session
+from app import archive, models
+from app.auth import require_role
+from app.database import get_db
+from app.routes.assignment_routes import AssignmentResponse
+from app.routes.payment_routes import PaymentResponse
+from app.routes.project_routes import ProjectResponse
+from app.routes.task_routes import TaskResponse
+
+router = APIRouter(prefix="/archive", tags=["archive"])
+
+
+class ArchivedProjectSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    client_id: Optional[int] = None
+    name: str
+    completed_at: Optional[datetime] = None
+    archived_at: datetime
+    task_count: int
+    payment_total: int
+
+
+class ArchivedDependency(BaseModel):
+    blocker_id: int
+    blocked_id: int
+
+
+class ArchivedProjectDetail(ArchivedProjectSummary):
+    project: ProjectResponse
+    tasks: list[TaskResponse]
+    dependencies: list[ArchivedDependency]
+    assignments: list[AssignmentResponse]
+    payments: list[PaymentResponse]
+
+
+class ArchiveRun(BaseModel):
+    archived: list[int]
+
+
+@router.get("/projects", response_model=list[ArchivedProjectSummary])
+def get_archived_projects(
+    client_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin"))
+):
+    # Summary columns only; the compressed payload isn't loaded for lists
+    query = db.query(
+        models.ArchivedProject.id, models.ArchivedProject.client_id, models.ArchivedProject.name,
+        models.ArchivedProject.completed_at, models.ArchivedProject.archived_at,
+        models.ArchivedProject.task_count, models.ArchivedProject.payment_total
+    )
+    if client_id is not None:
+        query = query.filter(models.ArchivedProject.client_id == client_id)
+    return [ArchivedProjectSummary.model_validate(row) for row in query.order_by(models.ArchivedProject.archived_at.desc())]
+
+
+@router.get("/projects/{project_id}", response_model=ArchivedProjectDetail)
+def get_archived_project(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin"))
+):
+    archived = db.get(models.ArchivedProject, project_id)
+    if archived is None:
+        raise HTTPException(status_code=404, detail="Archived project not found")
+    document = archive.decode(archived.payload)
+
+    # Rebuild transient (never added to the session) rows so the usual response schemas apply
+    def rows(model, key):
+        return [model(**archive.load_row(model, values)) for values in document[key]]
+
+    return ArchivedProjectDetail(
+        **ArchivedProjectSummary.model_validate(archived).model_dump(),
+        project=ProjectResponse.from_db(models.Project(**archive.load_row(models.Project, document["project"]))),
+        tasks=[TaskResponse.from_db(task) for task in rows(models.Task, "tasks")],
+        dependencies=[ArchivedDependency(blocker_id=d["blocker_id"], blocked_id=d["blocked_id"]) for d in document["dependencies"]],
+        assignments=[AssignmentResponse.model_validate(a) for a in rows(models.ProjectAssignment, "assignments")],
+        payments=[PaymentResponse.model_validate(p) for p in rows(models.Payment, "payments")],
+    )
+
+
+@router.post("/projects/{project_id}", response_model=ArchivedProjectSummary)
+def archive_project(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin"))
+):
+    """Archive a completed project now, regardless of ARCHIVE_AFTER_DAYS."""
+    return ArchivedProjectSummary.model_validate(archive.archive_project(db, project_id, current_user))
+
+
+@router.post("/projects/{project_id}/restore", response_model=ProjectResponse)
+def restore_project(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin"))
+):
+    """Move an archived project back; its id is kept unless another project took it meanwhile."""
+    return ProjectResponse.from_db(archive.restore_project(db, project_id, current_user))
+
+
+@router.post("/run", response_model=ArchiveRun)
+def run_archival(
+    older_than_days: int = Query(default=archive.ARCHIVE_AFTER_DAYS, ge=0),
+    current_user: models.User = Depends(require_role("Admin"))
+):
+    """Run the archival job now for the caller's organization: projects Completed for more than older_than_days."""
+    return ArchiveRun(archived=archive.archive_completed_projects(older_than_days, current_user.organization_id))
@@ -5,13 +5,20 @@
 # - Get all projects assigned to a user
 # Validate project_id and user_id exist before creating assignment.
 # Prevent duplicate assignments.
+# Listing endpoints accept fields= (sparse columns); projects also include=client.
+# Every write bumps the membership version and updates the in-memory index after commit.
+# Writes run as closures on the single-writer queue (app/write_queue.py).
 from datetime import datetime
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app import models
+from app import activity, inbox, models
 from app.database import get_db
+from app.fieldsets import FieldSet, Relation
+from app.cache_versions import bump_version
+from app.membership import VERSION_KEY, memberships
 from app.auth import require_role, get_current_user
+from app.write_queue import run_write
 from pydantic import BaseModel, ConfigDict
 
 router = APIRouter(prefix="/assignments", tags=["assignments"])
@@ -47,38 +54,61 @@ class ProjectBasicInfo(BaseModel):
     description: Optional[str] = None
 
 
+USER_FIELDS = FieldSet(
+    models.User,
+    tuple(UserBasicInfo.model_fields),
+    serializers={"role": lambda value: value.value},
+)
+
+ASSIGNED_PROJECT_FIELDS = FieldSet(
+    models.Project,
+    tuple(ProjectBasicInfo.model_fields),
+    relations={"client": Relation(models.Project.client, (models.Client.id, models.Client.name))},
+)
+
+
 @router.post("/", response_model=AssignmentResponse, status_code=status.HTTP_201_CREATED)
 def assign_user_to_project(
     assignment: AssignmentCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
 ):
-    # Validate user_id exists
-    user = db.query(models.User).filter(models.User.id == assignment.user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    def write(db: Session):
+        # Validate user_id exists
+        user = db.query(models.User).filter(models.User.id == assignment.user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
     
-    # Validate project_id exists
-    project = db.query(models.Project).filter(models.Project.id == assignment.project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+        # Validate project_id exists
+        project = db.query(models.Project).filter(models.Project.id == assignment.project_id).first()
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
     
-    # Check for duplicate assignment
-    existing = db.query(models.ProjectAssignment).filter(
-        models.ProjectAssignment.user_id == assignment.user_id,
-        models.ProjectAssignment.project_id == assignment.project_id
-    ).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="User is already assigned to this project")
+        # Check for duplicate assignment
+        existing = db.query(models.ProjectAssignment).filter(
+            models.ProjectAssignment.user_id == assignment.user_id,
+            models.ProjectAssignment.project_id == assignment.project_id
+        ).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="User is already assigned to this project")
     
-    # Create assignment
-    new_assignment = models.ProjectAssignment(
-        user_id=assignment.user_id,
-        project_id=assignment.project_id
-    )
-    db.add(new_assignment)
-    db.commit()
-    db.refresh(new_assignment)
+        # Create assignment
+        new_assignment = models.ProjectAssignment(
+            user_id=assignment.user_id,
+            project_id=assignment.project_id
+        )
+        db.add(new_assignment)
+        db.flush()
+        inbox.add_member(db, user, project)
+        activity.record(
+            db, current_user, "assigned", "assignment", new_assignment.id,
+            f"Assigned {user.full_name or user.email} to {project.name}", project_id=project.id
+        )
+        version = bump_version(db, VERSION_KEY)
+        return new_assignment, version
+
+    new_assignment, version = run_write(db, write)
+    memberships.add(new_assignment.user_id, new_assignment.project_id, version)
     return new_assignment
 
 
@@ -88,20 +118,42 @@ def remove_user_from_project(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("Admin"))
 ):
-    assignment = db.query(models.ProjectAssignment).filter(
-        models.ProjectAssignment.id == assignment_id
-    ).first()
-    if not assignment:
-        raise HTTPException(status_code=404, detail="Assignment not found")
+    def write(db: Session):
+        assignment = db.query(models.ProjectAssignment).filter(
+            models.ProjectAssignment.id == assignment_id
+        ).first()
+        if not assignment:
+            raise HTTPException(status_code=404, detail="Assignment not found")
     
-    db.delete(assignment)
-    db.commit()
+        user_id, project_id = assignment.user_id, assignment.project_id
+        db.delete(assignment)
+        db.flush()
+        # Older databases may hold duplicate rows; membership only ends with the last one
+        still_member = db.query(models.ProjectAssignment.id).filter(
+            models.ProjectAssignment.user_id == user_id,
+            models.ProjectAssignment.project_id == project_id
+        ).first() is not None
+        if not still_member:
+            inbox.remove_member(db, user_id, project_id)
+        activity.record(
+            db, current_user, "unassigned", "assignment", assignment_id,
+            f"Removed user {user_id} from project {project_id}", project_id=project_id
+        )
+        version = bump_version(db, VERSION_KEY)
+        return assignment, still_member, version
+
+    assignment, still_member, version = run_write(db, write)
+    if still_member:
+        memberships.add(assignment.user_id, assignment.project_id, version)
+    else:
+        memberships.remove(assignment.user_id, assignment.project_id, version)
     return {"msg": "Assignment removed successfully"}
 
 
 @router.get("/project/{project_id}", response_model=list[UserBasicInfo])
 def get_users_assigned_to_project(
     project_id: int,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -110,19 +162,24 @@ def get_users_assigned_to_project(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    selection = USER_FIELDS.parse(fields, None)
     # Get users using JOIN for better performance
-    users = (
+    query = (
         db.query(models.User)
         .join(models.ProjectAssignment)
         .filter(models.ProjectAssignment.project_id == project_id)
-        .all()
     )
+    if selection:
+        return USER_FIELDS.respond(USER_FIELDS.apply(query, selection).all(), selection)
+    users = query.all()
     return users
 
 
 @router.get("/user/{user_id}", response_model=list[ProjectBasicInfo])
 def get_projects_assigned_to_user(
     user_id: int,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -131,11 +188,14 @@ def get_projects_assigned_to_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    selection = ASSIGNED_PROJECT_FIELDS.parse(fields, include)
     # Get projects using JOIN for better performance
-    projects = (
+    query = (
         db.query(models.Project)
         .join(models.ProjectAssignment)
         .filter(models.ProjectAssignment.user_id == user_id)
-        .all()
     )
+    if selection:
+        return ASSIGNED_PROJECT_FIELDS.respond(ASSIGNED_PROJECT_FIELDS.apply(query, selection).all(), selection)
+    projects = query.all()
     return projects
@@ -1,14 +1,25 @@
 # Create authentication routes:
-# - Register user (Admin only)
+# - Register user (Admin only, into the Admin's organization)
 # - Login user (return JWT token)
 # Use OAuth2PasswordRequestForm
 # Use authenticate_user and create_access_token
+# - Refresh access tokens with a rotating refresh token (no password check)
+# - Logout revokes the access token and the refresh token (or every session)
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app import models
 from app.database import get_db
-from app.auth import authenticate_user, create_access_token, get_current_user, get_password_hash, require_role
+from datetime import datetime
+from jose import jwt
+from app.auth import (
+    ALGORITHM, SECRET_KEY, authenticate_user, create_access_token, get_current_user, get_password_hash,
+    issue_refresh_token, oauth2_scheme, require_role, revoke_refresh_family, rotate_refresh_token,
+    _find_refresh_token,
+)
+from app.revocation import revocations
+from app.tenancy import ALL_ORGANIZATIONS
+from app.write_queue import run_write
 from pydantic import BaseModel
 from typing import Optional
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -21,32 +32,94 @@ class RegisterRequest(BaseModel):
     role: models.UserRole = models.UserRole.TeamMember
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+    all_sessions: bool = False
+
+
+def _token_response(user: models.User, refresh_token: str) -> dict:
+    access_token = create_access_token(data={"sub": user.email, "role": user.role.value, "org": user.organization_id})
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+def _email_taken(db: Session, email: str) -> bool:
+    # Emails are unique across organizations: login finds the organization by email
+    query = db.query(models.User.id).filter(models.User.email == email)
+    return query.execution_options(**ALL_ORGANIZATIONS).first() is not None
+
+
 @router.post("/register")
 def register_user(
     payload: RegisterRequest,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("Admin"))
 ):
-    if db.query(models.User).filter(models.User.email == payload.email).first():
+    if _email_taken(db, payload.email):
         raise HTTPException(status_code=400, detail="Email already registered")
+    # Hash before queueing: bcrypt must not hold up the writer
     hashed_password = get_password_hash(payload.password)
-    new_user = models.User(
-        full_name=payload.full_name,
-        email=payload.email,
-        hashed_password=hashed_password,
-        role=payload.role,
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+
+    def write(db: Session):
+        if _email_taken(db, payload.email):
+            raise HTTPException(status_code=400, detail="Email already registered")
+        # organization_id comes from the registering Admin's session
+        db.add(models.User(
+            full_name=payload.full_name,
+            email=payload.email,
+            hashed_password=hashed_password,
+            role=payload.role,
+        ))
+
+    run_write(db, write)
     return {"msg": "User registered successfully"}
 @router.post("/login")
 def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
-    access_token = create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = run_write(db, lambda db: issue_refresh_token(db, user))
+    return _token_response(user, refresh_token)
+
+
+@router.post("/refresh")
+def refresh_access_token(payload: RefreshRequest, db: Session = Depends(get_db)):
+    """Trade a refresh token for a new access token and a new refresh token; the old one stops working."""
+    user, refresh_token = rotate_refresh_token(db, payload.refresh_token)
+    return _token_response(user, refresh_token)
+
+
+@router.post("/logout")
+def logout_user(
+    payload: LogoutRequest,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    jti, expires_at = claims.get("jti"), datetime.utcfromtimestamp(claims["exp"])
+
+    def write(db: Session) -> Optional[int]:
+        if payload.all_sessions:
+            db.query(models.RefreshToken).filter(
+                models.RefreshToken.user_id == current_user.id,
+                models.RefreshToken.revoked_at.is_(None)
+            ).update({models.RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+        elif payload.refresh_token:
+            row = _find_refresh_token(db, payload.refresh_token)
+            if row is not None and row.user_id == current_user.id:
+                revoke_refresh_family(db, row.family_id)
+        if jti is not None:
+            return revocations.revoke(db, jti, expires_at)
+        return None
+
+    version = run_write(db, write)
+    if version is not None:
+        revocations.applied(jti, expires_at, version)
+    return {"msg": "Logged out"}
 
 
 @router.get("/me")
@@ -56,4 +129,5 @@ def get_me(current_user: models.User = Depends(get_current_user)):
         "full_name": current_user.full_name,
         "email": current_user.email,
         "role": current_user.role,
+        "organization_id": current_user.organization_id,
     }
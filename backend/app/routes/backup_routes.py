@@ -0,0 +1,74 @@
+# Create Backup routes (Admins of the default organization only; a backup
+# holds every organization's data):
+# - Start an online backup of the SQLite database (runs in the background)
+# - List finished backups and the one in progress
+# - Download a backup (gzip; its SHA-256 is in the X-Checksum-SHA256 header)
+# See app/backup.py; python backup_database.py does the same from the command line.
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, ConfigDict
+from app import models
+from app.auth import require_role
+from app.backup import BackupError, backup_file, backups, list_backups
+
+router = APIRouter(prefix="/backups", tags=["backups"])
+
+
+class BackupResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    name: str
+    status: str
+    method: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+    restarts: int = 0
+    error: Optional[str] = None
+
+
+class BackupList(BaseModel):
+    running: Optional[BackupResponse] = None
+    last: Optional[BackupResponse] = None
+    backups: list[BackupResponse]
+
+
+def require_system_admin(current_user: models.User = Depends(require_role("Admin"))):
+    if current_user.organization_id != models.DEFAULT_ORGANIZATION_ID:
+        raise HTTPException(status_code=403, detail="Operation not permitted")
+    return current_user
+
+
+@router.post("/", response_model=BackupResponse, status_code=status.HTTP_202_ACCEPTED)
+def start_backup(current_user: models.User = Depends(require_system_admin)):
+    """Start a backup in this worker; poll GET /backups for the result."""
+    try:
+        backup = backups.start()
+    except BackupError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if backup is None:
+        raise HTTPException(status_code=409, detail="A backup is already running")
+    return BackupResponse.model_validate(backup)
+
+
+@router.get("/", response_model=BackupList)
+def get_backups(current_user: models.User = Depends(require_system_admin)):
+    running, last = backups.current, backups.last
+    return BackupList(
+        running=BackupResponse.model_validate(running) if running else None,
+        last=BackupResponse.model_validate(last) if last else None,
+        backups=[BackupResponse.model_validate(backup) for backup in list_backups()],
+    )
+
+
+@router.get("/{name}")
+def download_backup(name: str, current_user: models.User = Depends(require_system_admin)):
+    path = backup_file(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Backup not found")
+    sha256 = next((backup.sha256 for backup in list_backups() if backup.name == name), None)
+    headers = {"X-Checksum-SHA256": sha256} if sha256 else {}
+    return FileResponse(path, media_type="application/gzip", filename=f"{name}.db.gz", headers=headers)
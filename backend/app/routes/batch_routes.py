@@ -0,0 +1,143 @@
+# Create Batch route:
+# - POST /batch runs several GET sub-requests in one HTTP call (page-load fan-out)
+# - The caller is authenticated once; sub-requests reuse that user instead of
+#   decoding the token and looking the user up again
+# - Sub-requests are dispatched in-process to the app's routers, concurrently,
+#   each with its own DB session (sessions aren't safe to share across threads)
+# - Each item gets its own status and body; one failing item doesn't fail the batch
+import asyncio
+import json
+import os
+from typing import Any, Optional
+from urllib.parse import urlsplit
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.middleware.asyncexitstack import AsyncExitStackMiddleware
+from pydantic import BaseModel, Field
+from starlette.middleware.exceptions import ExceptionMiddleware
+from app import models
+from app.auth import BATCH_USER_SCOPE_KEY, get_current_user
+from app.rate_limit import RATE_LIMIT_ENABLED, RateLimitMiddleware
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+BATCH_ITEM_TIMEOUT_SECONDS = float(os.getenv("BATCH_ITEM_TIMEOUT_SECONDS", "10"))
+
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem] = Field(min_length=1)
+
+
+class BatchItemResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    responses: list[BatchItemResponse]
+
+
+_dispatchers = {}
+
+
+def _dispatcher(app):
+    """The app's routers wrapped in the same exception handling (and rate limits) as a normal request."""
+    dispatcher = _dispatchers.get(id(app))
+    if dispatcher is None:
+        handlers = {
+            key: value for key, value in app.exception_handlers.items()
+            if key not in (500, Exception)
+        }
+        dispatcher = ExceptionMiddleware(AsyncExitStackMiddleware(app.router), handlers=handlers)
+        if RATE_LIMIT_ENABLED:
+            dispatcher = RateLimitMiddleware(dispatcher)
+        _dispatchers[id(app)] = dispatcher
+    return dispatcher
+
+
+async def _run(request: Request, current_user: models.User, item: BatchItem) -> BatchItemResponse:
+    url = urlsplit(item.path)
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": "",
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "headers": [
+            (name, value) for name, value in request.scope["headers"]
+            if name in (b"authorization", b"host", b"user-agent")
+        ] + [(b"accept", b"application/json")],
+        "app": request.app,
+        BATCH_USER_SCOPE_KEY: current_user,
+    }
+    status_code = 500
+    chunks = []
+    content_type = ""
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Nothing more to read; the client "disconnects" only when the item times out
+        await asyncio.sleep(BATCH_ITEM_TIMEOUT_SECONDS)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code, content_type
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            for name, value in message.get("headers", []):
+                if name.lower() == b"content-type":
+                    content_type = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await asyncio.wait_for(_dispatcher(request.app)(scope, receive, send), BATCH_ITEM_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return BatchItemResponse(id=item.id, status=504, body={"detail": "Sub-request timed out"})
+    except Exception:
+        return BatchItemResponse(id=item.id, status=500, body={"detail": "Internal Server Error"})
+
+    raw = b"".join(chunks)
+    if content_type.startswith("application/json") and raw:
+        body = json.loads(raw)
+    else:
+        body = raw.decode("utf-8", errors="replace") or None
+    return BatchItemResponse(id=item.id, status=status_code, body=body)
+
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(
+    batch: BatchRequest,
+    request: Request,
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Body: {"requests": [{"id": "tasks", "method": "GET", "path": "/tasks/?status=ToDo"}, ...]}
+    Responses come back in request order as {"id", "status", "body"}.
+    """
+    if len(batch.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"A batch is limited to {BATCH_MAX_REQUESTS} requests")
+    for item in batch.requests:
+        if item.method.upper() != "GET":
+            raise HTTPException(status_code=400, detail="Only GET sub-requests are supported")
+        if not item.path.startswith("/") or urlsplit(item.path).path.rstrip("/") == "/batch":
+            raise HTTPException(status_code=400, detail=f"Invalid sub-request path: {item.path}")
+    responses = await asyncio.gather(*(_run(request, current_user, item) for item in batch.requests))
+    return BatchResponse(responses=list(responses))
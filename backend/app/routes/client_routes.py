@@ -6,13 +6,15 @@
 # - Delete client (Admin only)
 # Use Pydantic schemas for request and response models.
 # Use role-based protection with require_role.
+# Writes run as closures on the single-writer queue (app/write_queue.py).
 from datetime import datetime
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app import models
+from app import activity, models
 from app.database import get_db
 from app.auth import require_role
+from app.write_queue import run_write
 from pydantic import BaseModel, ConfigDict
 
 router = APIRouter(prefix="/clients", tags=["clients"])
@@ -34,10 +36,13 @@ class ClientResponse(BaseModel):
     created_at: datetime
 @router.post("/", response_model=ClientResponse, status_code=status.HTTP_201_CREATED)
 def create_client(client: ClientCreate, db: Session = Depends(get_db), current_user: models.User = Depends(require_role("Admin", "ProjectManager"))):
-    new_client = models.Client(name=client.name, contact_info=client.contact_info)
-    db.add(new_client)
-    db.commit()
-    db.refresh(new_client)
+    def write(db: Session) -> models.Client:
+        new_client = models.Client(name=client.name, contact_info=client.contact_info)
+        db.add(new_client)
+        db.flush()
+        activity.record(db, current_user, "created", "client", new_client.id, f"Created client {new_client.name}")
+        return new_client
+    new_client = run_write(db, write)
     return new_client
 @router.get("/", response_model=list[ClientResponse])
 def get_clients(db: Session = Depends(get_db), current_user: models.User = Depends(require_role("Admin", "ProjectManager"))):
@@ -50,21 +55,26 @@ def get_client(client_id: int, db: Session = Depends(get_db), current_user: mode
     return client
 @router.put("/{client_id}", response_model=ClientResponse)
 def update_client(client_id: int, client_update: ClientUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(require_role("Admin", "ProjectManager"))):
-    client = db.query(models.Client).filter(models.Client.id == client_id).first()
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found")
-    if client_update.name is not None:
-        client.name = client_update.name
-    if client_update.contact_info is not None:
-        client.contact_info = client_update.contact_info
-    db.commit()
-    db.refresh(client)
+    def write(db: Session) -> models.Client:
+        client = db.query(models.Client).filter(models.Client.id == client_id).first()
+        if not client:
+            raise HTTPException(status_code=404, detail="Client not found")
+        if client_update.name is not None:
+            client.name = client_update.name
+        if client_update.contact_info is not None:
+            client.contact_info = client_update.contact_info
+        activity.record(db, current_user, "updated", "client", client.id, f"Updated client {client.name}")
+        return client
+    client = run_write(db, write)
     return client
 @router.delete("/{client_id}")
 def delete_client(client_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(require_role("Admin"))):
-    client = db.query(models.Client).filter(models.Client.id == client_id).first()
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found")
-    db.delete(client)
-    db.commit()
+    def write(db: Session) -> models.Client:
+        client = db.query(models.Client).filter(models.Client.id == client_id).first()
+        if not client:
+            raise HTTPException(status_code=404, detail="Client not found")
+        db.delete(client)
+        activity.record(db, current_user, "deleted", "client", client_id, f"Deleted client {client.name}")
+        return client
+    client = run_write(db, write)
     return {"msg": "Client deleted successfully"}
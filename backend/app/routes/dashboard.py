@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.auth import get_current_user
-from app import models
+from app import activity, models
+from app.membership import memberships
+from app.routes.activity_routes import ActivityResponse
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
@@ -19,4 +22,17 @@ def get_dashboard_stats(
         "total_clients": total_clients,
         "active_projects": active_projects,
         "completed_tasks": completed_tasks,
-    }
\ No newline at end of file
+    }
+
+@router.get("/activity", response_model=list[ActivityResponse])
+def get_recent_activity(
+    before_id: Optional[int] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # Admin sees everything; others see activity in projects they're assigned to
+    if current_user.role == models.UserRole.Admin:
+        return activity.feed(db, before_id=before_id, limit=limit)
+    project_ids = list(memberships.project_ids(db, current_user.id))
+    return activity.feed(db, project_ids=project_ids, before_id=before_id, limit=limit)
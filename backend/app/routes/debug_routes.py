@@ -0,0 +1,54 @@
+# Create Debug routes (Admin only):
+# - Sample the worker that serves the request for N seconds and return the
+#   profile as collapsed stacks or a speedscope file
+# - Fetch a profile recorded for a single request sent with X-Profile: 1
+# Only one profile runs per worker at a time; a second one gets 409.
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app import models
+from app.auth import require_role
+from app.profiler import PROFILE_MAX_SECONDS, Profile, profiler
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+ProfileFormat = Literal["collapsed", "speedscope"]
+
+
+def _render(profile: Profile, format: ProfileFormat):
+    headers = {
+        "X-Profile-Id": profile.id,
+        "X-Profile-Samples": str(profile.samples),
+        "Content-Disposition": f'attachment; filename="profile-{profile.id}.{"json" if format == "speedscope" else "txt"}"',
+    }
+    if format == "speedscope":
+        return JSONResponse(profile.speedscope(), headers=headers)
+    return PlainTextResponse(profile.collapsed(), headers=headers)
+
+
+@router.get("/profile")
+def profile_worker(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    format: ProfileFormat = "collapsed",
+    include_idle: bool = False,
+    current_user: models.User = Depends(require_role("Admin"))
+):
+    """Sample every thread of this worker for `seconds` and return where they spent it."""
+    profile = profiler.run(seconds, include_idle)
+    if profile is None:
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+    return _render(profile, format)
+
+
+@router.get("/profiles/{profile_id}")
+def get_request_profile(
+    profile_id: str,
+    format: ProfileFormat = "collapsed",
+    current_user: models.User = Depends(require_role("Admin"))
+):
+    """Profile recorded for a request sent with X-Profile: 1 (see its X-Profile-Id header)."""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    profile.finished.wait(PROFILE_MAX_SECONDS)
+    return _render(profile, format)
@@ -0,0 +1,63 @@
+# Create "My work" routes for the current user:
+# - Inbox: open tasks assigned to them (ProjectManagers: also every task of
+#   their projects), most urgent first, with project name, due date and status
+# Served from the precomputed inbox_items table (app/inbox.py); pages are
+# keyset-paginated with the opaque after cursor from the previous page.
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app import inbox, models
+from app.auth import get_current_user
+from app.database import get_db
+from app.routes.task_routes import TaskStatusEnum, db_to_api_task_status
+
+router = APIRouter(prefix="/me", tags=["me"])
+
+
+class InboxItemResponse(BaseModel):
+    task_id: int
+    title: str
+    status: TaskStatusEnum
+    due_date: Optional[datetime] = None
+    overdue: bool
+    project_id: int
+    project_name: str
+
+    @classmethod
+    def from_db(cls, item: models.InboxItem, now: datetime) -> "InboxItemResponse":
+        return cls(
+            task_id=item.task_id,
+            title=item.title,
+            status=db_to_api_task_status(item.status),
+            due_date=item.due_date,
+            overdue=item.due_date is not None and item.due_date < now,
+            project_id=item.project_id,
+            project_name=item.project_name,
+        )
+
+
+class InboxPage(BaseModel):
+    items: list[InboxItemResponse]
+    # Pass as ?after= for the next page; null on the last page
+    next_cursor: Optional[str] = None
+
+
+@router.get("/inbox", response_model=InboxPage)
+def get_inbox(
+    after: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    cursor = None
+    if after is not None:
+        cursor = inbox.decode_cursor(after)
+        if cursor is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    # One row more than asked for tells whether there is a next page
+    items = inbox.page(db, current_user.id, cursor, limit + 1)
+    next_cursor = inbox.encode_cursor(items[limit - 1]) if len(items) > limit else None
+    now = datetime.utcnow()
+    return InboxPage(items=[InboxItemResponse.from_db(item, now) for item in items[:limit]], next_cursor=next_cursor)
@@ -0,0 +1,252 @@
+# Create Notification routes:
+# - List own notifications, newest first, keyset-paginated by id
+# - Unread count from the per-user counter (no COUNT scan)
+# - Mark notifications read in batch, or all at once
+# - Dismiss a notification
+# - Stream unread-count changes over Server-Sent Events, opened with a
+#   short-lived ticket rather than the access token in the URL
+# - Submit an admin access request (public; notifies every Admin)
+# Writes run as closures on the single-writer queue (app/write_queue.py).
+import asyncio
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from jose import jwt
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app import models, tenancy
+from app.auth import (
+    ALGORITHM, SECRET_KEY, TICKET_EXPIRE_SECONDS, create_ticket, decode_token, get_current_user,
+    get_user_from_claims, oauth2_scheme,
+)
+from app.database import SessionLocal, get_db
+from app.notifications import adjust_unread, admin_user_ids, get_counter, notify
+from app.revocation import revocations
+from app.write_queue import run_write
+
+router = APIRouter(prefix="/notifications", tags=["notifications"])
+
+STREAM_POLL_SECONDS = 2
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_TICKET_PURPOSE = "notification-stream"
+
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+
+class NotificationResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    kind: str
+    title: str
+    body: Optional[str] = None
+    link: Optional[str] = None
+    is_read: bool
+    created_at: datetime
+
+
+class UnreadCountResponse(BaseModel):
+    unread: int
+    version: int
+
+
+class MarkReadRequest(BaseModel):
+    ids: list[int] = []
+    all: bool = False
+
+
+class AdminAccessRequest(BaseModel):
+    email: str
+    reason: Optional[str] = None
+
+
+class StreamTicket(BaseModel):
+    ticket: str
+    expires_in: int
+
+
+@router.get("/", response_model=list[NotificationResponse])
+def list_notifications(
+    before_id: Optional[int] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    unread_only: bool = False,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    query = db.query(models.Notification).filter(models.Notification.user_id == current_user.id)
+    if unread_only:
+        query = query.filter(models.Notification.is_read.is_(False))
+    if before_id is not None:
+        query = query.filter(models.Notification.id < before_id)
+    return query.order_by(models.Notification.id.desc()).limit(limit).all()
+
+
+@router.get("/unread-count", response_model=UnreadCountResponse)
+def get_unread_count(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    unread, version = get_counter(db, current_user.id)
+    return UnreadCountResponse(unread=unread, version=version)
+
+
+@router.post("/mark-read", response_model=UnreadCountResponse)
+def mark_notifications_read(
+    payload: MarkReadRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if not payload.all and not payload.ids:
+        raise HTTPException(status_code=400, detail="Provide ids or set all to true")
+
+    def write(db: Session) -> tuple[int, int]:
+        query = update(models.Notification).where(
+            models.Notification.user_id == current_user.id,
+            models.Notification.is_read.is_(False),
+        )
+        if not payload.all:
+            query = query.where(models.Notification.id.in_(payload.ids))
+        changed = db.execute(query.values(is_read=True)).rowcount
+        if payload.all:
+            adjust_unread(db, current_user.id, 0, reset=True)
+        elif changed:
+            adjust_unread(db, current_user.id, -changed)
+        return get_counter(db, current_user.id)
+
+    unread, version = run_write(db, write)
+    return UnreadCountResponse(unread=unread, version=version)
+
+
+@router.delete("/{notification_id}")
+def delete_notification(
+    notification_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    def write(db: Session):
+        notification = db.query(models.Notification).filter(
+            models.Notification.id == notification_id,
+            models.Notification.user_id == current_user.id
+        ).first()
+        if not notification:
+            raise HTTPException(status_code=404, detail="Notification not found")
+        if not notification.is_read:
+            adjust_unread(db, current_user.id, -1)
+        db.delete(notification)
+
+    run_write(db, write)
+    return {"msg": "Notification deleted successfully"}
+
+
+@router.post("/admin-access-requests", status_code=status.HTTP_201_CREATED)
+def request_admin_access(payload: AdminAccessRequest, db: Session = Depends(get_db)):
+    """Public: someone without an account asks an Admin to register them."""
+    # Anonymous, so it goes to the default organization's Admins; other organizations onboard their own users
+    tenancy.bind(db, models.DEFAULT_ORGANIZATION_ID)
+
+    def write(db: Session):
+        notify(
+            db, admin_user_ids(db), "admin_access_request",
+            title=f"Access request from {payload.email}",
+            body=payload.reason or None,
+            link="/register",
+        )
+
+    run_write(db, write)
+    return {"msg": "Request sent"}
+
+
+@dataclass(frozen=True)
+class StreamSession:
+    user_id: int
+    # The access token the stream runs on: it ends when that token expires or is revoked
+    jti: Optional[str]
+    expires_at: datetime
+
+
+def _poll(session: StreamSession) -> Optional[tuple[int, int]]:
+    """(unread, version), or None once the stream's access token has been revoked."""
+    db = SessionLocal()
+    try:
+        if session.jti is not None and revocations.is_revoked(db, session.jti):
+            return None
+        return get_counter(db, session.user_id)
+    finally:
+        db.close()
+
+
+def _authenticate(token: str, purpose: Optional[str]) -> StreamSession:
+    db = SessionLocal()
+    try:
+        claims = decode_token(db, token, purpose)
+        user = get_user_from_claims(db, claims)
+    finally:
+        db.close()
+    if purpose is None:
+        return StreamSession(user.id, claims.get("jti"), datetime.utcfromtimestamp(claims["exp"]))
+    return StreamSession(user.id, claims.get("sid"), datetime.utcfromtimestamp(claims["sid_exp"]))
+
+
+@router.post("/stream-ticket", response_model=StreamTicket)
+def create_stream_ticket(
+    token: str = Depends(oauth2_scheme),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    A short-lived ticket for opening GET /notifications/stream. EventSource
+    can't send headers, and a ticket in the URL (and so in access logs) is
+    good for nothing else and only for TICKET_EXPIRE_SECONDS.
+    """
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return StreamTicket(ticket=create_ticket(claims, STREAM_TICKET_PURPOSE), expires_in=TICKET_EXPIRE_SECONDS)
+
+
+@router.get("/stream")
+async def stream_unread_count(
+    request: Request,
+    ticket: Optional[str] = None,
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+):
+    """
+    Server-Sent Events: emits an `unread` event with {unread, version} on connect
+    and whenever the counter changes. Each check is one primary-key lookup.
+    Authenticate with the Authorization header or ?ticket= from POST /stream-ticket.
+    The stream ends when the access token behind it expires or is revoked
+    (logout); the client reconnects with a fresh ticket.
+    """
+    if header_token:
+        session = await run_in_threadpool(_authenticate, header_token, None)
+    elif ticket:
+        session = await run_in_threadpool(_authenticate, ticket, STREAM_TICKET_PURPOSE)
+    else:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+
+    async def events():
+        last_version = None
+        idle = 0.0
+        while not await request.is_disconnected() and datetime.utcnow() < session.expires_at:
+            counter = await run_in_threadpool(_poll, session)
+            if counter is None:
+                return
+            unread, version = counter
+            if version != last_version:
+                last_version = version
+                idle = 0.0
+                yield f"event: unread\ndata: {json.dumps({'unread': unread, 'version': version})}\n\n"
+            elif idle >= STREAM_HEARTBEAT_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+            idle += STREAM_POLL_SECONDS
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
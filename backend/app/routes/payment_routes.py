@@ -0,0 +1,227 @@
+# Create Payment routes:
+# - Record a payment against a project (Admin, ProjectManager)
+# - List payments, optionally by project and date range (Admin, ProjectManager)
+# - Get, update and delete single payments (delete: Admin only)
+# - Revenue reports per project, per client and overall, by month
+# ProjectManagers only see payments and revenue of projects they're assigned to.
+# Every write keeps the revenue rollups in step, in the same transaction,
+# and runs as a closure on the single-writer queue (app/write_queue.py).
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy.orm import Session
+from app import activity, models, revenue
+from app.auth import require_role
+from app.database import get_db
+from app.membership import memberships
+from app.write_queue import run_write
+
+router = APIRouter(prefix="/payments", tags=["payments"])
+
+PERIOD_PATTERN = r"^\d{4}-\d{2}$"
+
+
+class PaymentCreate(BaseModel):
+    project_id: int
+    amount: int = Field(gt=0)
+    date: Optional[datetime] = None
+
+
+class PaymentUpdate(BaseModel):
+    project_id: Optional[int] = None
+    amount: Optional[int] = Field(default=None, gt=0)
+    date: Optional[datetime] = None
+
+
+class PaymentResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    project_id: int
+    amount: int
+    date: datetime
+
+
+class MonthlyRevenue(BaseModel):
+    period: str
+    amount: int
+    payment_count: int
+
+
+class RevenueReport(BaseModel):
+    total: int
+    payment_count: int
+    months: list[MonthlyRevenue]
+
+
+def _check_project_access(db: Session, current_user: models.User, project_id: int):
+    if current_user.role == models.UserRole.Admin:
+        return
+    if not memberships.is_member(db, current_user.id, project_id):
+        raise HTTPException(status_code=403, detail="Access forbidden: You are not assigned to this project")
+
+
+def _get_project(db: Session, project_id: int) -> models.Project:
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+
+def _get_payment(db: Session, payment_id: int) -> models.Payment:
+    payment = db.query(models.Payment).filter(models.Payment.id == payment_id).first()
+    if not payment:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    return payment
+
+
+@router.post("/", response_model=PaymentResponse, status_code=status.HTTP_201_CREATED)
+def create_payment(
+    payment: PaymentCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
+):
+    def write(db: Session):
+        project = _get_project(db, payment.project_id)
+        _check_project_access(db, current_user, project.id)
+        new_payment = models.Payment(
+            project_id=project.id,
+            amount=payment.amount,
+            date=payment.date or datetime.utcnow()
+        )
+        db.add(new_payment)
+        revenue.apply_payment(db, project.organization_id, project.client_id, project.id, new_payment.date, new_payment.amount)
+        db.flush()
+        activity.record(
+            db, current_user, "created", "payment", new_payment.id,
+            f"Recorded payment of {new_payment.amount} for {project.name}", project_id=new_payment.project_id
+        )
+        return new_payment
+
+    return run_write(db, write)
+
+
+@router.get("/", response_model=list[PaymentResponse])
+def get_payments(
+    project_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
+):
+    query = db.query(models.Payment)
+    if project_id is not None:
+        _check_project_access(db, current_user, project_id)
+        query = query.filter(models.Payment.project_id == project_id)
+    elif current_user.role != models.UserRole.Admin:
+        project_ids = memberships.project_ids(db, current_user.id)
+        query = query.filter(models.Payment.project_id.in_(project_ids))
+    # Served by the (project_id, date) index
+    if date_from is not None:
+        query = query.filter(models.Payment.date >= date_from)
+    if date_to is not None:
+        query = query.filter(models.Payment.date < date_to)
+    return query.order_by(models.Payment.date.desc(), models.Payment.id.desc()).offset(offset).limit(limit).all()
+
+
+@router.get("/revenue", response_model=RevenueReport)
+def get_total_revenue(
+    period_from: Optional[str] = Query(default=None, pattern=PERIOD_PATTERN),
+    period_to: Optional[str] = Query(default=None, pattern=PERIOD_PATTERN),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin"))
+):
+    return revenue.report(db, "organization", current_user.organization_id, period_from, period_to)
+
+
+@router.get("/revenue/project/{project_id}", response_model=RevenueReport)
+def get_project_revenue(
+    project_id: int,
+    period_from: Optional[str] = Query(default=None, pattern=PERIOD_PATTERN),
+    period_to: Optional[str] = Query(default=None, pattern=PERIOD_PATTERN),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
+):
+    _get_project(db, project_id)
+    _check_project_access(db, current_user, project_id)
+    return revenue.report(db, "project", project_id, period_from, period_to)
+
+
+@router.get("/revenue/client/{client_id}", response_model=RevenueReport)
+def get_client_revenue(
+    client_id: int,
+    period_from: Optional[str] = Query(default=None, pattern=PERIOD_PATTERN),
+    period_to: Optional[str] = Query(default=None, pattern=PERIOD_PATTERN),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin"))
+):
+    client = db.query(models.Client).filter(models.Client.id == client_id).first()
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+    return revenue.report(db, "client", client_id, period_from, period_to)
+
+
+@router.get("/{payment_id}", response_model=PaymentResponse)
+def get_payment(
+    payment_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
+):
+    payment = _get_payment(db, payment_id)
+    _check_project_access(db, current_user, payment.project_id)
+    return payment
+
+
+@router.put("/{payment_id}", response_model=PaymentResponse)
+def update_payment(
+    payment_id: int,
+    payment_update: PaymentUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
+):
+    def write(db: Session):
+        payment = _get_payment(db, payment_id)
+        old_project = _get_project(db, payment.project_id)
+        _check_project_access(db, current_user, old_project.id)
+        new_project = old_project
+        if payment_update.project_id is not None and payment_update.project_id != old_project.id:
+            new_project = _get_project(db, payment_update.project_id)
+            _check_project_access(db, current_user, new_project.id)
+
+        revenue.apply_payment(db, old_project.organization_id, old_project.client_id, old_project.id, payment.date, payment.amount, sign=-1)
+        payment.project_id = new_project.id
+        if payment_update.amount is not None:
+            payment.amount = payment_update.amount
+        if payment_update.date is not None:
+            payment.date = payment_update.date
+        revenue.apply_payment(db, new_project.organization_id, new_project.client_id, new_project.id, payment.date, payment.amount)
+        activity.record(
+            db, current_user, "updated", "payment", payment.id,
+            f"Updated payment of {payment.amount} for {new_project.name}", project_id=payment.project_id
+        )
+        return payment
+
+    return run_write(db, write)
+
+
+@router.delete("/{payment_id}")
+def delete_payment(
+    payment_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin"))
+):
+    def write(db: Session):
+        payment = _get_payment(db, payment_id)
+        project = _get_project(db, payment.project_id)
+        revenue.apply_payment(db, project.organization_id, project.client_id, project.id, payment.date, payment.amount, sign=-1)
+        activity.record(
+            db, current_user, "deleted", "payment", payment_id,
+            f"Deleted payment of {payment.amount} for {project.name}", project_id=project.id
+        )
+        db.delete(payment)
+
+    run_write(db, write)
+    return {"msg": "Payment deleted successfully"}
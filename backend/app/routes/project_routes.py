@@ -4,17 +4,29 @@
 # - Get single project by id (Authenticated users)
 # - Update project (Admin, ProjectManager)
 # - Delete project (Admin only)
+# - Daily burndown series per project, read from pre-aggregated snapshots
+# - Critical path over task dependencies, from the incrementally maintained graph
+# - Read endpoints accept fields= (sparse columns) and include=client
+# - Writes run as closures on the single-writer queue (app/write_queue.py)
+# - Updates are version-checked: If-Match (412) or a body version (409), see app/preconditions.py
 # Use Pydantic schemas for request and response models.
 # Use role-based protection with require_role.
 # Validate client_id exists before creating project.
 from datetime import date, datetime
 from enum import Enum
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from app import models
+from app import activity, history, inbox, models, revenue
+from app.archive import unused_project_id
+from app.critical_path import dependency_graphs
+from app.membership import memberships
+from app.preconditions import check_version, set_etag
 from app.database import get_db
+from app.fieldsets import FieldSet, Relation
+from app.write_queue import run_write
 from app.auth import require_role, get_current_user
+from app.routes.task_routes import TaskResponse
 from pydantic import BaseModel, ConfigDict
 
 router = APIRouter(prefix="/projects", tags=["projects"])
@@ -57,6 +69,8 @@ class ProjectUpdate(BaseModel):
     status: Optional[ProjectStatusEnum] = None
     start_date: Optional[date] = None
     end_date: Optional[date] = None
+    # The version the client last read; a stale one gets 409 (If-Match gets 412)
+    version: Optional[int] = None
 
 class ProjectResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -69,6 +83,7 @@ class ProjectResponse(BaseModel):
     start_date: Optional[date] = None
     end_date: Optional[date] = None
     created_at: datetime
+    version: int
     
     @staticmethod
     def from_db(db_project: models.Project) -> "ProjectResponse":
@@ -80,108 +95,213 @@ class ProjectResponse(BaseModel):
             status=db_to_api_status(db_project.status),
             start_date=db_project.start_date,
             end_date=db_project.end_date,
-            created_at=db_project.created_at
+            created_at=db_project.created_at,
+            version=db_project.version
         )
 
 
+PROJECT_FIELDS = FieldSet(
+    models.Project,
+    tuple(ProjectResponse.model_fields),
+    serializers={"status": lambda value: db_to_api_status(value).value},
+    relations={"client": Relation(models.Project.client, (models.Client.id, models.Client.name))},
+)
+
+
+class BurndownPoint(BaseModel):
+    day: date
+    todo: int
+    in_progress: int
+    done: int
+    total: int
+    remaining: int
+
+
+class CriticalPathTask(TaskResponse):
+    projected_finish: Optional[datetime] = None
+
+
+class CriticalPath(BaseModel):
+    project_id: int
+    earliest_finish: Optional[datetime] = None
+    path: list[CriticalPathTask]
+    late_tasks: list[CriticalPathTask]
+
+
+def get_accessible_project(db: Session, current_user: models.User, project_id: int, query=None) -> models.Project:
+    project = (query if query is not None else db.query(models.Project)).filter(models.Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    # Admin can access any project
+    if current_user.role != models.UserRole.Admin:
+        # Non-admin users must be assigned to the project
+        if not memberships.is_member(db, current_user.id, project_id):
+            raise HTTPException(status_code=403, detail="Access forbidden: You are not assigned to this project")
+    return project
+
+
 @router.post("/", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 def create_project(
     project: ProjectCreate, 
     db: Session = Depends(get_db), 
     current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
 ):
-    # Validate client_id exists
-    client = db.query(models.Client).filter(models.Client.id == project.client_id).first()
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found")
+    def write(db: Session) -> models.Project:
+        # Validate client_id exists
+        client = db.query(models.Client).filter(models.Client.id == project.client_id).first()
+        if not client:
+            raise HTTPException(status_code=404, detail="Client not found")
     
-    new_project = models.Project(
-        name=project.name,
-        description=project.description,
-        client_id=project.client_id,
-        status=api_to_db_status(project.status),
-        start_date=project.start_date,
-        end_date=project.end_date
-    )
-    db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
+        new_project = models.Project(
+            name=project.name,
+            description=project.description,
+            client_id=project.client_id,
+            status=api_to_db_status(project.status),
+            start_date=project.start_date,
+            end_date=project.end_date
+        )
+        new_project.id = unused_project_id(db)
+        db.add(new_project)
+        db.flush()
+        history.record_project_status(db, new_project, None, current_user)
+        activity.record(db, current_user, "created", "project", new_project.id, f"Created project {new_project.name}", project_id=new_project.id)
+        return new_project
+
+    new_project = run_write(db, write)
     return ProjectResponse.from_db(new_project)
 
 
 @router.get("/", response_model=list[ProjectResponse])
 def get_projects(
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
     db: Session = Depends(get_db), 
     current_user: models.User = Depends(get_current_user)
 ):
+    selection = PROJECT_FIELDS.parse(fields, include)
+    query = db.query(models.Project)
+    if selection:
+        query = PROJECT_FIELDS.apply(query, selection)
     # Admin sees all projects
     if current_user.role == models.UserRole.Admin:
-        projects = db.query(models.Project).all()
+        projects = query.all()
     else:
         # ProjectManager and TeamMember see only assigned projects
-        projects = (
-            db.query(models.Project)
-            .join(models.ProjectAssignment)
-            .filter(models.ProjectAssignment.user_id == current_user.id)
-            .all()
-        )
+        project_ids = memberships.project_ids(db, current_user.id)
+        projects = query.filter(models.Project.id.in_(project_ids)).all()
+    if selection:
+        return PROJECT_FIELDS.respond(projects, selection)
     return [ProjectResponse.from_db(p) for p in projects]
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
 def get_project(
     project_id: int, 
+    response: Response,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
     db: Session = Depends(get_db), 
     current_user: models.User = Depends(get_current_user)
 ):
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Admin can access any project
-    if current_user.role != models.UserRole.Admin:
-        # Non-admin users must be assigned to the project
-        assignment = db.query(models.ProjectAssignment).filter(
-            models.ProjectAssignment.user_id == current_user.id,
-            models.ProjectAssignment.project_id == project_id
-        ).first()
-        if not assignment:
-            raise HTTPException(status_code=403, detail="Access forbidden: You are not assigned to this project")
-    
+    selection = PROJECT_FIELDS.parse(fields, include)
+    if selection:
+        query = PROJECT_FIELDS.apply(db.query(models.Project), selection, models.Project.version)
+        project = get_accessible_project(db, current_user, project_id, query)
+        sparse = PROJECT_FIELDS.respond(project, selection)
+        set_etag(sparse, project.version)
+        return sparse
+    project = get_accessible_project(db, current_user, project_id)
+    set_etag(response, project.version)
     return ProjectResponse.from_db(project)
 
 
+@router.get("/{project_id}/burndown", response_model=list[BurndownPoint])
+def get_project_burndown(
+    project_id: int,
+    days: int = Query(default=30, ge=1, le=365),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    get_accessible_project(db, current_user, project_id)
+    return history.burndown(db, project_id, days)
+
+
+@router.get("/{project_id}/critical-path", response_model=CriticalPath)
+def get_project_critical_path(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    The chain of blocking tasks behind the project's latest projected finish,
+    plus open tasks whose blockers push them past their own due date.
+    """
+    get_accessible_project(db, current_user, project_id)
+    result = dependency_graphs.critical_path(db, project_id)
+    projected = dict(result["path"] + result["late"])
+    tasks = {
+        task.id: task for task in
+        db.query(models.Task).filter(models.Task.id.in_(list(projected)))
+    } if projected else {}
+
+    def describe(entries):
+        return [
+            CriticalPathTask(**TaskResponse.from_db(tasks[task_id]).model_dump(), projected_finish=finish)
+            for task_id, finish in entries if task_id in tasks
+        ]
+
+    return CriticalPath(
+        project_id=project_id,
+        earliest_finish=result["earliest_finish"],
+        path=describe(result["path"]),
+        late_tasks=describe(result["late"])
+    )
+
+
 @router.put("/{project_id}", response_model=ProjectResponse)
 def update_project(
     project_id: int, 
     project_update: ProjectUpdate, 
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
     db: Session = Depends(get_db), 
     current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
 ):
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    def write(db: Session) -> models.Project:
+        project = db.query(models.Project).filter(models.Project.id == project_id).first()
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        check_version(project.version, if_match, project_update.version)
+        old_status = project.status
     
-    # Validate client_id if being updated
-    if project_update.client_id is not None:
-        client = db.query(models.Client).filter(models.Client.id == project_update.client_id).first()
-        if not client:
-            raise HTTPException(status_code=404, detail="Client not found")
-        project.client_id = project_update.client_id
+        # Validate client_id if being updated
+        if project_update.client_id is not None:
+            client = db.query(models.Client).filter(models.Client.id == project_update.client_id).first()
+            if not client:
+                raise HTTPException(status_code=404, detail="Client not found")
+            if project_update.client_id != project.client_id:
+                revenue.move_project(db, project.id, project.client_id, project_update.client_id)
+            project.client_id = project_update.client_id
     
-    if project_update.name is not None:
-        project.name = project_update.name
-    if project_update.description is not None:
-        project.description = project_update.description
-    if project_update.status is not None:
-        project.status = api_to_db_status(project_update.status)
-    if project_update.start_date is not None:
-        project.start_date = project_update.start_date
-    if project_update.end_date is not None:
-        project.end_date = project_update.end_date
+        if project_update.name is not None and project_update.name != project.name:
+            project.name = project_update.name
+            inbox.rename_project(db, project.id, project.name)
+        if project_update.description is not None:
+            project.description = project_update.description
+        if project_update.status is not None:
+            project.status = api_to_db_status(project_update.status)
+        if project_update.start_date is not None:
+            project.start_date = project_update.start_date
+        if project_update.end_date is not None:
+            project.end_date = project_update.end_date
     
-    db.commit()
-    db.refresh(project)
+        history.record_project_status(db, project, old_status, current_user)
+        activity.record(db, current_user, "updated", "project", project.id, f"Updated project {project.name}", project_id=project.id)
+        return project
+
+    project = run_write(db, write)
+    set_etag(response, project.version)
     return ProjectResponse.from_db(project)
 
 
@@ -189,6 +309,8 @@ def update_project(
 def update_project_status(
     project_id: int,
     status: ProjectStatusEnum,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -197,31 +319,39 @@ def update_project_status(
     - Admin: any project
     - ProjectManager: projects they're assigned to
     - TeamMember: projects they're assigned to (can mark progress)
+    Send If-Match: "<version>" to fail with 412 instead of overwriting a newer change.
     """
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    def write(db: Session) -> models.Project:
+        project = db.query(models.Project).filter(models.Project.id == project_id).first()
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
     
-    # Check permissions based on role
-    if current_user.role == models.UserRole.Admin:
-        # Admin can update any project
-        pass
-    else:
-        # ProjectManager and TeamMember must be assigned to the project
-        assignment = db.query(models.ProjectAssignment).filter(
-            models.ProjectAssignment.user_id == current_user.id,
-            models.ProjectAssignment.project_id == project_id
-        ).first()
-        if not assignment:
-            raise HTTPException(
-                status_code=403,
-                detail="Access forbidden: You are not assigned to this project"
-            )
+        # Check permissions based on role
+        if current_user.role == models.UserRole.Admin:
+            # Admin can update any project
+            pass
+        else:
+            # ProjectManager and TeamMember must be assigned to the project
+            if not memberships.is_member(db, current_user.id, project_id):
+                raise HTTPException(
+                    status_code=403,
+                    detail="Access forbidden: You are not assigned to this project"
+                )
     
-    # Update status
-    project.status = api_to_db_status(status)
-    db.commit()
-    db.refresh(project)
+        check_version(project.version, if_match)
+
+        # Update status
+        old_status = project.status
+        project.status = api_to_db_status(status)
+        history.record_project_status(db, project, old_status, current_user)
+        activity.record(
+            db, current_user, "status_changed", "project", project.id,
+            f"Moved project {project.name} to {project.status.value}", project_id=project.id
+        )
+        return project
+
+    project = run_write(db, write)
+    set_etag(response, project.version)
     return ProjectResponse.from_db(project)
 
 
@@ -231,10 +361,16 @@ def delete_project(
     db: Session = Depends(get_db), 
     current_user: models.User = Depends(require_role("Admin"))
 ):
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    def write(db: Session) -> models.Project:
+        project = db.query(models.Project).filter(models.Project.id == project_id).first()
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
     
-    db.delete(project)
-    db.commit()
+        inbox.remove_project(db, project.id)
+        db.delete(project)
+        activity.record(db, current_user, "deleted", "project", project_id, f"Deleted project {project.name}", project_id=project_id)
+        return project
+
+    project = run_write(db, write)
+    dependency_graphs.invalidate(project_id)
     return {"msg": "Project deleted successfully"}
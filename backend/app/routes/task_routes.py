@@ -5,15 +5,29 @@
 # - Get all tasks (Authenticated users)
 # - Get tasks by project_id
 # - Get tasks by assigned user
+# - Query tasks with filters, sorting and grouped counts (kanban / "my week")
+# - Overdue and due-soon tasks from the in-memory due-date tracker
+# - Blocks / blocked-by dependencies between tasks of the same project (no cycles)
+# - Read endpoints accept fields= (sparse columns) and include=assignee,project
+# - Writes run as closures on the single-writer queue (app/write_queue.py)
+# - Updates are version-checked: If-Match (412) or a body version (409), see app/preconditions.py
 # Validate project exists, assigned user exists, and user is assigned to project.
 from datetime import datetime
 from enum import Enum
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, aliased
-from app import models
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import Session
+from app import activity, history, inbox, models
 from app.database import get_db
+from app.fieldsets import FieldSet, Relation
 from app.auth import require_role, get_current_user
+from app.critical_path import dependency_graphs, would_cycle
+from app.due_dates import DUE_SOON, DUE_SOON_DAYS, OVERDUE, due_tracker
+from app.membership import memberships
+from app.preconditions import check_version, set_etag
+from app.workload import workload_cache
+from app.write_queue import run_write
 from pydantic import BaseModel, ConfigDict
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
@@ -42,6 +56,23 @@ def db_to_api_task_status(db_status: models.TaskStatus) -> TaskStatusEnum:
     return mapping[db_status]
 
 
+class TaskSortField(str, Enum):
+    due_date = "due_date"
+    created_at = "created_at"
+    status = "status"
+
+
+class SortOrder(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+
+class TaskGroupBy(str, Enum):
+    status = "status"
+    assignee = "assignee"
+    project = "project"
+
+
 class TaskCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -58,6 +89,8 @@ class TaskUpdate(BaseModel):
     assigned_to: Optional[int] = None
     status: Optional[TaskStatusEnum] = None
     due_date: Optional[datetime] = None
+    # The version the client last read; a stale one gets 409 (If-Match gets 412)
+    version: Optional[int] = None
 
 
 class TaskResponse(BaseModel):
@@ -71,6 +104,7 @@ class TaskResponse(BaseModel):
     status: TaskStatusEnum
     due_date: Optional[datetime] = None
     created_at: datetime
+    version: int
     
     @staticmethod
     def from_db(db_task: models.Task) -> "TaskResponse":
@@ -82,80 +116,316 @@ class TaskResponse(BaseModel):
             assigned_to=db_task.assigned_to,
             status=db_to_api_task_status(db_task.status),
             due_date=db_task.due_date,
-            created_at=db_task.created_at
+            created_at=db_task.created_at,
+            version=db_task.version
         )
 
 
+TASK_FIELDS = FieldSet(
+    models.Task,
+    tuple(TaskResponse.model_fields),
+    serializers={"status": lambda value: db_to_api_task_status(value).value},
+    relations={
+        "assignee": Relation(models.Task.assigned_user, (models.User.id, models.User.full_name, models.User.email)),
+        "project": Relation(models.Task.project, (models.Project.id, models.Project.name)),
+    },
+)
+
+
+class DependencyCreate(BaseModel):
+    blocked_by: int
+
+
+class TaskDependencies(BaseModel):
+    blocked_by: list[TaskResponse]
+    blocks: list[TaskResponse]
+
+
+def check_task_access(db: Session, current_user: models.User, task: models.Task):
+    """Admins see every task, ProjectManagers tasks of their projects, TeamMembers their own tasks."""
+    if current_user.role == models.UserRole.Admin:
+        return
+
+    if current_user.role == models.UserRole.ProjectManager:
+        if not memberships.is_member(db, current_user.id, task.project_id):
+            raise HTTPException(
+                status_code=403,
+                detail="Access forbidden: You are not assigned to this project"
+            )
+    elif current_user.role == models.UserRole.TeamMember:
+        if task.assigned_to != current_user.id:
+            raise HTTPException(
+                status_code=403,
+                detail="Access forbidden: You are not assigned to this task"
+            )
+    else:
+        raise HTTPException(status_code=403, detail="Access forbidden")
+
+
+def _delete_dependencies(db: Session, task_id: int):
+    db.query(models.TaskDependency).filter(
+        or_(models.TaskDependency.blocker_id == task_id, models.TaskDependency.blocked_id == task_id)
+    ).delete(synchronize_session=False)
+
+
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 def create_task(
     task: TaskCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
 ):
-    # Validate project exists
-    project = db.query(models.Project).filter(models.Project.id == task.project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    def write(db: Session) -> models.Task:
+        # Validate project exists
+        project = db.query(models.Project).filter(models.Project.id == task.project_id).first()
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
     
-    # If assigned_to is provided, validate user exists and is assigned to project
-    if task.assigned_to is not None:
-        user = db.query(models.User).filter(models.User.id == task.assigned_to).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="Assigned user not found")
+        # If assigned_to is provided, validate user exists and is assigned to project
+        if task.assigned_to is not None:
+            user = db.query(models.User).filter(models.User.id == task.assigned_to).first()
+            if not user:
+                raise HTTPException(status_code=404, detail="Assigned user not found")
         
-        # Check if user is assigned to the project
-        assignment = db.query(models.ProjectAssignment).filter(
-            models.ProjectAssignment.user_id == task.assigned_to,
-            models.ProjectAssignment.project_id == task.project_id
-        ).first()
-        if not assignment:
-            raise HTTPException(
-                status_code=400, 
-                detail="User must be assigned to the project before being assigned tasks"
-            )
+            # Check if user is assigned to the project
+            if not memberships.is_member(db, task.assigned_to, task.project_id):
+                raise HTTPException(
+                    status_code=400, 
+                    detail="User must be assigned to the project before being assigned tasks"
+                )
     
-    # Create task
-    new_task = models.Task(
-        title=task.title,
-        description=task.description,
-        project_id=task.project_id,
-        assigned_to=task.assigned_to,
-        status=api_to_db_task_status(task.status),
-        due_date=task.due_date
-    )
-    db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
+        # Create task
+        new_task = models.Task(
+            title=task.title,
+            description=task.description,
+            project_id=task.project_id,
+            assigned_to=task.assigned_to,
+            status=api_to_db_task_status(task.status),
+            due_date=task.due_date
+        )
+        db.add(new_task)
+        db.flush()
+        history.record_task_change(db, new_task, None, None, current_user)
+        inbox.add_task(db, new_task)
+        activity.record(db, current_user, "created", "task", new_task.id, f"Created task {new_task.title}", project_id=new_task.project_id)
+        return new_task
+
+    new_task = run_write(db, write)
+    due_tracker.track(new_task)
+    dependency_graphs.track(new_task)
+    workload_cache.invalidate()
     return TaskResponse.from_db(new_task)
 
 
+class TaskGroup(BaseModel):
+    key: Optional[str] = None
+    count: int
+    tasks: list[TaskResponse] = []
+
+
+# Workflow order for sorting by status (the DB stores enum names, which sort alphabetically)
+STATUS_SORT_ORDER = case(
+    {
+        models.TaskStatus.ToDo.name: 0,
+        models.TaskStatus.InProgress.name: 1,
+        models.TaskStatus.Done.name: 2,
+    },
+    value=models.Task.status,
+)
+
+GROUP_COLUMNS = {
+    TaskGroupBy.status: models.Task.status,
+    TaskGroupBy.assignee: models.Task.assigned_to,
+    TaskGroupBy.project: models.Task.project_id,
+}
+
+
+def scoped_tasks_query(db: Session, current_user: models.User):
+    """Tasks visible to current_user: all for Admin, assigned projects for PMs, own tasks otherwise."""
+    query = db.query(models.Task)
+    if current_user.role == models.UserRole.Admin:
+        return query
+    if current_user.role == models.UserRole.ProjectManager:
+        project_ids = memberships.project_ids(db, current_user.id)
+        return query.filter(models.Task.project_id.in_(project_ids))
+    return query.filter(models.Task.assigned_to == current_user.id)
+
+
+def apply_task_filters(
+    query,
+    status: Optional[TaskStatusEnum] = None,
+    project_id: Optional[int] = None,
+    assigned_to: Optional[int] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+):
+    if status is not None:
+        query = query.filter(models.Task.status == api_to_db_task_status(status))
+    if project_id is not None:
+        query = query.filter(models.Task.project_id == project_id)
+    if assigned_to is not None:
+        query = query.filter(models.Task.assigned_to == assigned_to)
+    if due_from is not None:
+        query = query.filter(models.Task.due_date >= due_from)
+    if due_to is not None:
+        query = query.filter(models.Task.due_date < due_to)
+    return query
+
+
+def task_sort_columns(sort: Optional[TaskSortField], order: SortOrder):
+    if sort is None:
+        return []
+    if sort == TaskSortField.status:
+        column = STATUS_SORT_ORDER
+    else:
+        column = getattr(models.Task, sort.value)
+    column = column.desc() if order == SortOrder.desc else column.asc()
+    # Tasks without a due date go last either way; id keeps the order stable
+    return [column.nulls_last(), models.Task.id]
+
+
 @router.get("/", response_model=list[TaskResponse])
 def get_all_tasks(
+    status: Optional[TaskStatusEnum] = None,
+    project_id: Optional[int] = None,
+    assigned_to: Optional[int] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    sort: Optional[TaskSortField] = None,
+    order: SortOrder = SortOrder.asc,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    # Admin sees all tasks
-    if current_user.role == models.UserRole.Admin:
-        tasks = db.query(models.Task).all()
-    # ProjectManager sees tasks from projects they're assigned to
-    elif current_user.role == models.UserRole.ProjectManager:
-        tasks = (
-            db.query(models.Task)
-            .join(models.Project)
-            .join(models.ProjectAssignment)
-            .filter(models.ProjectAssignment.user_id == current_user.id)
+    """
+    List tasks visible to the caller:
+    - Admin: all tasks
+    - ProjectManager: tasks in projects they're assigned to
+    - TeamMember: tasks assigned to them
+    Optional filters narrow by status, project, assignee and a due-date window
+    [due_from, due_to); sort orders by due_date, created_at or status.
+    fields= and include= (assignee, project) shape each item.
+    """
+    selection = TASK_FIELDS.parse(fields, include)
+    query = scoped_tasks_query(db, current_user)
+    query = apply_task_filters(query, status, project_id, assigned_to, due_from, due_to)
+    if selection:
+        query = TASK_FIELDS.apply(query, selection)
+    tasks = query.order_by(*task_sort_columns(sort, order)).all()
+    if selection:
+        return TASK_FIELDS.respond(tasks, selection)
+    return [TaskResponse.from_db(t) for t in tasks]
+
+
+@router.get("/groups", response_model=list[TaskGroup])
+def get_task_groups(
+    group_by: TaskGroupBy,
+    include_tasks: bool = True,
+    status: Optional[TaskStatusEnum] = None,
+    project_id: Optional[int] = None,
+    assigned_to: Optional[int] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    sort: Optional[TaskSortField] = None,
+    order: SortOrder = SortOrder.asc,
+    limit_per_group: int = Query(default=200, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Tasks grouped by status, assignee or project, with per-group counts.
+    With include_tasks, one query caps each group at limit_per_group with a
+    window function and carries the group's full count alongside, so groups,
+    counts and tasks come from the same statement; without, counts come from a
+    single GROUP BY.
+    """
+    group_column = GROUP_COLUMNS[group_by]
+    query = scoped_tasks_query(db, current_user)
+    query = apply_task_filters(query, status, project_id, assigned_to, due_from, due_to)
+
+    def group_key(value):
+        if value is None:
+            return None
+        if group_by == TaskGroupBy.status:
+            return db_to_api_task_status(value).value
+        return str(value)
+
+    def group_order(value):
+        if group_by == TaskGroupBy.status:
+            return (False, list(models.TaskStatus).index(value))
+        return (value is None, value or 0)
+
+    if not include_tasks:
+        counts = (
+            query.with_entities(group_column, func.count(models.Task.id))
+            .group_by(group_column)
             .all()
         )
-    # TeamMember sees only tasks assigned to them
+        return [
+            TaskGroup(key=group_key(value), count=count)
+            for value, count in sorted(counts, key=lambda row: group_order(row[0]))
+        ]
+
+    # Number each group's tasks in the requested order, keep the first limit_per_group
+    ranked = query.with_entities(
+        models.Task.id,
+        func.row_number().over(
+            partition_by=group_column,
+            order_by=task_sort_columns(sort, order) or models.Task.id,
+        ).label("rn"),
+        func.count().over(partition_by=group_column).label("group_count"),
+    ).subquery()
+    rows = (
+        db.query(models.Task, ranked.c.group_count)
+        .join(ranked, ranked.c.id == models.Task.id)
+        .filter(ranked.c.rn <= limit_per_group)
+        .order_by(ranked.c.rn)
+    )
+    groups = {}
+    for task, count in rows:
+        value = getattr(task, group_column.key)
+        if value not in groups:
+            groups[value] = TaskGroup(key=group_key(value), count=count)
+        groups[value].tasks.append(TaskResponse.from_db(task))
+    return [groups[value] for value in sorted(groups, key=group_order)]
+
+
+def _due_tasks(kind: str, days: Optional[int], db: Session, current_user: models.User):
+    due_tracker.ensure_fresh(db)
+    if current_user.role == models.UserRole.Admin:
+        tasks = due_tracker.for_organization(kind, current_user.organization_id, days)
+    elif current_user.role == models.UserRole.ProjectManager:
+        project_ids = memberships.project_ids(db, current_user.id)
+        tasks = due_tracker.for_projects(kind, project_ids, days)
     else:
-        tasks = db.query(models.Task).filter(models.Task.assigned_to == current_user.id).all()
-    
+        tasks = due_tracker.for_user(kind, current_user.id, days)
     return [TaskResponse.from_db(t) for t in tasks]
 
 
+@router.get("/overdue", response_model=list[TaskResponse])
+def get_overdue_tasks(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Open tasks past their due date, within the caller's scope, earliest first."""
+    return _due_tasks(OVERDUE, None, db, current_user)
+
+
+@router.get("/due-soon", response_model=list[TaskResponse])
+def get_due_soon_tasks(
+    days: int = Query(default=DUE_SOON_DAYS, ge=1, le=DUE_SOON_DAYS),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Open tasks due within the next `days` days (at most DUE_SOON_DAYS), earliest first."""
+    return _due_tasks(DUE_SOON, days, db, current_user)
+
+
 @router.get("/project/{project_id}", response_model=list[TaskResponse])
 def get_tasks_by_project(
     project_id: int,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -166,23 +436,25 @@ def get_tasks_by_project(
 
     # Enforce role-based access
     if current_user.role != models.UserRole.Admin:
-        assignment = db.query(models.ProjectAssignment).filter(
-            models.ProjectAssignment.user_id == current_user.id,
-            models.ProjectAssignment.project_id == project_id
-        ).first()
-        if not assignment:
+        if not memberships.is_member(db, current_user.id, project_id):
             raise HTTPException(
                 status_code=403,
                 detail="Access forbidden: You are not assigned to this project"
             )
 
-    tasks = db.query(models.Task).filter(models.Task.project_id == project_id).all()
+    selection = TASK_FIELDS.parse(fields, include)
+    query = db.query(models.Task).filter(models.Task.project_id == project_id)
+    if selection:
+        return TASK_FIELDS.respond(TASK_FIELDS.apply(query, selection).all(), selection)
+    tasks = query.all()
     return [TaskResponse.from_db(t) for t in tasks]
 
 
 @router.get("/user/{user_id}", response_model=list[TaskResponse])
 def get_tasks_by_user(
     user_id: int,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -198,28 +470,72 @@ def get_tasks_by_user(
         if current_user.id != user_id:
             raise HTTPException(status_code=403, detail="Access forbidden")
     elif current_user.role == models.UserRole.ProjectManager:
-        pm_assignment = aliased(models.ProjectAssignment)
-        user_assignment = aliased(models.ProjectAssignment)
-        shared_assignment = (
-            db.query(pm_assignment)
-            .join(user_assignment, pm_assignment.project_id == user_assignment.project_id)
-            .filter(
-                pm_assignment.user_id == current_user.id,
-                user_assignment.user_id == user_id
-            )
-            .first()
-        )
-        if not shared_assignment:
+        shares_project = memberships.project_ids(db, current_user.id) & memberships.project_ids(db, user_id)
+        if not shares_project:
             raise HTTPException(status_code=403, detail="Access forbidden")
     else:
         raise HTTPException(status_code=403, detail="Access forbidden")
 
-    tasks = db.query(models.Task).filter(models.Task.assigned_to == user_id).all()
+    selection = TASK_FIELDS.parse(fields, include)
+    query = db.query(models.Task).filter(models.Task.assigned_to == user_id)
+    if selection:
+        return TASK_FIELDS.respond(TASK_FIELDS.apply(query, selection).all(), selection)
+    tasks = query.all()
     return [TaskResponse.from_db(t) for t in tasks]
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(
+    task_id: int,
+    response: Response,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    selection = TASK_FIELDS.parse(fields, include)
+    query = db.query(models.Task)
+    if selection:
+        # The access check needs project_id and assigned_to whatever was requested, the ETag the version
+        query = TASK_FIELDS.apply(
+            query, selection, models.Task.project_id, models.Task.assigned_to, models.Task.version
+        )
+    task = query.filter(models.Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    check_task_access(db, current_user, task)
+    if selection:
+        sparse = TASK_FIELDS.respond(task, selection)
+        set_etag(sparse, task.version)
+        return sparse
+    set_etag(response, task.version)
+    return TaskResponse.from_db(task)
+
+
+def _task_dependencies(db: Session, task: models.Task) -> TaskDependencies:
+    blocked_by = (
+        db.query(models.Task)
+        .join(models.TaskDependency, models.TaskDependency.blocker_id == models.Task.id)
+        .filter(models.TaskDependency.blocked_id == task.id)
+        .order_by(models.Task.id)
+        .all()
+    )
+    blocks = (
+        db.query(models.Task)
+        .join(models.TaskDependency, models.TaskDependency.blocked_id == models.Task.id)
+        .filter(models.TaskDependency.blocker_id == task.id)
+        .order_by(models.Task.id)
+        .all()
+    )
+    return TaskDependencies(
+        blocked_by=[TaskResponse.from_db(t) for t in blocked_by],
+        blocks=[TaskResponse.from_db(t) for t in blocks]
+    )
+
+
+@router.get("/{task_id}/dependencies", response_model=TaskDependencies)
+def get_task_dependencies(
     task_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
@@ -228,79 +544,146 @@ def get_task(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    # Enforce role-based access
-    if current_user.role == models.UserRole.Admin:
-        return TaskResponse.from_db(task)
+    check_task_access(db, current_user, task)
+    return _task_dependencies(db, task)
 
-    if current_user.role == models.UserRole.ProjectManager:
-        assignment = db.query(models.ProjectAssignment).filter(
-            models.ProjectAssignment.user_id == current_user.id,
-            models.ProjectAssignment.project_id == task.project_id
+
+@router.post("/{task_id}/dependencies", response_model=TaskDependencies, status_code=status.HTTP_201_CREATED)
+def add_task_dependency(
+    task_id: int,
+    dependency: DependencyCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
+):
+    """Mark task_id as blocked by another task of the same project. Rejects self-links and cycles."""
+    def write(db: Session):
+        task = db.query(models.Task).filter(models.Task.id == task_id).first()
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        check_task_access(db, current_user, task)
+        if dependency.blocked_by == task.id:
+            raise HTTPException(status_code=400, detail="A task cannot block itself")
+
+        blocker = db.query(models.Task).filter(models.Task.id == dependency.blocked_by).first()
+        if not blocker:
+            raise HTTPException(status_code=404, detail="Blocking task not found")
+        if blocker.project_id != task.project_id:
+            raise HTTPException(status_code=400, detail="Dependencies must be between tasks of the same project")
+
+        existing = db.query(models.TaskDependency).filter(
+            models.TaskDependency.blocker_id == blocker.id,
+            models.TaskDependency.blocked_id == task.id
         ).first()
-        if not assignment:
-            raise HTTPException(
-                status_code=403,
-                detail="Access forbidden: You are not assigned to this project"
-            )
-    elif current_user.role == models.UserRole.TeamMember:
-        if task.assigned_to != current_user.id:
-            raise HTTPException(
-                status_code=403,
-                detail="Access forbidden: You are not assigned to this task"
-            )
-    else:
-        raise HTTPException(status_code=403, detail="Access forbidden")
+        if existing:
+            raise HTTPException(status_code=400, detail="Dependency already exists")
+        if db.get_bind().dialect.name != "sqlite":
+            # Serialize edge writes per project; SQLite's single writer already does
+            db.query(models.Project.id).filter(models.Project.id == task.project_id).with_for_update().first()
+        if would_cycle(db, task.project_id, blocker.id, task.id):
+            raise HTTPException(status_code=400, detail="Dependency would create a cycle")
+
+        db.add(models.TaskDependency(project_id=task.project_id, blocker_id=blocker.id, blocked_id=task.id))
+        activity.record(
+            db, current_user, "dependency_added", "task", task.id,
+            f"Task {task.title} is now blocked by {blocker.title}", project_id=task.project_id
+        )
+        return task, blocker
 
-    return TaskResponse.from_db(task)
+    task, blocker = run_write(db, write)
+    dependency_graphs.add_edge(task.project_id, blocker.id, task.id)
+    return _task_dependencies(db, task)
+
+
+@router.delete("/{task_id}/dependencies/{blocker_id}")
+def remove_task_dependency(
+    task_id: int,
+    blocker_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
+):
+    def write(db: Session) -> models.Task:
+        task = db.query(models.Task).filter(models.Task.id == task_id).first()
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        check_task_access(db, current_user, task)
+
+        deleted = db.query(models.TaskDependency).filter(
+            models.TaskDependency.blocker_id == blocker_id,
+            models.TaskDependency.blocked_id == task_id
+        ).delete(synchronize_session=False)
+        if not deleted:
+            raise HTTPException(status_code=404, detail="Dependency not found")
+        activity.record(
+            db, current_user, "dependency_removed", "task", task.id,
+            f"Task {task.title} is no longer blocked by task {blocker_id}", project_id=task.project_id
+        )
+        return task
+
+    task = run_write(db, write)
+    dependency_graphs.remove_edge(task.project_id, blocker_id, task_id)
+    return {"msg": "Dependency removed successfully"}
 
 
 @router.put("/{task_id}", response_model=TaskResponse)
 def update_task(
     task_id: int,
     task_update: TaskUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
 ):
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    def write(db: Session):
+        task = db.query(models.Task).filter(models.Task.id == task_id).first()
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        check_version(task.version, if_match, task_update.version)
+        old_status, old_project_id = task.status, task.project_id
     
-    # Validate project_id if being updated
-    if task_update.project_id is not None:
-        project = db.query(models.Project).filter(models.Project.id == task_update.project_id).first()
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        task.project_id = task_update.project_id
+        # Validate project_id if being updated
+        if task_update.project_id is not None:
+            project = db.query(models.Project).filter(models.Project.id == task_update.project_id).first()
+            if not project:
+                raise HTTPException(status_code=404, detail="Project not found")
+            if task_update.project_id != task.project_id:
+                # Dependencies never cross projects
+                _delete_dependencies(db, task.id)
+            task.project_id = task_update.project_id
     
-    # Validate assigned_to if being updated
-    if task_update.assigned_to is not None:
-        user = db.query(models.User).filter(models.User.id == task_update.assigned_to).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="Assigned user not found")
+        # Validate assigned_to if being updated
+        if task_update.assigned_to is not None:
+            user = db.query(models.User).filter(models.User.id == task_update.assigned_to).first()
+            if not user:
+                raise HTTPException(status_code=404, detail="Assigned user not found")
         
-        # Check if user is assigned to the project
-        assignment = db.query(models.ProjectAssignment).filter(
-            models.ProjectAssignment.user_id == task_update.assigned_to,
-            models.ProjectAssignment.project_id == task.project_id
-        ).first()
-        if not assignment:
-            raise HTTPException(
-                status_code=400,
-                detail="User must be assigned to the project before being assigned tasks"
-            )
-        task.assigned_to = task_update.assigned_to
+            # Check if user is assigned to the project
+            if not memberships.is_member(db, task_update.assigned_to, task.project_id):
+                raise HTTPException(
+                    status_code=400,
+                    detail="User must be assigned to the project before being assigned tasks"
+                )
+            task.assigned_to = task_update.assigned_to
     
-    if task_update.title is not None:
-        task.title = task_update.title
-    if task_update.description is not None:
-        task.description = task_update.description
-    if task_update.status is not None:
-        task.status = api_to_db_task_status(task_update.status)
-    if task_update.due_date is not None:
-        task.due_date = task_update.due_date
+        if task_update.title is not None:
+            task.title = task_update.title
+        if task_update.description is not None:
+            task.description = task_update.description
+        if task_update.status is not None:
+            task.status = api_to_db_task_status(task_update.status)
+        if task_update.due_date is not None:
+            task.due_date = task_update.due_date
     
-    db.commit()
-    db.refresh(task)
+        db.flush()
+        history.record_task_change(db, task, old_status, old_project_id, current_user)
+        inbox.sync_task(db, task)
+        activity.record(db, current_user, "updated", "task", task.id, f"Updated task {task.title}", project_id=task.project_id)
+        return task, old_project_id
+
+    task, old_project_id = run_write(db, write)
+    set_etag(response, task.version)
+    due_tracker.track(task)
+    dependency_graphs.track(task, old_project_id)
+    workload_cache.invalidate()
     return TaskResponse.from_db(task)
 
 
@@ -308,6 +691,8 @@ def update_task(
 def update_task_status(
     task_id: int,
     status: TaskStatusEnum,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -316,40 +701,53 @@ def update_task_status(
     - Admin: any task
     - ProjectManager: tasks in their assigned projects
     - TeamMember: tasks assigned to them
+    Send If-Match: "<version>" to fail with 412 instead of overwriting a newer change.
     """
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    def write(db: Session) -> models.Task:
+        task = db.query(models.Task).filter(models.Task.id == task_id).first()
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
     
-    # Check permissions based on role
-    if current_user.role == models.UserRole.Admin:
-        # Admin can update any task
-        pass
-    elif current_user.role == models.UserRole.ProjectManager:
-        # ProjectManager can update tasks in their projects
-        assignment = db.query(models.ProjectAssignment).filter(
-            models.ProjectAssignment.user_id == current_user.id,
-            models.ProjectAssignment.project_id == task.project_id
-        ).first()
-        if not assignment:
-            raise HTTPException(
-                status_code=403,
-                detail="Access forbidden: You are not assigned to this project"
-            )
-    elif current_user.role == models.UserRole.TeamMember:
-        # TeamMember can only update their assigned tasks
-        if task.assigned_to != current_user.id:
-            raise HTTPException(
-                status_code=403,
-                detail="Access forbidden: You can only update tasks assigned to you"
-            )
-    else:
-        raise HTTPException(status_code=403, detail="Access forbidden")
+        # Check permissions based on role
+        if current_user.role == models.UserRole.Admin:
+            # Admin can update any task
+            pass
+        elif current_user.role == models.UserRole.ProjectManager:
+            # ProjectManager can update tasks in their projects
+            if not memberships.is_member(db, current_user.id, task.project_id):
+                raise HTTPException(
+                    status_code=403,
+                    detail="Access forbidden: You are not assigned to this project"
+                )
+        elif current_user.role == models.UserRole.TeamMember:
+            # TeamMember can only update their assigned tasks
+            if task.assigned_to != current_user.id:
+                raise HTTPException(
+                    status_code=403,
+                    detail="Access forbidden: You can only update tasks assigned to you"
+                )
+        else:
+            raise HTTPException(status_code=403, detail="Access forbidden")
     
-    # Update status
-    task.status = api_to_db_task_status(status)
-    db.commit()
-    db.refresh(task)
+        check_version(task.version, if_match)
+
+        # Update status
+        old_status = task.status
+        task.status = api_to_db_task_status(status)
+        db.flush()
+        history.record_task_change(db, task, old_status, task.project_id, current_user)
+        inbox.change_status(db, task, old_status)
+        activity.record(
+            db, current_user, "status_changed", "task", task.id,
+            f"Moved task {task.title} to {task.status.value}", project_id=task.project_id
+        )
+        return task
+
+    task = run_write(db, write)
+    set_etag(response, task.version)
+    due_tracker.track(task)
+    dependency_graphs.track(task)
+    workload_cache.invalidate()
     return TaskResponse.from_db(task)
 
 
@@ -359,10 +757,21 @@ def delete_task(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_role("Admin"))
 ):
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    db.delete(task)
-    db.commit()
+    def write(db: Session) -> models.Task:
+        task = db.query(models.Task).filter(models.Task.id == task_id).first()
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+
+        _delete_dependencies(db, task.id)
+        inbox.remove_task(db, task.id)
+        db.delete(task)
+        db.flush()
+        history.record_task_deleted(db, task.project_id, task.status)
+        activity.record(db, current_user, "deleted", "task", task_id, f"Deleted task {task.title}", project_id=task.project_id)
+        return task
+
+    task = run_write(db, write)
+    due_tracker.untrack(task_id)
+    dependency_graphs.untrack(task_id, task.project_id)
+    workload_cache.invalidate()
     return {"msg": "Task deleted successfully"}
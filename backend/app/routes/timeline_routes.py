@@ -0,0 +1,101 @@
+# Create Timeline routes:
+# - Get projects and tasks overlapping a date window (Authenticated users)
+# Projects overlap when their span intersects [from, to); tasks when their due date falls in it.
+# Scoped like the project and task lists. Use bucket to page through time one
+# day/week/month at a time: the response carries the next and previous window starts.
+# from/to take a date or a datetime; a date-only 'to' includes that whole day.
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from typing import Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app import models
+from app.auth import get_current_user
+from app.database import get_db
+from app.membership import memberships
+from app.routes.project_routes import ProjectResponse
+from app.routes.task_routes import TaskResponse, scoped_tasks_query
+from app.timeline import overlapping_projects
+
+router = APIRouter(prefix="/timeline", tags=["timeline"])
+
+MAX_WINDOW_DAYS = 3 * 366
+
+
+class TimeBucket(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+
+class TimelineResponse(BaseModel):
+    start: datetime
+    end: datetime
+    next_start: datetime
+    previous_start: datetime
+    projects: list[ProjectResponse]
+    tasks: list[TaskResponse]
+
+
+def _shift(moment: datetime, bucket: TimeBucket, steps: int) -> datetime:
+    if bucket == TimeBucket.day:
+        return moment + timedelta(days=steps)
+    if bucket == TimeBucket.week:
+        return moment + timedelta(weeks=steps)
+    month_index = moment.year * 12 + moment.month - 1 + steps
+    return moment.replace(year=month_index // 12, month=month_index % 12 + 1, day=1)
+
+
+@router.get("", response_model=TimelineResponse)
+def get_timeline(
+    start: Union[datetime, date] = Query(alias="from"),
+    end: Optional[Union[datetime, date]] = Query(default=None, alias="to"),
+    bucket: Optional[TimeBucket] = None,
+    project_id: Optional[int] = None,
+    include_tasks: bool = True,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if not isinstance(start, datetime):
+        start = datetime.combine(start, time.min)
+    if end is not None and not isinstance(end, datetime):
+        end = datetime.combine(end + timedelta(days=1), time.min)
+    if bucket == TimeBucket.month:
+        start = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if end is None:
+        if bucket is None:
+            raise HTTPException(status_code=400, detail="Provide 'to' or a bucket")
+        end = _shift(start, bucket, 1)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    if end - start > timedelta(days=MAX_WINDOW_DAYS):
+        raise HTTPException(status_code=400, detail=f"Window is limited to {MAX_WINDOW_DAYS} days")
+
+    project_query = db.query(models.Project)
+    if current_user.role != models.UserRole.Admin:
+        assigned = memberships.project_ids(db, current_user.id)
+        project_query = project_query.filter(models.Project.id.in_(assigned))
+    if project_id is not None:
+        project_query = project_query.filter(models.Project.id == project_id)
+    projects = overlapping_projects(project_query, db, start, end).order_by(models.Project.start_date, models.Project.id).all()
+
+    tasks = []
+    if include_tasks:
+        task_query = scoped_tasks_query(db, current_user).filter(
+            models.Task.due_date >= start,
+            models.Task.due_date < end
+        )
+        if project_id is not None:
+            task_query = task_query.filter(models.Task.project_id == project_id)
+        tasks = task_query.order_by(models.Task.due_date, models.Task.id).all()
+
+    window = end - start
+    return TimelineResponse(
+        start=start,
+        end=end,
+        next_start=_shift(start, bucket, 1) if bucket else end,
+        previous_start=_shift(start, bucket, -1) if bucket else start - window,
+        projects=[ProjectResponse.from_db(p) for p in projects],
+        tasks=[TaskResponse.from_db(t) for t in tasks],
+    )
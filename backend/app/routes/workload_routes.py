@@ -0,0 +1,90 @@
+# Create Workload routes:
+# - Per-user open task counts by status, overdue and due within a week
+#   (Admin: everyone, ProjectManager: members of their projects, TeamMember: themselves)
+# - Suggest an assignee for a project: its members ranked by current load
+# Counts come from one grouped query across all projects, cached in app/workload.py.
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app import models
+from app.auth import get_current_user, require_role
+from app.database import get_db
+from app.membership import memberships
+from app.workload import Load, workload_cache
+
+router = APIRouter(prefix="/workload", tags=["workload"])
+
+
+class UserWorkload(BaseModel):
+    user_id: int
+    full_name: Optional[str] = None
+    email: str
+    role: str
+    todo: int
+    in_progress: int
+    open: int
+    overdue: int
+    due_this_week: int
+
+    @staticmethod
+    def from_load(user: models.User, load: Load) -> "UserWorkload":
+        return UserWorkload(
+            user_id=user.id,
+            full_name=user.full_name,
+            email=user.email,
+            role=user.role.value,
+            todo=load.todo,
+            in_progress=load.in_progress,
+            open=load.open,
+            overdue=load.overdue,
+            due_this_week=load.due_this_week
+        )
+
+
+def _project_members(db: Session, project_id: int):
+    member_ids = memberships.user_ids(db, project_id)
+    return db.query(models.User).filter(models.User.id.in_(member_ids)).all()
+
+
+@router.get("/", response_model=list[UserWorkload])
+def get_workload(
+    project_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Workload of every user in the caller's scope, optionally narrowed to one project's members."""
+    query = db.query(models.User)
+    if current_user.role == models.UserRole.TeamMember:
+        query = query.filter(models.User.id == current_user.id)
+    elif current_user.role != models.UserRole.Admin:
+        member_ids = set()
+        for my_project_id in memberships.project_ids(db, current_user.id):
+            member_ids |= memberships.user_ids(db, my_project_id)
+        query = query.filter(models.User.id.in_(member_ids))
+    if project_id is not None:
+        query = query.filter(models.User.id.in_(memberships.user_ids(db, project_id)))
+
+    loads = workload_cache.get(db)
+    return [UserWorkload.from_load(user, loads.get(user.id, Load())) for user in query.order_by(models.User.id)]
+
+
+@router.get("/suggest-assignee", response_model=list[UserWorkload])
+def suggest_assignee(
+    project_id: int,
+    limit: int = Query(default=5, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_role("Admin", "ProjectManager"))
+):
+    """Members of the project, least loaded first (open, then overdue, then due-this-week tasks)."""
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    members = _project_members(db, project_id)
+    if current_user.role != models.UserRole.Admin and current_user.id not in {m.id for m in members}:
+        raise HTTPException(status_code=403, detail="Access forbidden: You are not assigned to this project")
+
+    loads = workload_cache.get(db)
+    ranked = sorted(members, key=lambda user: (loads.get(user.id, Load()).rank(), user.id))
+    return [UserWorkload.from_load(user, loads.get(user.id, Load())) for user in ranked[:limit]]
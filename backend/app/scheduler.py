@@ -0,0 +1,61 @@
+# Periodic background jobs.
+# - Jobs register with an interval and run on a single daemon thread
+# - Started/stopped from the app's startup/shutdown hooks
+# - Disable with SCHEDULER_ENABLED=false (e.g. in all but one worker)
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+
+
+@dataclass
+class Job:
+    name: str
+    interval_seconds: float
+    func: Callable[[], None]
+    next_run: float = 0.0
+
+
+class Scheduler:
+    def __init__(self):
+        self._jobs: list[Job] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name: str, interval_seconds: float, func: Callable[[], None]):
+        self._jobs.append(Job(name, interval_seconds, func, time.monotonic() + interval_seconds))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for job in self._jobs:
+                if job.next_run <= now:
+                    try:
+                        job.func()
+                    except Exception:
+                        logger.exception("Scheduled job %s failed", job.name)
+                    job.next_run = time.monotonic() + job.interval_seconds
+            next_run = min((job.next_run for job in self._jobs), default=now + 1)
+            self._stop.wait(max(0.1, next_run - time.monotonic()))
+
+
+scheduler = Scheduler()
@@ -0,0 +1,26 @@
+# Production entry point: `python -m app.server`
+# Reads uvicorn tuning from the environment so deployments can pick the HTTP
+# parser and keep-alive window without changing the start command.
+import os
+import uvicorn
+
+
+def main():
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("UVICORN_WORKERS", "1")),
+        # "httptools" is faster at parsing but needs the optional package; "auto" picks it when installed
+        http=os.getenv("UVICORN_HTTP", "auto"),
+        # Keep connections open across the frontend's bursts of page-load requests
+        timeout_keep_alive=int(os.getenv("UVICORN_TIMEOUT_KEEP_ALIVE", "15")),
+        backlog=int(os.getenv("UVICORN_BACKLOG", "2048")),
+        limit_concurrency=int(os.getenv("UVICORN_LIMIT_CONCURRENCY")) if os.getenv("UVICORN_LIMIT_CONCURRENCY") else None,
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Multi-tenant isolation by organization.
+# - Users, clients, projects, tasks, assignments, payments, archived projects,
+#   inbox items and activity carry organization_id (models.TenantScoped)
+# - get_current_user binds the request's session to the user's organization;
+#   from then on every ORM SELECT/UPDATE/DELETE on that session gets
+#   "organization_id = :org" added for each tenant-scoped entity (joins,
+#   relationship loads and db.get() included), and new rows are stamped with it
+# - Writes handed to the write queue carry the binding to the writer session
+# - Sessions that were never bound (startup, scheduled jobs, cache loaders,
+#   login) see every organization; a bound session can opt out per statement
+#   with .execution_options(**ALL_ORGANIZATIONS), e.g. for global email uniqueness
+# - Every index on a tenant table used by the routes leads on organization_id,
+#   with no organization-less twin to maintain on every write; unscoped queries
+#   name the organization too (e.g. project_organization()) to use them
+from typing import Optional
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, with_loader_criteria
+from app import models
+
+ORGANIZATION_KEY = "organization_id"
+ALL_ORGANIZATIONS = {"all_organizations": True}
+
+
+def bind(db: Session, organization_id: int):
+    db.info[ORGANIZATION_KEY] = organization_id
+
+
+def bound_organization(db: Session) -> Optional[int]:
+    return db.info.get(ORGANIZATION_KEY)
+
+
+def project_organization(project_id: int):
+    """The project's organization_id as a scalar subquery, for unscoped queries by project."""
+    return select(models.Project.organization_id).where(models.Project.id == project_id).scalar_subquery()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _scope_statement(orm_execute_state):
+    organization_id = orm_execute_state.session.info.get(ORGANIZATION_KEY)
+    if (
+        organization_id is None
+        or orm_execute_state.is_column_load
+        or orm_execute_state.is_relationship_load
+        or orm_execute_state.execution_options.get("all_organizations", False)
+        or not (orm_execute_state.is_select or orm_execute_state.is_update or orm_execute_state.is_delete)
+    ):
+        return
+    orm_execute_state.statement = orm_execute_state.statement.options(
+        with_loader_criteria(
+            models.TenantScoped,
+            lambda cls: cls.organization_id == organization_id,
+            include_aliases=True,
+        )
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_new_rows(session, flush_context, instances):
+    organization_id = session.info.get(ORGANIZATION_KEY)
+    if organization_id is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, models.TenantScoped) and obj.organization_id is None:
+            obj.organization_id = organization_id
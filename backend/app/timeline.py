@@ -0,0 +1,77 @@
+# Date-range lookups for the timeline view.
+# On SQLite, project spans are mirrored into an R*Tree virtual table kept in
+# sync by triggers, so "which projects overlap this window" is an R*Tree probe
+# instead of a scan. Elsewhere the (start_date, end_date) index is used.
+# Spans run from start_date (or created_at) to end_date; open-ended projects
+# extend to the end of time.
+import logging
+from datetime import datetime
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from app import models
+
+logger = logging.getLogger(__name__)
+
+OPEN_END = datetime(9999, 12, 31)
+
+_SPAN_START = "julianday(coalesce({row}.start_date, {row}.created_at))"
+_SPAN_END = "coalesce(julianday({row}.end_date), julianday('9999-12-31'))"
+
+
+def _span_values(row: str) -> str:
+    start, end = _SPAN_START.format(row=row), _SPAN_END.format(row=row)
+    return f"{row}.id, min({start}, {end}), max({start}, {end})"
+
+
+RTREE_DDL = [
+    "CREATE VIRTUAL TABLE project_spans USING rtree(id, start_day, end_day)",
+    f"""CREATE TRIGGER IF NOT EXISTS project_spans_insert AFTER INSERT ON projects
+        WHEN coalesce(new.start_date, new.created_at) IS NOT NULL
+        BEGIN INSERT OR REPLACE INTO project_spans VALUES ({_span_values('new')}); END""",
+    f"""CREATE TRIGGER IF NOT EXISTS project_spans_update AFTER UPDATE OF start_date, end_date, created_at ON projects
+        WHEN coalesce(new.start_date, new.created_at) IS NOT NULL
+        BEGIN INSERT OR REPLACE INTO project_spans VALUES ({_span_values('new')}); END""",
+    """CREATE TRIGGER IF NOT EXISTS project_spans_delete AFTER DELETE ON projects
+        BEGIN DELETE FROM project_spans WHERE id = old.id; END""",
+]
+
+_rtree_enabled = False
+
+
+def setup_rtree(conn):
+    """Create and backfill the R*Tree on first run (SQLite only). Safe to call on every startup."""
+    global _rtree_enabled
+    if conn.dialect.name != "sqlite":
+        return
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'project_spans'")
+    ).first()
+    try:
+        if not exists:
+            conn.execute(text(RTREE_DDL[0]))
+            conn.execute(text(
+                f"INSERT INTO project_spans SELECT {_span_values('projects')} FROM projects "
+                "WHERE coalesce(projects.start_date, projects.created_at) IS NOT NULL"
+            ))
+        for ddl in RTREE_DDL[1:]:
+            conn.execute(text(ddl))
+        conn.commit()
+    except Exception:
+        # SQLite builds without the R*Tree module fall back to the B-tree index
+        conn.rollback()
+        logger.warning("SQLite R*Tree unavailable; timeline queries use the date indexes")
+        return
+    _rtree_enabled = True
+
+
+def overlapping_projects(query, db: Session, start: datetime, end: datetime):
+    """Narrow a Project query to projects whose span overlaps [start, end)."""
+    span_start = func.coalesce(models.Project.start_date, models.Project.created_at)
+    span_end = func.coalesce(models.Project.end_date, OPEN_END)
+    if _rtree_enabled and db.get_bind().dialect.name == "sqlite":
+        candidates = text(
+            "SELECT id FROM project_spans WHERE start_day < julianday(:end) AND end_day >= julianday(:start)"
+        ).bindparams(start=start.isoformat(sep=" "), end=end.isoformat(sep=" ")).columns(id=models.Project.id.type)
+        query = query.filter(models.Project.id.in_(candidates))
+    # Exact check on the real columns (the R*Tree stores rounded boxes)
+    return query.filter(span_start < end, span_end >= start)
@@ -0,0 +1,388 @@
+# Request tracing in the OpenTelemetry data model, without the SDK dependency.
+# - Off by default (TRACING_EXPORTER=none): nothing is installed and span()
+#   returns a shared no-op context manager
+# - Spans: one SERVER span per request, the endpoint, JWT decode, every SQL
+#   statement (CLIENT), ORM hydration and response serialization
+# - Head sampling per request: an incoming W3C traceparent decides (parent-based),
+#   otherwise TRACING_SAMPLE_RATIO of requests are traced. Unsampled requests
+#   pay one ContextVar lookup per hook
+# - Finished traces go to a background thread as OTLP/JSON, either appended to
+#   TRACING_FILE (one ExportTraceServiceRequest per line, readable offline and by
+#   the collector's otlpjsonfile receiver) or POSTed to TRACING_OTLP_ENDPOINT.
+#   When the export queue is full, traces are dropped rather than slowing requests
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import unquote_plus
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_ENABLED = TRACING_EXPORTER in ("file", "otlp")
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "0.05"))
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "project-management-api")
+TRACING_QUEUE_SIZE = int(os.getenv("TRACING_QUEUE_SIZE", "1024"))
+TRACING_SQL_MAX_LENGTH = int(os.getenv("TRACING_SQL_MAX_LENGTH", "2000"))
+# Query parameters whose values never go into a trace (credentials in URLs)
+REDACTED_QUERY_PARAMS = {"access_token", "refresh_token", "ticket", "token", "password"}
+
+# OTLP span kinds and status codes
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_ERROR = 2
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_NOOP = nullcontext()
+_STOP = object()
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: str, kind: int, attributes: dict):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.attributes = attributes
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def child(self, name: str, kind: int = INTERNAL, attributes: Optional[dict] = None) -> "Span":
+        return Span(self.trace, name, self.span_id, kind, attributes or {})
+
+    def end(self, error: Optional[BaseException] = None):
+        # Client errors (HTTPException 4xx) are answers, not failures of the span
+        if error is not None and getattr(error, "status_code", 500) >= 500:
+            self.error = f"{type(error).__name__}: {error}"
+        self.trace.finished.append(self._to_otlp(time.time_ns()))
+
+    def _to_otlp(self, end_ns: int) -> dict:
+        otlp = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": [{"key": key, "value": _any_value(value)} for key, value in self.attributes.items()],
+        }
+        if self.error is not None:
+            otlp["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return otlp
+
+
+class Trace:
+    __slots__ = ("trace_id", "finished")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        # Spans may end on other threads (threadpool, writer); list.append is atomic
+        self.finished: list[dict] = []
+
+
+def _any_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+# The innermost open span of the current (sampled) request; None when unsampled
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def recording() -> bool:
+    return _current.get() is not None
+
+
+@contextmanager
+def _child_span(parent: Span, name: str, kind: int, attributes: dict):
+    child = parent.child(name, kind, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.end(exc)
+        raise
+    else:
+        child.end()
+    finally:
+        _current.reset(token)
+
+
+def span(name: str, kind: int = INTERNAL, **attributes):
+    """Context manager for a child of the current span; a shared no-op when not tracing."""
+    parent = _current.get()
+    if parent is None:
+        return _NOOP
+    return _child_span(parent, name, kind, attributes)
+
+
+def _start_trace(traceparent: Optional[str]) -> Optional[tuple[Trace, str]]:
+    """Head sampling decision: (trace, remote parent span id) or None."""
+    if traceparent:
+        match = TRACEPARENT.match(traceparent.strip().lower())
+        if match:
+            trace_id, parent_id, flags = match.groups()
+            if not int(flags, 16) & 1:
+                return None
+            return Trace(trace_id), parent_id
+    if random.random() >= TRACING_SAMPLE_RATIO:
+        return None
+    return Trace(f"{random.getrandbits(128):032x}"), ""
+
+
+class _Exporter:
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=TRACING_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.dropped = 0
+
+    def export(self, trace: Trace):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(trace.finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Export what is queued, then stop the exporter thread."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            spans = list(item)
+            stopping = False
+            # Batch whatever else is already waiting into the same request
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                spans.extend(item)
+            try:
+                self._write(spans)
+            except Exception:
+                logger.warning("Exporting %d spans to %s failed", len(spans), TRACING_EXPORTER, exc_info=True)
+            if stopping:
+                return
+
+    def _write(self, spans: list[dict]):
+        payload = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACING_SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+            }]
+        }, separators=(",", ":"))
+        if TRACING_EXPORTER == "file":
+            with open(TRACING_FILE, "a", encoding="utf-8") as f:
+                f.write(payload + "\n")
+        else:
+            request = urllib.request.Request(
+                TRACING_OTLP_ENDPOINT, data=payload.encode(), headers={"Content-Type": "application/json"}
+            )
+            with urllib.request.urlopen(request, timeout=10):
+                pass
+
+
+exporter = _Exporter()
+
+
+def redact_query(query: str) -> str:
+    """The query string with the values of REDACTED_QUERY_PARAMS replaced."""
+    parts = []
+    for part in query.split("&"):
+        name, sep, _ = part.partition("=")
+        if sep and unquote_plus(name).lower() in REDACTED_QUERY_PARAMS:
+            part = f"{name}=REDACTED"
+        parts.append(part)
+    return "&".join(parts)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the request's root span; add it outermost."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        traceparent = None
+        for name, value in scope.get("headers", []):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        sampled = _start_trace(traceparent)
+        if sampled is None:
+            await self.app(scope, receive, send)
+            return
+        trace, parent_id = sampled
+        root = Span(trace, f"{scope['method']} {scope['path']}", parent_id, SERVER, {
+            "http.request.method": scope["method"],
+            "url.path": scope["path"],
+        })
+        if scope.get("query_string"):
+            root.attributes["url.query"] = redact_query(scope["query_string"].decode("latin-1"))
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.response.status_code"] = message["status"]
+                if message["status"] >= 500:
+                    root.error = f"HTTP {message['status']}"
+            await send(message)
+
+        token = _current.set(root)
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as exc:
+            root.end(exc)
+            raise
+        else:
+            root.end()
+        finally:
+            _current.reset(token)
+            exporter.export(trace)
+
+
+# SQL statements: a CLIENT span from before_cursor_execute to after_cursor_execute.
+# Kept on a per-connection stack, since a span can't be a context manager across two events.
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current.get()
+    if parent is None:
+        return
+    attributes = {
+        "db.system": conn.dialect.name,
+        "db.statement": statement[:TRACING_SQL_MAX_LENGTH],
+    }
+    if executemany:
+        attributes["db.executemany"] = True
+    conn.info.setdefault("trace_spans", []).append(parent.child("sql", CLIENT, attributes))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        sql_span = spans.pop()
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            sql_span.attributes["db.rowcount"] = cursor.rowcount
+        sql_span.end()
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get("trace_spans") if conn is not None else None
+    if spans:
+        spans.pop().end(exception_context.original_exception)
+
+
+def _orm_execute(orm_execute_state):
+    """Split ORM SELECTs into the query and the hydration of its rows into objects.
+
+    Only for sampled requests: the result is buffered (freeze) to time hydration.
+    """
+    parent = _current.get()
+    if parent is None or not orm_execute_state.is_select or orm_execute_state.execution_options.get("yield_per"):
+        return None
+    mappers = orm_execute_state.all_mappers
+    attributes = {"orm.entity": mappers[0].class_.__name__} if mappers else {}
+    with _child_span(parent, "orm.query", INTERNAL, attributes):
+        result = orm_execute_state.invoke_statement()
+        with span("orm.hydrate") as hydrate:
+            frozen = result.freeze()
+            hydrate.set_attribute("orm.rows", len(frozen.data))
+    replayed = frozen()
+    # Legacy Query uniquing (joined eager collections) isn't part of the frozen result
+    replayed._unique_filter_state = result._unique_filter_state
+    return replayed
+
+
+def _patch_fastapi():
+    """Wrap FastAPI's endpoint call and response serialization in spans."""
+    import fastapi.routing
+    from starlette.responses import JSONResponse
+
+    run_endpoint_function = fastapi.routing.run_endpoint_function
+    serialize_response = fastapi.routing.serialize_response
+    render = JSONResponse.render
+
+    async def traced_run_endpoint_function(*, dependant, values, is_coroutine):
+        with span("endpoint", **{"code.function": getattr(dependant.call, "__name__", "")}):
+            return await run_endpoint_function(dependant=dependant, values=values, is_coroutine=is_coroutine)
+
+    async def traced_serialize_response(**kwargs):
+        with span("response.serialize"):
+            return await serialize_response(**kwargs)
+
+    def traced_render(self, content) -> bytes:
+        with span("response.render") as render_span:
+            body = render(self, content)
+            if render_span is not None:
+                render_span.set_attribute("http.response.body.size", len(body))
+            return body
+
+    fastapi.routing.run_endpoint_function = traced_run_endpoint_function
+    fastapi.routing.serialize_response = traced_serialize_response
+    JSONResponse.render = traced_render
+
+
+_installed = False
+
+
+def install(app):
+    """Hook tracing into the app, SQLAlchemy and FastAPI; does nothing unless TRACING_EXPORTER is set."""
+    global _installed
+    if not TRACING_ENABLED or _installed:
+        return
+    _installed = True
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    event.listen(Session, "do_orm_execute", _orm_execute)
+    _patch_fastapi()
+    app.add_middleware(TracingMiddleware)
+    logger.info("Tracing enabled: exporter=%s sample_ratio=%s", TRACING_EXPORTER, TRACING_SAMPLE_RATIO)
@@ -0,0 +1,85 @@
+# Per-user workload: open task counts by status, overdue and due within a week.
+# All users are counted with one grouped query over open tasks; the result is
+# cached for WORKLOAD_CACHE_SECONDS and dropped on every task write, so
+# repeated dashboard / assignee-picker requests don't rescan the tasks table.
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+from app import models
+from app.due_dates import OPEN_STATUSES
+from app.tenancy import ALL_ORGANIZATIONS
+
+WORKLOAD_CACHE_SECONDS = int(os.getenv("WORKLOAD_CACHE_SECONDS", "30"))
+WORKLOAD_WEEK_DAYS = 7
+
+
+@dataclass(frozen=True)
+class Load:
+    todo: int = 0
+    in_progress: int = 0
+    overdue: int = 0
+    due_this_week: int = 0
+
+    @property
+    def open(self) -> int:
+        return self.todo + self.in_progress
+
+    def rank(self):
+        """Sort key for assignee suggestions: fewest open, then overdue, then due-this-week tasks."""
+        return (self.open, self.overdue, self.due_this_week)
+
+
+def _count(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+def compute_loads(db: Session) -> dict[int, Load]:
+    now = datetime.utcnow()
+    week_end = now + timedelta(days=WORKLOAD_WEEK_DAYS)
+    task = models.Task
+    rows = (
+        db.query(
+            task.assigned_to,
+            _count(task.status == models.TaskStatus.ToDo),
+            _count(task.status == models.TaskStatus.InProgress),
+            _count(task.due_date < now),
+            _count(and_(task.due_date >= now, task.due_date < week_end)),
+        )
+        .filter(task.assigned_to.isnot(None), task.status.in_(OPEN_STATUSES))
+        .group_by(task.assigned_to)
+        .execution_options(**ALL_ORGANIZATIONS)
+        .all()
+    )
+    return {user_id: Load(*(int(value or 0) for value in counts)) for user_id, *counts in rows}
+
+
+class WorkloadCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loads: dict[int, Load] = {}
+        self._computed_at = None
+        self._generation = 0
+
+    def get(self, db: Session) -> dict[int, Load]:
+        with self._lock:
+            if self._computed_at is not None and time.monotonic() - self._computed_at < WORKLOAD_CACHE_SECONDS:
+                return self._loads
+            generation = self._generation
+        loads = compute_loads(db)
+        with self._lock:
+            # Don't cache a result that a concurrent task write may have made stale
+            if generation == self._generation:
+                self._loads, self._computed_at = loads, time.monotonic()
+        return loads
+
+    def invalidate(self):
+        with self._lock:
+            self._computed_at = None
+            self._generation += 1
+
+
+workload_cache = WorkloadCache()
@@ -0,0 +1,178 @@
+# Single-writer queue for SQLite.
+# - Routes hand their mutations to run_write(fn) as a closure taking a Session;
+#   one writer thread runs them in arrival order, so requests never contend
+#   for the SQLite write lock (no more "database is locked")
+# - Writes arriving within WRITE_BATCH_WINDOW_MS are grouped into one
+#   transaction (BEGIN IMMEDIATE ... COMMIT): one fsync for the whole group
+# - Each closure runs in its own SAVEPOINT; if it raises (e.g. HTTPException
+#   for a 404) only its own changes roll back and the exception is re-raised
+#   in the calling request; closures must not commit themselves
+# - fn's return value comes back to the caller after the commit; ORM objects
+#   keep their loaded column values (expire_on_commit=False) but are detached,
+#   so read only columns, not lazy relationships
+# - Closures run in the caller's contextvars context (e.g. its trace span) and
+#   see the caller's session.info (e.g. its organization, see app/tenancy.py)
+# - Other databases (PostgreSQL) handle concurrent writers themselves:
+#   run_write runs fn inline on the request's session and commits
+# - Every write a running worker makes goes through run_write: routes, the
+#   idempotency middleware, due-date notifications and the scheduled purge,
+#   snapshot and archival jobs. Exempt: startup migrations, backfills and the
+#   R*Tree setup (they run before requests are served and the writer starts),
+#   and the command-line scripts (their own process, no queue to join)
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import copy_context
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Optional, TypeVar
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+from app.database import DATABASE_URL
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+WRITE_QUEUE_ENABLED = os.getenv(
+    "WRITE_QUEUE_ENABLED", "true" if DATABASE_URL.startswith("sqlite") else "false"
+).lower() == "true"
+WRITE_BATCH_WINDOW_MS = float(os.getenv("WRITE_BATCH_WINDOW_MS", "2"))
+WRITE_BATCH_MAX = int(os.getenv("WRITE_BATCH_MAX", "64"))
+WRITE_TIMEOUT_SECONDS = float(os.getenv("WRITE_TIMEOUT_SECONDS", "30"))
+
+# The writer gets its own connection: request threads waiting on it hold
+# connections from the shared pool, which must not starve the writer
+writer_engine = create_engine(
+    DATABASE_URL, connect_args={"check_same_thread": False}, pool_size=1, max_overflow=0
+) if WRITE_QUEUE_ENABLED else None
+WriterSession = sessionmaker(bind=writer_engine, autoflush=False, expire_on_commit=False)
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, fn: Callable[[Session], T], info: Optional[dict] = None) -> "Future[T]":
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((fn, future, copy_context(), dict(info or {})))
+        return future
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Finish queued writes, then stop the writer thread."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + WRITE_BATCH_WINDOW_MS / 1000
+            while len(batch) < WRITE_BATCH_MAX:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+            if stopping:
+                return
+
+    def _run_batch(self, batch):
+        db = WriterSession()
+        results = []
+        try:
+            # Take the write lock up front; also makes the savepoints below nest
+            # inside one real transaction (pysqlite would otherwise not BEGIN)
+            db.execute(text("BEGIN IMMEDIATE"))
+            for fn, future, context, info in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if info != db.info:
+                    # Another tenant's closure: drop the identity map so db.get() can't
+                    # return a row loaded for the previous one (everything is flushed)
+                    db.expunge_all()
+                    db.info.clear()
+                    db.info.update(info)
+                savepoint = db.begin_nested()
+                try:
+                    result = context.run(_apply, fn, db)
+                except Exception as exc:
+                    savepoint.rollback()
+                    future.set_exception(exc)
+                    continue
+                savepoint.commit()
+                results.append((future, result))
+            db.commit()
+        except Exception as exc:
+            logger.exception("Group commit of %d writes failed", len(batch))
+            db.rollback()
+            for future, _ in results:
+                future.set_exception(exc)
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            db.close()
+        for future, result in results:
+            future.set_result(result)
+
+
+def _apply(fn: Callable[[Session], T], db: Session) -> T:
+    result = fn(db)
+    db.flush()
+    return result
+
+
+write_queue = WriteQueue()
+
+
+def run_write(db: Session, fn: Callable[[Session], T]) -> T:
+    """Run fn as one serialized, group-committed write and return its result.
+
+    db is the request's own session: with the queue disabled fn runs on it directly.
+    """
+    with span("db.write", **{"db.write_queue": WRITE_QUEUE_ENABLED}):
+        if not WRITE_QUEUE_ENABLED:
+            try:
+                result = fn(db)
+                db.commit()
+                return result
+            except Exception:
+                db.rollback()
+                raise
+        future = write_queue.submit(fn, db.info)
+        try:
+            return future.result(timeout=WRITE_TIMEOUT_SECONDS)
+        except FutureTimeout:
+            # Still queued: drop it and tell the client. Already running: it will finish, so wait.
+            if future.cancel():
+                raise HTTPException(status_code=503, detail="Write queue is busy, please retry")
+            return future.result()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Script to back up the SQLite database while the API keeps running.
+Writes BACKUP_DIR/database-<timestamp>.db.gz and a .sha256 file next to it.
+
+Usage: python backup_database.py [--dir <backup dir>]
+       python backup_database.py --verify <backup .db.gz file>
+
+Restore: stop the API, then  gunzip -c backups/database-....db.gz > database.db
+"""
+
+import sys
+from app.backup import BACKUP_DIR, new_backup, run_backup, verify
+
+def backup(backup_dir):
+    result = run_backup(new_backup(), backup_dir)
+    print(f"✓ Backup written: {backup_dir}/{result.name}.db.gz")
+    print(f"  Method: {result.method} ({result.restarts} restarts)")
+    print(f"  Size: {result.database_size} bytes -> {result.size} bytes compressed")
+    print(f"  SHA-256: {result.sha256}")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    try:
+        if args[:1] == ["--verify"] and len(args) == 2:
+            if not verify(args[1]):
+                print(f"✗ {args[1]} does not match its checksum", file=sys.stderr)
+                sys.exit(1)
+            print(f"✓ {args[1]} matches its checksum")
+        elif not args or (args[:1] == ["--dir"] and len(args) == 2):
+            backup(args[1] if args else BACKUP_DIR)
+        else:
+            print(__doc__.strip(), file=sys.stderr)
+            sys.exit(2)
+    except Exception as e:
+        print(f"✗ Error: {e}", file=sys.stderr)
+        sys.exit(1)
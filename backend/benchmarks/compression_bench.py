@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Measure bytes-on-wire and CPU cost of each response encoding for a
+GET /tasks/-shaped payload.
+
+    python -m benchmarks.compression_bench [n_tasks ...]
+"""
+
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from app.compression import ENCODERS
+
+
+def build_payload(n_tasks: int) -> bytes:
+    now = datetime(2026, 1, 1)
+    tasks = [
+        {
+            "id": i,
+            "title": f"Task {i}: update onboarding flow",
+            "description": "Follow up with the client about the latest round of feedback.",
+            "project_id": i % 40 + 1,
+            "assigned_to": i % 25 + 1,
+            "status": ("ToDo", "InProgress", "Done")[i % 3],
+            "due_date": (now + timedelta(days=i % 90)).isoformat(),
+            "created_at": (now - timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(n_tasks)
+    ]
+    return json.dumps(tasks, separators=(",", ":")).encode()
+
+
+def bench(payload: bytes, rounds: int = 20):
+    print(f"payload: {len(payload):,} bytes")
+    for name, encoder_cls in ENCODERS.items():
+        start = time.process_time()
+        for _ in range(rounds):
+            compressed = encoder_cls().finish(payload)
+        cpu_ms = (time.process_time() - start) * 1000 / rounds
+        print(
+            f"  {name:>5}: {len(compressed):>10,} bytes "
+            f"({len(compressed) / len(payload):6.1%})  {cpu_ms:7.2f} ms CPU"
+        )
+
+
+if __name__ == "__main__":
+    for n in [int(a) for a in sys.argv[1:]] or [100, 1000, 10000]:
+        print(f"{n} tasks")
+        bench(build_payload(n))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Script to create an organization (tenant) with its first admin user.
+Everything that admin creates belongs to the new organization.
+
+Usage: python create_organization.py "<organization name>" <admin email> <admin password>
+"""
+
+import sys
+from app.database import SessionLocal
+from app import models
+from app.auth import get_password_hash
+
+def create_organization(name, email, password):
+    db = SessionLocal()
+    try:
+        # Emails are unique across organizations
+        if db.query(models.User).filter(models.User.email == email).first():
+            print(f"✗ A user with email {email} already exists", file=sys.stderr)
+            sys.exit(1)
+
+        organization = models.Organization(name=name)
+        db.add(organization)
+        db.flush()
+        db.add(models.User(
+            full_name=f"{name} Administrator",
+            email=email,
+            hashed_password=get_password_hash(password),
+            role=models.UserRole.Admin,
+            organization_id=organization.id,
+        ))
+        db.commit()
+
+        print(f"✓ Organization created: {name} (id {organization.id})")
+        print(f"  Admin: {email}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print(__doc__.strip(), file=sys.stderr)
+        sys.exit(2)
+    try:
+        create_organization(*sys.argv[1:])
+    except Exception as e:
+        print(f"✗ Error: {e}", file=sys.stderr)
+        sys.exit(1)
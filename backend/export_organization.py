@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Script to move a large organization to its own database.
+
+Copies the organization's rows (users, clients, projects, tasks, dependencies,
+assignments, payments, archived projects, notifications, activity, status
+history and revenue rollups) into an empty database, keeping their ids. The
+tenant is then served by its own deployment whose DATABASE_URL points at the
+new database: a separate SQLite file, or a PostgreSQL database or schema
+(postgresql://.../db?options=-csearch_path%3Dtenant_name).
+
+Users sign in again on the new deployment: refresh tokens are not copied.
+With --delete the rows are removed from the source database once copied.
+
+Usage: python export_organization.py <organization_id> <target_database_url> [--delete]
+"""
+
+import sys
+from sqlalchemy import create_engine, delete, func, insert, or_, select, text, union
+from app.database import Base, engine
+from app import models
+from app.timeline import setup_rtree
+
+CHUNK_SIZE = 1000
+
+def organization_tables(organization_id):
+    """(table, where clause) for every table holding the organization's rows, parents first."""
+    users = select(models.User.id).where(models.User.organization_id == organization_id)
+    clients = select(models.Client.id).where(models.Client.organization_id == organization_id)
+    projects = union(
+        select(models.Project.id).where(models.Project.organization_id == organization_id),
+        select(models.ArchivedProject.id).where(models.ArchivedProject.organization_id == organization_id),
+    )
+    rollup = models.RevenueRollup
+    transition = models.StatusTransition
+    return [
+        (models.Organization.__table__, models.Organization.id == organization_id),
+        (models.User.__table__, models.User.organization_id == organization_id),
+        (models.Client.__table__, models.Client.organization_id == organization_id),
+        (models.Project.__table__, models.Project.organization_id == organization_id),
+        (models.Task.__table__, models.Task.organization_id == organization_id),
+        (models.TaskDependency.__table__, models.TaskDependency.project_id.in_(projects)),
+        (models.ProjectAssignment.__table__, models.ProjectAssignment.organization_id == organization_id),
+        (models.Payment.__table__, models.Payment.organization_id == organization_id),
+        (models.ArchivedProject.__table__, models.ArchivedProject.organization_id == organization_id),
+        (models.InboxItem.__table__, models.InboxItem.organization_id == organization_id),
+        (models.Notification.__table__, models.Notification.user_id.in_(users)),
+        (models.NotificationCounter.__table__, models.NotificationCounter.user_id.in_(users)),
+        (models.ActivityLog.__table__, models.ActivityLog.organization_id == organization_id),
+        (transition.__table__, or_(
+            transition.project_id.in_(projects),
+            (transition.entity_type == "project") & transition.entity_id.in_(projects),
+        )),
+        (models.ProjectStatusSnapshot.__table__, models.ProjectStatusSnapshot.project_id.in_(projects)),
+        (rollup.__table__, or_(
+            (rollup.scope == "organization") & (rollup.scope_id == organization_id),
+            (rollup.scope == "project") & rollup.scope_id.in_(projects),
+            (rollup.scope == "client") & rollup.scope_id.in_(clients),
+        )),
+    ]
+
+def export_organization(organization_id, target_url, delete_source=False):
+    target = create_engine(target_url)
+    Base.metadata.create_all(bind=target)
+    with target.connect() as conn:
+        setup_rtree(conn)
+
+    tables = organization_tables(organization_id)
+    with engine.connect() as source, target.begin() as dest:
+        if source.execute(select(models.Organization.id).where(models.Organization.id == organization_id)).first() is None:
+            print(f"✗ Organization {organization_id} not found", file=sys.stderr)
+            sys.exit(1)
+        if dest.execute(select(func.count()).select_from(models.Organization.__table__)).scalar():
+            print("✗ The target database already has organizations; export into an empty one", file=sys.stderr)
+            sys.exit(1)
+        for table, where in tables:
+            copied = 0
+            result = source.execution_options(stream_results=True).execute(select(table).where(where))
+            for rows in result.mappings().partitions(CHUNK_SIZE):
+                dest.execute(insert(table), [dict(row) for row in rows])
+                copied += len(rows)
+            print(f"  {table.name}: {copied}")
+        if target.dialect.name == "postgresql":
+            # Rows kept their ids, so move each id sequence past them
+            for table, _ in tables:
+                if "id" in table.c and table.c.id.autoincrement is not False:
+                    dest.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                        f"coalesce((SELECT max(id) FROM {table.name}), 0) + 1, false)"
+                    ))
+
+    if delete_source:
+        with engine.begin() as source:
+            # Children first; the where clauses read the parent tables, so those go last
+            for table, where in reversed(tables):
+                source.execute(delete(table).where(where))
+        print(f"✓ Removed organization {organization_id} from the source database")
+    print(f"✓ Organization {organization_id} exported to {target.url.render_as_string(hide_password=True)}")
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--delete"]
+    if len(args) != 2:
+        print(__doc__.strip(), file=sys.stderr)
+        sys.exit(2)
+    try:
+        export_organization(int(args[0]), args[1], delete_source="--delete" in sys.argv[1:])
+    except Exception as e:
+        print(f"✗ Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,327 @@
+# Fixtures for the query-budget suite.
+# - The app runs against a temporary SQLite file (set before app is imported)
+# - Every SQLite connection the app opens (request sessions and the write
+#   queue's writer) counts the statements it executes and the rows it fetches,
+#   see QueryRecorder
+# - A fixed dataset is seeded once through the API, so derived tables
+#   (rollups, snapshots, counters) are what production would have
+# - Behaviour tests work in organizations of their own (new_organization), so
+#   they never change what the budgeted dataset's organization sees; the
+#   write_mode fixture runs one with the write queue on and off
+import itertools
+import os
+import sqlite3
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+_tmp = tempfile.mkdtemp(prefix="pm-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_tmp}/test.db",
+    RATE_LIMIT_ENABLED="false",
+    SCHEDULER_ENABLED="false",
+    TRACING_EXPORTER="none",
+    BACKUP_DIR=f"{_tmp}/backups",
+    # One worker here, so there are no other workers' changes to look for;
+    # checking at most once a second would make counts depend on timing
+    MEMBERSHIP_VERSION_CHECK_SECONDS="3600",
+    REVOCATION_CHECK_SECONDS="3600",
+)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app import models, write_queue
+from app.auth import create_access_token, get_password_hash
+from app.database import SessionLocal, engine
+from app.main import app
+from app.write_queue import writer_engine
+
+# Transaction control isn't work a route chose to do; it isn't counted
+UNCOUNTED_PREFIXES = ("BEGIN", "SAVEPOINT", "RELEASE", "ROLLBACK", "COMMIT")
+
+
+@dataclass
+class Statement:
+    sql: str
+    rows: int = 0
+
+
+@dataclass
+class Recording:
+    statements: list[Statement] = field(default_factory=list)
+
+    @property
+    def rows(self) -> int:
+        return sum(statement.rows for statement in self.statements)
+
+    def report(self) -> str:
+        return "\n".join(
+            f"  {number:>3}. [{statement.rows} rows] {' '.join(statement.sql.split())}"
+            for number, statement in enumerate(self.statements, 1)
+        )
+
+
+class QueryRecorder:
+    """Collects statements and fetched rows from every thread while recording."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recording = None
+
+    def start(self) -> Recording:
+        with self._lock:
+            self._recording = Recording()
+            return self._recording
+
+    def stop(self):
+        with self._lock:
+            self._recording = None
+
+    def executed(self, sql: str):
+        if sql.lstrip().upper().startswith(UNCOUNTED_PREFIXES):
+            return None
+        with self._lock:
+            if self._recording is None:
+                return None
+            statement = Statement(sql)
+            self._recording.statements.append(statement)
+            return statement
+
+    def fetched(self, statement, rows: int):
+        if statement is not None and rows:
+            with self._lock:
+                statement.rows += rows
+
+
+recorder = QueryRecorder()
+
+
+class CountingCursor(sqlite3.Cursor):
+    statement = None
+
+    def execute(self, sql, *args):
+        self.statement = recorder.executed(sql)
+        return super().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        self.statement = recorder.executed(sql)
+        return super().executemany(sql, *args)
+
+    def fetchone(self):
+        row = super().fetchone()
+        recorder.fetched(self.statement, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, *args):
+        rows = super().fetchmany(*args)
+        recorder.fetched(self.statement, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        recorder.fetched(self.statement, len(rows))
+        return rows
+
+
+class CountingConnection(sqlite3.Connection):
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+
+def _counting_connect(dialect, conn_rec, cargs, cparams):
+    cparams["factory"] = CountingConnection
+
+
+for _engine in (engine, writer_engine):
+    if _engine is not None:
+        event.listen(_engine, "do_connect", _counting_connect)
+
+
+ROLES = ("Admin", "ProjectManager", "TeamMember")
+EMAILS = {
+    "Admin": "admin@example.com",
+    "ProjectManager": "pm@example.com",
+    "TeamMember": "member@example.com",
+}
+# The Admin is the one created at startup
+PASSWORDS = {"Admin": "admin123", "ProjectManager": "secret1", "TeamMember": "secret1"}
+
+
+def auth_headers(role: str) -> dict:
+    # A fresh token per request, so /auth/logout only revokes its own
+    token = create_access_token({"sub": EMAILS[role], "role": role, "org": 1})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@dataclass
+class Tenant:
+    """An organization made for one test, with its Admin."""
+    id: int
+    admin_id: int
+    admin_email: str
+
+    def headers(self, email: Optional[str] = None, role: str = "Admin") -> dict:
+        token = create_access_token({"sub": email or self.admin_email, "role": role, "org": self.id})
+        return {"Authorization": f"Bearer {token}"}
+
+
+_tenants = itertools.count(1)
+
+
+def new_organization(password: str = "secret1") -> Tenant:
+    """A new organization and its first Admin, as create_organization.py makes them."""
+    number = next(_tenants)
+    db = SessionLocal()
+    try:
+        organization = models.Organization(name=f"Organization {number}")
+        db.add(organization)
+        db.flush()
+        admin = models.User(
+            full_name=f"Admin {number}", email=f"admin{number}@org{organization.id}.example.com",
+            hashed_password=get_password_hash(password), role=models.UserRole.Admin,
+            organization_id=organization.id,
+        )
+        db.add(admin)
+        db.commit()
+        return Tenant(id=organization.id, admin_id=admin.id, admin_email=admin.email)
+    finally:
+        db.close()
+
+
+def created(response) -> dict:
+    request = response.request
+    assert response.status_code == 201, f"{request.method} {request.url}: {response.status_code} {response.text}"
+    return response.json()
+
+
+def new_project(client: TestClient, tenant: Tenant, **fields) -> int:
+    """A project, under a client of its own, in the tenant's organization."""
+    headers = tenant.headers()
+    client_id = created(client.post("/clients/", headers=headers, json={"name": "Client"}))["id"]
+    return created(client.post("/projects/", headers=headers, json={
+        "name": "Project", "client_id": client_id, **fields,
+    }))["id"]
+
+
+@dataclass
+class Seed:
+    """Ids of the fixed dataset; see seed() for its shape."""
+    users: dict[str, int]
+    team: list[int]
+    clients: list[int]
+    projects: list[int]
+    tasks: dict[int, list[int]]
+    payments: list[int]
+    assignments: list[int]
+    completed_project: int
+    scratch_project: int
+    scratch_client: int
+
+
+TASKS_PER_PROJECT = 20
+
+
+def _ok(response):
+    assert response.status_code < 300, f"{response.request.method} {response.request.url}: {response.status_code} {response.text}"
+    return response.json()
+
+
+def seed(client: TestClient) -> Seed:
+    """
+    Through the API, as Admin:
+    - a ProjectManager, a TeamMember and 8 more team members
+    - 3 clients, 5 projects (one Completed, one scratch project for deletes), 1 scratch client
+    - 20 tasks per active project, half assigned, some overdue or due soon, a dependency chain in the first
+    - PM and member assigned to the first two projects, the team spread over all of them
+    - 3 payments per project
+    """
+    admin = auth_headers("Admin")
+    users = {"Admin": 1}
+    for role in ("ProjectManager", "TeamMember"):
+        _ok(client.post("/auth/register", headers=admin, json={
+            "email": EMAILS[role], "password": PASSWORDS[role], "full_name": role, "role": role,
+        }))
+    team = []
+    for number in range(8):
+        _ok(client.post("/auth/register", headers=admin, json={
+            "email": f"team{number}@example.com", "password": "secret1", "full_name": f"Team {number}",
+            "role": "TeamMember",
+        }))
+    for user in _ok(client.get("/users/", headers=admin)):
+        if user["email"] in (EMAILS["ProjectManager"], EMAILS["TeamMember"]):
+            users[user["role"]] = user["id"]
+        elif user["email"].startswith("team"):
+            team.append(user["id"])
+
+    clients = [_ok(client.post("/clients/", headers=admin, json={"name": f"Client {n}"}))["id"] for n in range(3)]
+    scratch_client = _ok(client.post("/clients/", headers=admin, json={"name": "Scratch client"}))["id"]
+    projects = [
+        _ok(client.post("/projects/", headers=admin, json={
+            "name": f"Project {n}", "client_id": clients[n % 3],
+            "start_date": "2026-01-01", "end_date": "2027-01-01",
+        }))["id"]
+        for n in range(4)
+    ]
+    completed_project = projects[3]
+    scratch_project = _ok(client.post("/projects/", headers=admin, json={"name": "Scratch", "client_id": clients[0]}))["id"]
+
+    assignments = []
+    # Team members who can be assigned each project's tasks
+    members = {project_id: [] for project_id in projects}
+    pairs = [(users[role], project_id) for project_id in projects[:2] for role in ("ProjectManager", "TeamMember")]
+    pairs += [(user_id, projects[(number + step) % 4]) for number, user_id in enumerate(team) for step in (0, 1)]
+    for user_id, project_id in pairs:
+        assignments.append(_ok(client.post("/assignments/", headers=admin, json={"user_id": user_id, "project_id": project_id}))["id"])
+        if user_id != users["ProjectManager"]:
+            members[project_id].append(user_id)
+
+    tasks = {}
+    for index, project_id in enumerate(projects):
+        project_tasks = []
+        for number in range(TASKS_PER_PROJECT):
+            body = {"title": f"Task {index}.{number}", "project_id": project_id}
+            if number % 2 == 0:
+                body["assigned_to"] = members[project_id][number // 2 % len(members[project_id])]
+            if number % 5 == 0:
+                body["due_date"] = "2026-01-15T00:00:00"
+            elif number % 5 == 1:
+                body["due_date"] = "2099-01-01T00:00:00"
+            project_tasks.append(_ok(client.post("/tasks/", headers=admin, json=body))["id"])
+        tasks[project_id] = project_tasks
+    chain = tasks[projects[0]]
+    for blocker, blocked in zip(chain[:5], chain[1:6]):
+        _ok(client.post(f"/tasks/{blocked}/dependencies", headers=admin, json={"blocked_by": blocker}))
+
+    payments = []
+    for project_id in projects:
+        for number in range(3):
+            payments.append(_ok(client.post("/payments/", headers=admin, json={
+                "project_id": project_id, "amount": 100 * (number + 1), "date": f"2026-0{number + 1}-10T00:00:00",
+            }))["id"])
+    _ok(client.patch(f"/projects/{completed_project}/status?status=Completed", headers=admin))
+
+    return Seed(
+        users=users, team=team, clients=clients, projects=projects, tasks=tasks, payments=payments,
+        assignments=assignments, completed_project=completed_project, scratch_project=scratch_project,
+        scratch_client=scratch_client,
+    )
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def dataset(client) -> Seed:
+    return seed(client)
+
+
+@pytest.fixture(params=["queue", "inline"])
+def write_mode(request, monkeypatch) -> str:
+    """The write queue on, then off (the inline path PostgreSQL takes)."""
+    monkeypatch.setattr(write_queue, "WRITE_QUEUE_ENABLED", request.param == "queue")
+    return request.param
@@ -0,0 +1,21 @@
+# Task dependencies: edges that would close a cycle are refused.
+from conftest import created, new_organization, new_project
+
+
+def test_edge_closing_a_cycle_is_refused(client, write_mode):
+    tenant = new_organization()
+    headers = tenant.headers()
+    project_id = new_project(client, tenant)
+    first, second, third = (
+        created(client.post("/tasks/", headers=headers, json={"title": title, "project_id": project_id}))["id"]
+        for title in ("First", "Second", "Third")
+    )
+    created(client.post(f"/tasks/{second}/dependencies", headers=headers, json={"blocked_by": first}))
+    created(client.post(f"/tasks/{third}/dependencies", headers=headers, json={"blocked_by": second}))
+
+    response = client.post(f"/tasks/{first}/dependencies", headers=headers, json={"blocked_by": third})
+    assert response.status_code == 400
+    assert "cycle" in response.json()["detail"]
+    response = client.post(f"/tasks/{first}/dependencies", headers=headers, json={"blocked_by": first})
+    assert response.status_code == 400
+    assert client.get(f"/tasks/{first}/dependencies", headers=headers).json()["blocked_by"] == []
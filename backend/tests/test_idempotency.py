@@ -0,0 +1,26 @@
+# Idempotency-Key on create endpoints: repeats replay, a changed body is refused.
+from conftest import created, new_organization
+
+
+def test_repeat_replays_the_stored_response(client, write_mode):
+    tenant = new_organization()
+    headers = {**tenant.headers(), "Idempotency-Key": f"create-client-{write_mode}"}
+
+    first = client.post("/clients/", headers=headers, json={"name": "Once"})
+    assert created(first)
+    assert "Idempotency-Replayed" not in first.headers
+    repeat = client.post("/clients/", headers=headers, json={"name": "Once"})
+    assert repeat.status_code == 201
+    assert repeat.headers["Idempotency-Replayed"] == "true"
+    assert repeat.json() == first.json()
+    assert [c["name"] for c in client.get("/clients/", headers=tenant.headers()).json()] == ["Once"]
+
+
+def test_same_key_with_another_body_is_refused(client, write_mode):
+    tenant = new_organization()
+    headers = {**tenant.headers(), "Idempotency-Key": f"create-client-{write_mode}"}
+
+    created(client.post("/clients/", headers=headers, json={"name": "Original"}))
+    response = client.post("/clients/", headers=headers, json={"name": "Changed"})
+    assert response.status_code == 422
+    assert [c["name"] for c in client.get("/clients/", headers=tenant.headers()).json()] == ["Original"]
@@ -0,0 +1,41 @@
+# Optimistic concurrency: If-Match (412) and body versions (409) on versioned rows.
+from conftest import created, new_organization, new_project
+
+
+def test_if_match_must_name_the_current_version(client, write_mode):
+    tenant = new_organization()
+    headers = tenant.headers()
+    project_id = new_project(client, tenant)
+    response = client.get(f"/projects/{project_id}", headers=headers)
+    assert response.headers["ETag"] == '"1"'
+
+    response = client.put(f"/projects/{project_id}", headers={**headers, "If-Match": '"1"'}, json={"name": "Renamed"})
+    assert response.status_code == 200, response.text
+    assert response.headers["ETag"] == '"2"'
+
+    # The tag from before the update is stale
+    response = client.put(f"/projects/{project_id}", headers={**headers, "If-Match": '"1"'}, json={"name": "Lost"})
+    assert response.status_code == 412
+    # If-Match compares strongly: a weak tag never matches, even for the current version
+    response = client.put(f"/projects/{project_id}", headers={**headers, "If-Match": 'W/"2"'}, json={"name": "Lost"})
+    assert response.status_code == 412
+    # The tag of the compressed representation names the same version
+    response = client.put(f"/projects/{project_id}", headers={**headers, "If-Match": '"2-gzip"'}, json={"name": "Kept"})
+    assert response.status_code == 200, response.text
+    assert client.get(f"/projects/{project_id}", headers=headers).json()["name"] == "Kept"
+
+
+def test_stale_body_version_conflicts(client, write_mode):
+    tenant = new_organization()
+    headers = tenant.headers()
+    project_id = new_project(client, tenant)
+    task = created(client.post("/tasks/", headers=headers, json={"title": "Task", "project_id": project_id}))
+    assert task["version"] == 1
+
+    response = client.put(f"/tasks/{task['id']}", headers=headers, json={"title": "First", "version": 1})
+    assert response.status_code == 200, response.text
+    assert response.json()["version"] == 2
+
+    response = client.put(f"/tasks/{task['id']}", headers=headers, json={"title": "Second", "version": 1})
+    assert response.status_code == 409
+    assert client.get(f"/tasks/{task['id']}", headers=headers).json()["title"] == "First"
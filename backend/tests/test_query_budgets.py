@@ -0,0 +1,332 @@
+# Query budgets: every endpoint, called as every role against the fixed
+# dataset from conftest.seed, must stay within a number of SQL statements and
+# fetched rows. A change that adds an N+1, drops an index-backed scope or
+# starts loading whole tables fails here with the statements it ran.
+# - Statement budgets are what was measured when they were set; row budgets
+#   get a little headroom. Lower them when a change makes an endpoint cheaper
+# - A budget is one number for every role or one per role, where scoping
+#   makes the roles see different amounts of data
+# - Every case runs with the SQLite write queue on and off (the inline path
+#   PostgreSQL takes), with its own budgets where the modes differ: inline
+#   writes commit the request's session, which reloads what the route then reads
+# - Each call must answer with the case's expected status for the role, so a
+#   route that starts refusing (403/404/422) can't pass on a smaller budget
+# - GETs are called once before they are measured, so in-process caches
+#   (due dates, dependency graphs, workloads, memberships) are warm
+# - Writes are measured on both connections: the request's session and the
+#   write queue's writer
+# - Cases run in order (reads, writes, then deletes and archival) and may see
+#   rows written by earlier cases; each one makes what it deletes itself
+# - test_every_route_has_a_budget fails when a new route has neither a
+#   budget nor an entry in UNBUDGETED
+import itertools
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+import pytest
+from fastapi.routing import APIRoute
+from app import write_queue
+from app.main import app
+from conftest import EMAILS, PASSWORDS, ROLES, Seed, auth_headers, recorder
+
+# One value for every role, or one per role
+PerRole = Union[int, dict[str, int]]
+
+# Write modes: write_queue.WRITE_QUEUE_ENABLED for each
+WRITE_MODES = {"queue": True, "inline": False}
+
+
+class Context:
+    """What a case's path and body are built from; makes throwaway rows (as Admin) for writes to consume."""
+
+    _counter = itertools.count(1)
+
+    def __init__(self, client, dataset: Seed, role: str):
+        self.client = client
+        self.seed = dataset
+        self.role = role
+        self.user_id = dataset.users[role]
+        self.project = dataset.projects[0]
+        self.task = dataset.tasks[dataset.projects[0]][10]
+
+    def _admin(self, method, path, **kwargs):
+        response = self.client.request(method, path, headers=auth_headers("Admin"), **kwargs)
+        assert response.status_code < 300, f"setup {method} {path}: {response.status_code} {response.text}"
+        return response.json()
+
+    def unique(self, prefix: str) -> str:
+        return f"{prefix}-{next(self._counter)}"
+
+    def new_client(self) -> int:
+        return self._admin("POST", "/clients/", json={"name": self.unique("Client")})["id"]
+
+    def empty_project(self, status: str = "InProgress") -> int:
+        return self._admin("POST", "/projects/", json={
+            "name": self.unique("Project"), "client_id": self.seed.clients[0], "status": status,
+        })["id"]
+
+    def new_project(self, status: str = "InProgress") -> int:
+        project_id = self.empty_project(status)
+        for number in range(3):
+            self._admin("POST", "/tasks/", json={"title": f"Task {number}", "project_id": project_id})
+        self._admin("POST", "/payments/", json={"project_id": project_id, "amount": 50, "date": "2026-02-01T00:00:00"})
+        return project_id
+
+    def new_task(self) -> int:
+        return self._admin("POST", "/tasks/", json={"title": self.unique("Task"), "project_id": self.project})["id"]
+
+    def new_payment(self) -> int:
+        return self._admin("POST", "/payments/", json={"project_id": self.project, "amount": 10})["id"]
+
+    def new_assignment(self) -> int:
+        return self._admin("POST", "/assignments/", json={
+            "user_id": self.seed.team[0], "project_id": self.empty_project(),
+        })["id"]
+
+    def new_dependency(self) -> tuple[int, int]:
+        blocker, blocked = self.new_task(), self.new_task()
+        self._admin("POST", f"/tasks/{blocked}/dependencies", json={"blocked_by": blocker})
+        return blocked, blocker
+
+    def archived_project(self) -> int:
+        project_id = self.new_project(status="Completed")
+        self._admin("POST", f"/archive/projects/{project_id}")
+        return project_id
+
+    def refresh_token(self) -> str:
+        response = self.client.post("/auth/login", data={"username": EMAILS[self.role], "password": PASSWORDS[self.role]})
+        assert response.status_code == 200, response.text
+        return response.json()["refresh_token"]
+
+    def notification(self) -> int:
+        # Admins are notified of access requests, everyone else of their overdue tasks
+        if self.role == "Admin":
+            response = self.client.post("/notifications/admin-access-requests", json={"email": self.unique("someone")})
+            assert response.status_code == 201, response.text
+        else:
+            self._admin("POST", "/tasks/", json={
+                "title": self.unique("Task"), "project_id": self.project, "assigned_to": self.user_id,
+                "due_date": "2026-01-01T00:00:00",
+            })
+        response = self.client.get("/notifications/", headers=auth_headers(self.role))
+        return response.json()[0]["id"]
+
+
+@dataclass
+class Case:
+    method: str
+    route: str  # as registered, e.g. /tasks/{task_id}
+    statements: PerRole
+    rows: PerRole
+    path: Optional[Callable[[Context], str]] = None  # defaults to route
+    json: Optional[Callable[[Context], dict]] = None
+    data: Optional[Callable[[Context], dict]] = None
+    authenticated: bool = True
+    status: PerRole = 200
+    # Budgets with the write queue off; None means the same as with it on
+    inline_statements: Optional[PerRole] = None
+    inline_rows: Optional[PerRole] = None
+
+    @staticmethod
+    def for_role(value: PerRole, role: str) -> int:
+        return value[role] if isinstance(value, dict) else value
+
+    def budget(self, mode: str, role: str) -> tuple[int, int]:
+        statements, rows = self.statements, self.rows
+        if mode == "inline":
+            statements = statements if self.inline_statements is None else self.inline_statements
+            rows = rows if self.inline_rows is None else self.inline_rows
+        return self.for_role(statements, role), self.for_role(rows, role)
+
+    def __str__(self):
+        return f"{self.method} {self.route}"
+
+
+# Expected statuses where some roles are refused
+ADMIN_ONLY = {"Admin": 200, "ProjectManager": 403, "TeamMember": 403}
+NOT_TEAM_MEMBER = {"Admin": 200, "ProjectManager": 200, "TeamMember": 403}
+STAFF_CREATES = {"Admin": 201, "ProjectManager": 201, "TeamMember": 403}
+
+CASES = [
+    # Reads
+    Case("GET", "/", 0, 2),
+    Case("GET", "/auth/me", 1, 3),
+    Case("GET", "/users/", 2, 15, status=NOT_TEAM_MEMBER),
+    Case("GET", "/clients/", 2, 7, status=NOT_TEAM_MEMBER),
+    Case("GET", "/clients/{client_id}", 2, 4, path=lambda ctx: f"/clients/{ctx.seed.clients[0]}",
+         status=NOT_TEAM_MEMBER),
+    Case("GET", "/projects/", 2, {"Admin": 8, "ProjectManager": 5, "TeamMember": 5}),
+    Case("GET", "/projects/{project_id}", 2, 4, path=lambda ctx: f"/projects/{ctx.project}"),
+    Case("GET", "/projects/{project_id}/burndown", 4, 5, path=lambda ctx: f"/projects/{ctx.project}/burndown"),
+    Case("GET", "/projects/{project_id}/critical-path", 3, 9,
+         path=lambda ctx: f"/projects/{ctx.project}/critical-path"),
+    Case("GET", "/assignments/project/{project_id}", 3, 10, path=lambda ctx: f"/assignments/project/{ctx.project}"),
+    Case("GET", "/assignments/user/{user_id}", 3, 6, path=lambda ctx: f"/assignments/user/{ctx.user_id}"),
+    Case("GET", "/tasks/", 2, {"Admin": 98, "ProjectManager": 50, "TeamMember": 7}),
+    Case("GET", "/tasks/groups", 2, {"Admin": 98, "ProjectManager": 50, "TeamMember": 7},
+         path=lambda ctx: "/tasks/groups?group_by=status"),
+    Case("GET", "/tasks/overdue", 1, 3),
+    Case("GET", "/tasks/due-soon", 1, 3),
+    Case("GET", "/tasks/project/{project_id}", 3, 27, path=lambda ctx: f"/tasks/project/{ctx.project}"),
+    Case("GET", "/tasks/user/{user_id}", 3, 8, path=lambda ctx: f"/tasks/user/{ctx.user_id}"),
+    Case("GET", "/tasks/{task_id}", 2, 4, path=lambda ctx: f"/tasks/{ctx.task}"),
+    Case("GET", "/tasks/{task_id}/dependencies", 4, 6,
+         path=lambda ctx: f"/tasks/{ctx.seed.tasks[ctx.project][2]}/dependencies", status=NOT_TEAM_MEMBER),
+    Case("GET", "/dashboard/stats", 4, 6),
+    Case("GET", "/dashboard/activity", 2, 26),
+    Case("GET", "/activity/project/{project_id}", 2, 26, path=lambda ctx: f"/activity/project/{ctx.project}"),
+    Case("GET", "/activity/user/{user_id}", 2, 26, path=lambda ctx: f"/activity/user/{ctx.user_id}"),
+    Case("GET", "/notifications/", 2, 7),
+    Case("GET", "/notifications/unread-count", 2, 4),
+    Case("GET", "/payments/", 2, {"Admin": 16, "ProjectManager": 9, "TeamMember": 3}, status=NOT_TEAM_MEMBER),
+    Case("GET", "/payments/{payment_id}", 2, 4, path=lambda ctx: f"/payments/{ctx.seed.payments[0]}",
+         status=NOT_TEAM_MEMBER),
+    Case("GET", "/payments/revenue", 2, 7, status=ADMIN_ONLY),
+    Case("GET", "/payments/revenue/project/{project_id}", 3, 8,
+         path=lambda ctx: f"/payments/revenue/project/{ctx.project}", status=NOT_TEAM_MEMBER),
+    Case("GET", "/payments/revenue/client/{client_id}", 3, 8,
+         path=lambda ctx: f"/payments/revenue/client/{ctx.seed.clients[0]}", status=ADMIN_ONLY),
+    Case("GET", "/timeline", 3, {"Admin": 27, "ProjectManager": 14, "TeamMember": 9},
+         path=lambda ctx: "/timeline?from=2026-01-01T00:00:00&to=2026-12-31T00:00:00"),
+    Case("GET", "/workload/", 2, {"Admin": 15, "ProjectManager": 11, "TeamMember": 4}),
+    Case("GET", "/workload/suggest-assignee", 3, 10,
+         path=lambda ctx: f"/workload/suggest-assignee?project_id={ctx.project}", status=NOT_TEAM_MEMBER),
+    Case("GET", "/me/inbox", 2, {"Admin": 3, "ProjectManager": 50, "TeamMember": 7}),
+    Case("GET", "/archive/projects", 2, 3, status=ADMIN_ONLY),
+    Case("GET", "/archive/projects/{project_id}", 2, 4, path=lambda ctx: f"/archive/projects/{ctx.archived_project()}",
+         status=ADMIN_ONLY),
+    Case("GET", "/backups/", 1, 3, status=ADMIN_ONLY),
+    Case("GET", "/backups/{name}", 1, 3, path=lambda ctx: "/backups/database-missing",
+         status={"Admin": 404, "ProjectManager": 403, "TeamMember": 403}),
+    Case("POST", "/batch", 5, 11, json=lambda ctx: {"requests": [
+        {"id": "me", "path": "/auth/me"},
+        {"id": "projects", "path": "/projects/"},
+        {"id": "tasks", "path": f"/tasks/user/{ctx.user_id}"},
+        {"id": "unread", "path": "/notifications/unread-count"},
+    ]}),
+    # Auth
+    Case("POST", "/auth/login", 2, 3, authenticated=False,
+         data=lambda ctx: {"username": EMAILS[ctx.role], "password": PASSWORDS[ctx.role]}, inline_statements=3),
+    Case("POST", "/auth/refresh", 5, 4, authenticated=False, json=lambda ctx: {"refresh_token": ctx.refresh_token()},
+         inline_statements=6),
+    Case("POST", "/auth/logout", 7, 5, json=lambda ctx: {"refresh_token": ctx.refresh_token()}),
+    Case("POST", "/auth/register", 4, 4, json=lambda ctx: {
+        "email": f"{ctx.unique('user')}@example.com", "password": "secret1", "role": "TeamMember",
+    }, status=ADMIN_ONLY),
+    # Writes
+    Case("POST", "/clients/", 3, 3, json=lambda ctx: {"name": ctx.unique("Client")},
+         status=STAFF_CREATES, inline_statements=4),
+    Case("PUT", "/clients/{client_id}", 4, 4, path=lambda ctx: f"/clients/{ctx.seed.scratch_client}",
+         json=lambda ctx: {"contact_info": ctx.unique("contact")}, status=NOT_TEAM_MEMBER, inline_statements=5),
+    Case("POST", "/projects/", 7, 7,
+         json=lambda ctx: {"name": ctx.unique("Project"), "client_id": ctx.seed.clients[0]},
+         status=STAFF_CREATES, inline_statements=8),
+    Case("PUT", "/projects/{project_id}", 4, 4, path=lambda ctx: f"/projects/{ctx.seed.scratch_project}",
+         json=lambda ctx: {"description": ctx.unique("description")}, status=NOT_TEAM_MEMBER, inline_statements=5),
+    Case("PATCH", "/projects/{project_id}/status", 5, 5,
+         path=lambda ctx: f"/projects/{ctx.new_project()}/status?status=NotStarted",
+         status=ADMIN_ONLY, inline_statements=6),
+    Case("POST", "/assignments/", 8, 6,
+         json=lambda ctx: {"user_id": ctx.seed.team[1], "project_id": ctx.new_project()},
+         status=STAFF_CREATES, inline_statements=9),
+    Case("POST", "/tasks/", 10, 7, json=lambda ctx: {
+        "title": ctx.unique("Task"), "project_id": ctx.project, "assigned_to": ctx.seed.users["TeamMember"],
+        "due_date": "2026-12-01T00:00:00",
+    }, status=STAFF_CREATES, inline_statements=11),
+    Case("PUT", "/tasks/{task_id}", 8, 5, path=lambda ctx: f"/tasks/{ctx.new_task()}",
+         json=lambda ctx: {"title": ctx.unique("Task"), "assigned_to": ctx.seed.users["TeamMember"]},
+         status=NOT_TEAM_MEMBER, inline_statements=9),
+    Case("PATCH", "/tasks/{task_id}/status", 10, 6,
+         path=lambda ctx: f"/tasks/{ctx.new_task()}/status?status=InProgress",
+         status=NOT_TEAM_MEMBER, inline_statements=11),
+    Case("POST", "/tasks/{task_id}/dependencies", 9, 6, path=lambda ctx: f"/tasks/{ctx.new_task()}/dependencies",
+         json=lambda ctx: {"blocked_by": ctx.new_task()}, status=STAFF_CREATES, inline_statements=11),
+    Case("POST", "/payments/", 13, 4, json=lambda ctx: {"project_id": ctx.project, "amount": 25}, status=STAFF_CREATES),
+    Case("PUT", "/payments/{payment_id}", 17, 5, path=lambda ctx: f"/payments/{ctx.new_payment()}",
+         json=lambda ctx: {"amount": 30}, status=NOT_TEAM_MEMBER, inline_statements=18),
+    Case("POST", "/notifications/stream-ticket", 1, 1),
+    Case("POST", "/notifications/mark-read", 5, 4, json=lambda ctx: {"all": True}),
+    Case("POST", "/notifications/admin-access-requests", 3, 3, authenticated=False,
+         json=lambda ctx: {"email": EMAILS[ctx.role], "reason": "testing"}, status=201),
+    # Deletes
+    Case("DELETE", "/notifications/{notification_id}", 4, 4, path=lambda ctx: f"/notifications/{ctx.notification()}"),
+    Case("DELETE", "/tasks/{task_id}/dependencies/{blocker_id}", 4, 5,
+         path=lambda ctx: "/tasks/{}/dependencies/{}".format(*ctx.new_dependency()),
+         status=NOT_TEAM_MEMBER, inline_statements=5),
+    Case("DELETE", "/tasks/{task_id}", 8, 5, path=lambda ctx: f"/tasks/{ctx.new_task()}", status=ADMIN_ONLY),
+    Case("DELETE", "/payments/{payment_id}", 11, 5, path=lambda ctx: f"/payments/{ctx.new_payment()}",
+         status=ADMIN_ONLY),
+    Case("DELETE", "/assignments/{assignment_id}", 8, 5, path=lambda ctx: f"/assignments/{ctx.new_assignment()}",
+         status=ADMIN_ONLY),
+    Case("DELETE", "/projects/{project_id}", 12, 8, path=lambda ctx: f"/projects/{ctx.new_project()}",
+         status=ADMIN_ONLY),
+    Case("DELETE", "/clients/{client_id}", 5, 4, path=lambda ctx: f"/clients/{ctx.new_client()}", status=ADMIN_ONLY),
+    # Archival
+    Case("POST", "/archive/projects/{project_id}", 15, 9,
+         path=lambda ctx: f"/archive/projects/{ctx.new_project(status='Completed')}",
+         status=ADMIN_ONLY, inline_statements=16),
+    Case("POST", "/archive/projects/{project_id}/restore", 17, 8,
+         path=lambda ctx: f"/archive/projects/{ctx.archived_project()}/restore",
+         status=ADMIN_ONLY, inline_statements=21, inline_rows=11),
+    # Archives every project earlier cases left Completed (about ten on the
+    # shared dataset); the inline run finds none left
+    Case("POST", "/archive/run", 102, 76, path=lambda ctx: "/archive/run?older_than_days=0", status=ADMIN_ONLY),
+]
+
+# Routes without a budget, and why
+UNBUDGETED = {
+    ("GET", "/notifications/stream"): "server-sent events; the response never ends",
+    ("GET", "/debug/profile"): "samples the worker for seconds and runs no queries of its own",
+    ("GET", "/debug/profiles/{profile_id}"): "reads an in-memory profile, no queries",
+    ("POST", "/backups/"): "copies the database on a background thread with raw sqlite3",
+}
+
+
+def _route_keys():
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            for method in route.methods:
+                yield method, route.path
+
+
+def test_every_route_has_a_budget():
+    budgeted = {(case.method, case.route) for case in CASES}
+    missing = sorted(set(_route_keys()) - budgeted - set(UNBUDGETED))
+    assert not missing, f"Routes without a query budget (add a Case or an UNBUDGETED reason): {missing}"
+    stale = sorted((budgeted | set(UNBUDGETED)) - set(_route_keys()))
+    assert not stale, f"Budgets for routes that no longer exist: {stale}"
+
+
+@pytest.mark.parametrize(
+    "case, mode, role",
+    [(case, mode, role) for case in CASES for mode in WRITE_MODES for role in ROLES],
+    ids=[f"{case}-{mode}-{role}" for case in CASES for mode in WRITE_MODES for role in ROLES],
+)
+def test_query_budget(client, dataset, monkeypatch, case, mode, role):
+    monkeypatch.setattr(write_queue, "WRITE_QUEUE_ENABLED", WRITE_MODES[mode])
+    ctx = Context(client, dataset, role)
+    path = case.path(ctx) if case.path else case.route
+    kwargs = {}
+    if case.json:
+        kwargs["json"] = case.json(ctx)
+    if case.data:
+        kwargs["data"] = case.data(ctx)
+    if case.authenticated:
+        kwargs["headers"] = auth_headers(role)
+    if case.method == "GET":
+        client.request(case.method, path, **kwargs)
+
+    recording = recorder.start()
+    try:
+        response = client.request(case.method, path, **kwargs)
+    finally:
+        recorder.stop()
+
+    assert response.status_code == case.for_role(case.status, role), response.text
+    max_statements, max_rows = case.budget(mode, role)
+    if len(recording.statements) > max_statements or recording.rows > max_rows:
+        pytest.fail(
+            f"{case.method} {path} as {role} with the write queue {mode} (HTTP {response.status_code}) ran "
+            f"{len(recording.statements)} statements (budget {max_statements}) fetching "
+            f"{recording.rows} rows (budget {max_rows}):\n{recording.report()}",
+            pytrace=False,
+        )
@@ -0,0 +1,22 @@
+# Rate limiting: a caller past a route's bucket gets 429 with Retry-After.
+# The suite runs with RATE_LIMIT_ENABLED=false, so the middleware wraps the
+# app here with buckets of its own.
+from fastapi.testclient import TestClient
+from app.main import app
+from app.rate_limit import InMemoryBucketBackend, RateLimitMiddleware
+from conftest import new_organization
+
+
+def test_login_attempts_past_the_bucket_get_429(client):
+    limited = TestClient(RateLimitMiddleware(app, backend=InMemoryBucketBackend()))
+    attempt = {"username": "nobody@example.com", "password": "wrong"}
+
+    # The login rule allows 5 attempts per caller, then one every 12 seconds
+    for _ in range(5):
+        assert limited.post("/auth/login", data=attempt).status_code == 400
+    response = limited.post("/auth/login", data=attempt)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Other routes have buckets of their own, and Admins aren't limited on them
+    assert limited.get("/auth/me", headers=new_organization().headers()).status_code == 200
@@ -0,0 +1,39 @@
+# Refresh tokens: each refresh rotates the token, and a rotated token coming
+# back revokes every token from that login.
+from conftest import new_organization
+
+
+def _login(client, tenant) -> str:
+    response = client.post("/auth/login", data={"username": tenant.admin_email, "password": "secret1"})
+    assert response.status_code == 200, response.text
+    return response.json()["refresh_token"]
+
+
+def _refresh(client, refresh_token: str):
+    return client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+
+def test_refresh_rotates_the_token(client, write_mode):
+    tenant = new_organization()
+    first = _login(client, tenant)
+
+    response = _refresh(client, first)
+    assert response.status_code == 200, response.text
+    second = response.json()["refresh_token"]
+    assert second != first
+    me = client.get("/auth/me", headers={"Authorization": f"Bearer {response.json()['access_token']}"})
+    assert me.json()["email"] == tenant.admin_email
+    assert _refresh(client, second).status_code == 200
+
+
+def test_reused_token_revokes_its_family(client, write_mode):
+    tenant = new_organization()
+    stolen = _login(client, tenant)
+    other_login = _login(client, tenant)
+    current = _refresh(client, stolen).json()["refresh_token"]
+
+    # The rotated token comes back: every token of that login stops working
+    assert _refresh(client, stolen).status_code == 401
+    assert _refresh(client, current).status_code == 401
+    # A separate login is a separate family
+    assert _refresh(client, other_login).status_code == 200
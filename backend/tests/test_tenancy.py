@@ -0,0 +1,61 @@
+# Organization isolation: an organization's rows are invisible to, and out
+# of reach of, every other organization, including archival runs.
+from app import archive
+from app.database import SessionLocal
+from conftest import created, new_organization, new_project
+
+
+def test_rows_of_another_organization_are_out_of_reach(client):
+    owner, other = new_organization(), new_organization()
+    project_id = new_project(client, owner)
+    task_id = created(client.post("/tasks/", headers=owner.headers(), json={
+        "title": "Task", "project_id": project_id,
+    }))["id"]
+    headers = other.headers()
+
+    assert project_id not in [project["id"] for project in client.get("/projects/", headers=headers).json()]
+    assert client.get("/clients/", headers=headers).json() == []
+    assert client.get("/tasks/", headers=headers).json() == []
+    assert client.get(f"/projects/{project_id}", headers=headers).status_code == 404
+    assert client.get(f"/tasks/{task_id}", headers=headers).status_code == 404
+    assert client.put(f"/projects/{project_id}", headers=headers, json={"name": "Taken"}).status_code == 404
+    assert client.delete(f"/tasks/{task_id}", headers=headers).status_code == 404
+    response = client.post("/tasks/", headers=headers, json={"title": "Intruder", "project_id": project_id})
+    assert response.status_code == 404
+
+    # Still there, unchanged, for its own organization
+    assert client.get(f"/projects/{project_id}", headers=owner.headers()).json()["name"] == "Project"
+    assert client.get(f"/tasks/{task_id}", headers=owner.headers()).status_code == 200
+
+
+def test_archive_run_only_archives_the_callers_organization(client):
+    owner, other = new_organization(), new_organization()
+    project_id = new_project(client, owner, status="Completed")
+    other_project_id = new_project(client, other, status="Completed")
+
+    response = client.post("/archive/run?older_than_days=0", headers=other.headers())
+    assert response.status_code == 200, response.text
+    assert response.json()["archived"] == [other_project_id]
+    assert client.get(f"/projects/{project_id}", headers=owner.headers()).status_code == 200
+    assert client.get("/archive/projects", headers=owner.headers()).json() == []
+
+    response = client.post("/archive/run?older_than_days=0", headers=owner.headers())
+    assert response.json()["archived"] == [project_id]
+    for tenant, archived in ((owner, project_id), (other, other_project_id)):
+        assert [summary["id"] for summary in client.get("/archive/projects", headers=tenant.headers()).json()] == [
+            archived
+        ]
+    assert client.get(f"/archive/projects/{project_id}", headers=other.headers()).status_code == 404
+    assert client.post(f"/archive/projects/{project_id}/restore", headers=other.headers()).status_code == 404
+
+
+def test_projects_due_for_archive_are_picked_per_organization(client):
+    # The daily job's session is unbound; the organization filter is its only scope
+    owner, other = new_organization(), new_organization()
+    project_id = new_project(client, owner, status="Completed")
+    db = SessionLocal()
+    try:
+        assert archive.due_for_archive(db, other.id, older_than_days=0) == []
+        assert archive.due_for_archive(db, owner.id, older_than_days=0) == [project_id]
+    finally:
+        db.close()
@@ -0,0 +1,22 @@
+# Timeline windows given as plain dates.
+from conftest import created, new_organization, new_project
+
+
+def test_date_only_window_covers_the_whole_last_day(client):
+    tenant = new_organization()
+    headers = tenant.headers()
+    project_id = new_project(client, tenant, start_date="2025-01-01", end_date="2025-01-31")
+    task_id = created(client.post("/tasks/", headers=headers, json={
+        "title": "Late in the day", "project_id": project_id, "due_date": "2025-01-02T18:30:00",
+    }))["id"]
+
+    response = client.get("/timeline?from=2025-01-01&to=2025-01-02", headers=headers)
+    assert response.status_code == 200, response.text
+    window = response.json()
+    assert (window["start"], window["end"]) == ("2025-01-01T00:00:00", "2025-01-03T00:00:00")
+    assert [project["id"] for project in window["projects"]] == [project_id]
+    assert [task["id"] for task in window["tasks"]] == [task_id]
+
+    # A datetime 'to' stays exclusive
+    window = client.get("/timeline?from=2025-01-01&to=2025-01-02T00:00:00", headers=headers).json()
+    assert window["tasks"] == []
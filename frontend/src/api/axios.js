@@ -1,20 +1,95 @@
 // Create a centralized axios instance for API calls.
 // - Base URL: http://127.0.0.1:8000
 // - Automatically attach JWT token from localStorage to Authorization header
+// - On a 401, trade the refresh token for a new access token once and retry
+// - POSTs that create records carry an Idempotency-Key; on a network error or timeout
+//   they (and GETs) are retried with the same config, so the same key, and the server
+//   replays the first response instead of creating the record twice
 // - Export as default
 import axios from "axios";
 
 const api = axios.create({
   baseURL: import.meta.env.VITE_API_URL,
+  timeout: 30000,
 });
 
+// Retries after a network error, timeout or "still in progress" 409, with growing delays
+const RETRY_DELAYS_MS = [500, 2000];
+
+// Create endpoints that dedupe retries by Idempotency-Key
+const IDEMPOTENT_PATHS = ["/tasks", "/projects", "/clients", "/assignments", "/payments"];
+
 // Attach token automatically
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem("token");
   if (token) {
     config.headers.Authorization = `Bearer ${token}`;
   }
+  // One key per logical request; a retry of the same config keeps it
+  const path = (config.url || "").split("?")[0].replace(/\/$/, "");
+  if (config.method === "post" && IDEMPOTENT_PATHS.includes(path) && !config.headers["Idempotency-Key"]) {
+    config.headers["Idempotency-Key"] = crypto.randomUUID();
+  }
   return config;
 });
 
+// Concurrent 401s share one refresh call (each refresh token works only once)
+let refreshing = null;
+
+const refreshAccessToken = () => {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem("refresh_token");
+    refreshing = (refreshToken
+      ? axios.post(`${import.meta.env.VITE_API_URL}/auth/refresh`, { refresh_token: refreshToken })
+      : Promise.reject(new Error("No refresh token"))
+    )
+      .then((response) => {
+        localStorage.setItem("token", response.data.access_token);
+        localStorage.setItem("refresh_token", response.data.refresh_token);
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Safe to send again: reads, and creates the server dedupes by Idempotency-Key
+const isRetryable = (config) => config.method === "get" || Boolean(config.headers?.["Idempotency-Key"]);
+
+api.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config;
+    // No response (network error, timeout), or the first attempt with this key is still running
+    const inProgress = error.response?.status === 409 && error.response.headers["retry-after"];
+    if (original && (!error.response || inProgress) && isRetryable(original)) {
+      const attempt = original._attempt || 0;
+      if (attempt < RETRY_DELAYS_MS.length) {
+        original._attempt = attempt + 1;
+        const retryAfter = inProgress ? Number(error.response.headers["retry-after"]) * 1000 : 0;
+        await sleep(Math.max(retryAfter, RETRY_DELAYS_MS[attempt]));
+        return api(original);
+      }
+    }
+    const isAuthCall = original?.url?.startsWith("/auth/login") || original?.url?.startsWith("/auth/refresh");
+    if (error.response?.status !== 401 || !original || original._retried || isAuthCall) {
+      return Promise.reject(error);
+    }
+    original._retried = true;
+    try {
+      const token = await refreshAccessToken();
+      original.headers.Authorization = `Bearer ${token}`;
+      return api(original);
+    } catch {
+      localStorage.removeItem("token");
+      localStorage.removeItem("refresh_token");
+      return Promise.reject(error);
+    }
+  },
+);
+
 export default api;
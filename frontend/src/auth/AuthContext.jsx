@@ -2,7 +2,8 @@
 // Requirements:
 // - Store user state and token in memory only (not persisted)
 // - On page refresh, users are redirected to login for security
-// - Provide login(token) and logout() methods
+// - Provide login(token, refreshToken) and logout() methods
+// - logout() also revokes the tokens server-side
 // - Wrap children with AuthProvider
 // Use functional components and hooks.
 import React, { createContext, useState, useEffect } from "react";
@@ -19,6 +20,7 @@ export const AuthProvider = ({ children }) => {
     // Clear any stored tokens on app load for security
     // Users must log in again after page refresh
     localStorage.removeItem("token");
+    localStorage.removeItem("refresh_token");
     setLoading(false);
   }, []);
 
@@ -35,6 +37,7 @@ export const AuthProvider = ({ children }) => {
       console.error("Failed to fetch user data:", error);
       // If token is invalid, clear it
       localStorage.removeItem("token");
+      localStorage.removeItem("refresh_token");
       setToken(null);
       setUser(null);
     } finally {
@@ -42,8 +45,11 @@ export const AuthProvider = ({ children }) => {
     }
   };
 
-  const login = (newToken, userData = null) => {
+  const login = (newToken, refreshToken = null, userData = null) => {
     localStorage.setItem("token", newToken);
+    if (refreshToken) {
+      localStorage.setItem("refresh_token", refreshToken);
+    }
     setToken(newToken);
     if (userData) {
       setUser(userData);
@@ -54,7 +60,19 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    const accessToken = localStorage.getItem("token");
+    const refreshToken = localStorage.getItem("refresh_token");
+    if (accessToken) {
+      api
+        .post(
+          "/auth/logout",
+          { refresh_token: refreshToken },
+          { headers: { Authorization: `Bearer ${accessToken}` }, _retried: true },
+        )
+        .catch(() => {});
+    }
     localStorage.removeItem("token");
+    localStorage.removeItem("refresh_token");
     setToken(null);
     setUser(null);
   };
@@ -1,6 +1,7 @@
 import { useState } from "react";
 import { useAuth } from "../auth/useAuth";
 import { useNotification } from "../auth/NotificationContext";
+import api from "../api/axios";
 
 export default function RequestAdminAccessModal({ isOpen, onClose }) {
   const [email, setEmail] = useState("");
@@ -18,22 +19,11 @@ export default function RequestAdminAccessModal({ isOpen, onClose }) {
 
     setLoading(true);
     try {
-      // Store request in localStorage for admin to see via notifications
-      const request = {
-        id: Date.now(),
+      // Admins receive this as a server-side notification
+      await api.post("/notifications/admin-access-requests", {
         email: email.trim(),
         reason: reason.trim(),
-        timestamp: new Date().toLocaleString(),
-      };
-
-      const existingRequests = JSON.parse(
-        localStorage.getItem("admin_access_requests") || "[]",
-      );
-      existingRequests.push(request);
-      localStorage.setItem(
-        "admin_access_requests",
-        JSON.stringify(existingRequests),
-      );
+      });
 
       addNotification("Request sent! Admin will be notified.", "success");
       setEmail("");
@@ -1,57 +1,100 @@
 import { Bell, User, X } from "lucide-react";
 import { Link, useLocation } from "react-router-dom";
 import { useAuth } from "../auth/useAuth";
-import { useState, useEffect } from "react";
+import { useState, useEffect, useCallback } from "react";
+import api from "../api/axios";
+
+const STREAM_RETRY_MS = 1000;
+const STREAM_MAX_RETRY_MS = 60000;
 
 export default function Topbar() {
   const location = useLocation();
   const { user } = useAuth();
   const [showNotifications, setShowNotifications] = useState(false);
-  const [requests, setRequests] = useState([]);
+  const [notifications, setNotifications] = useState([]);
   const [unreadCount, setUnreadCount] = useState(0);
 
-  useEffect(() => {
-    if (user?.role === "Admin") {
-      loadRequests();
-      const interval = setInterval(loadRequests, 5000); // Check every 5 seconds
-      return () => clearInterval(interval);
+  const loadNotifications = useCallback(async () => {
+    try {
+      const response = await api.get("/notifications/", {
+        params: { limit: 20 },
+      });
+      setNotifications(response.data);
+    } catch (error) {
+      console.error("Failed to load notifications", error);
     }
-  }, [user]);
+  }, []);
 
-  const loadRequests = () => {
-    const storedRequests = JSON.parse(
-      localStorage.getItem("admin_access_requests") || "[]",
-    );
-    const readRequests = JSON.parse(
-      localStorage.getItem("read_requests") || "[]",
-    );
-    setRequests(storedRequests);
-    const unread = storedRequests.filter(
-      (r) => !readRequests.includes(r.id),
-    ).length;
-    setUnreadCount(unread);
-  };
+  useEffect(() => {
+    if (!user) return;
+    loadNotifications();
+
+    // The server pushes the unread count whenever it changes, so no polling here.
+    // The stream ends when the access token behind it expires or is revoked, so
+    // on any error reopen it with a fresh ticket (the api client refreshes the token).
+    let source = null;
+    let retryTimer = null;
+    let retryDelay = STREAM_RETRY_MS;
+    let stopped = false;
+
+    const retry = () => {
+      if (stopped) return;
+      retryTimer = setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, STREAM_MAX_RETRY_MS);
+    };
 
-  const handleNotificationClick = () => {
+    const connect = async () => {
+      try {
+        const { data } = await api.post("/notifications/stream-ticket");
+        if (stopped) return;
+        source = new EventSource(
+          `${import.meta.env.VITE_API_URL}/notifications/stream?ticket=${encodeURIComponent(data.ticket)}`,
+        );
+        source.addEventListener("unread", (event) => {
+          retryDelay = STREAM_RETRY_MS;
+          const { unread } = JSON.parse(event.data);
+          setUnreadCount(unread);
+          loadNotifications();
+        });
+        source.onerror = () => {
+          source.close();
+          retry();
+        };
+      } catch (error) {
+        console.error("Failed to open notification stream", error);
+        retry();
+      }
+    };
+
+    connect();
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      source?.close();
+    };
+  }, [user, loadNotifications]);
+
+  const handleNotificationClick = async () => {
     setShowNotifications(!showNotifications);
-    if (!showNotifications) {
-      const readRequests = JSON.parse(
-        localStorage.getItem("read_requests") || "[]",
-      );
-      requests.forEach((r) => {
-        if (!readRequests.includes(r.id)) {
-          readRequests.push(r.id);
-        }
-      });
-      localStorage.setItem("read_requests", JSON.stringify(readRequests));
-      setUnreadCount(0);
+    if (!showNotifications && unreadCount > 0) {
+      try {
+        const response = await api.post("/notifications/mark-read", {
+          all: true,
+        });
+        setUnreadCount(response.data.unread);
+      } catch (error) {
+        console.error("Failed to mark notifications read", error);
+      }
     }
   };
 
-  const removeRequest = (id) => {
-    const updated = requests.filter((r) => r.id !== id);
-    localStorage.setItem("admin_access_requests", JSON.stringify(updated));
-    setRequests(updated);
+  const removeNotification = async (id) => {
+    try {
+      await api.delete(`/notifications/${id}`);
+      setNotifications((prev) => prev.filter((n) => n.id !== id));
+    } catch (error) {
+      console.error("Failed to delete notification", error);
+    }
   };
 
   const getPageTitle = () => {
@@ -82,57 +125,69 @@ export default function Topbar() {
               )}
             </button>
 
-            {showNotifications && user?.role === "Admin" && (
+            {showNotifications && (
               <div className="absolute right-0 mt-2 w-80 bg-white border border-gray-200 rounded-lg shadow-lg z-50">
                 <div className="p-4 border-b border-gray-200">
                   <h3 className="font-semibold text-gray-900">
-                    Admin Requests
+                    Notifications
                   </h3>
                   <p className="text-xs text-gray-500 mt-1">
-                    {requests.length > 0
-                      ? `${requests.length} access request${requests.length !== 1 ? "s" : ""}`
-                      : "No pending requests"}
+                    {notifications.length > 0
+                      ? `${notifications.length} notification${notifications.length !== 1 ? "s" : ""}`
+                      : "No notifications"}
                   </p>
                 </div>
                 <div className="max-h-96 overflow-y-auto">
-                  {requests.length > 0 ? (
-                    requests.map((req) => (
+                  {notifications.length > 0 ? (
+                    notifications.map((notification) => (
                       <div
-                        key={req.id}
+                        key={notification.id}
                         className="p-4 border-b border-gray-100 hover:bg-gray-50"
                       >
                         <div className="flex justify-between items-start mb-2">
                           <div>
                             <p className="text-sm font-medium text-gray-900">
-                              {req.email}
+                              {notification.title}
                             </p>
                             <p className="text-xs text-gray-500 mt-1">
-                              {req.timestamp}
+                              {new Date(
+                                notification.created_at + "Z",
+                              ).toLocaleString()}
                             </p>
                           </div>
                           <button
-                            onClick={() => removeRequest(req.id)}
+                            onClick={() => removeNotification(notification.id)}
                             className="text-gray-400 hover:text-gray-600"
                           >
                             <X className="h-4 w-4" />
                           </button>
                         </div>
-                        {req.reason && (
+                        {notification.body && (
                           <p className="text-xs text-gray-600 mb-3">
-                            {req.reason}
+                            {notification.body}
                           </p>
                         )}
-                        <Link
-                          to="/register"
-                          className="inline-block px-3 py-1.5 bg-[#f05742] text-white text-xs rounded hover:bg-[#e04632]"
-                        >
-                          Register User
-                        </Link>
+                        {notification.kind === "admin_access_request" &&
+                        user?.role === "Admin" ? (
+                          <Link
+                            to="/register"
+                            className="inline-block px-3 py-1.5 bg-[#f05742] text-white text-xs rounded hover:bg-[#e04632]"
+                          >
+                            Register User
+                          </Link>
+                        ) : notification.link ? (
+                          <Link
+                            to={notification.link}
+                            className="text-xs text-[#f05742] hover:underline"
+                          >
+                            View
+                          </Link>
+                        ) : null}
                       </div>
                     ))
                   ) : (
                     <div className="p-8 text-center text-gray-500">
-                      <p className="text-sm">No pending requests</p>
+                      <p className="text-sm">No notifications</p>
                     </div>
                   )}
                 </div>
@@ -31,7 +31,7 @@ export default function Login() {
       });
 
       const token = response.data.access_token;
-      login(token);
+      login(token, response.data.refresh_token);
       navigate("/");
     } catch (error) {
       console.log(error.response?.data);